@@ -0,0 +1,27 @@
+"""
+Access check and actions of the /admin endpoints, shared by the Flask app
+(app.py) and the async app (asgi_app.py).
+"""
+import hmac
+import os
+
+from pinecone_utils import reload_local_index
+
+# Required in the X-Admin-Token header of /admin/* calls; when unset, only
+# local requests may use them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def admin_allowed(token, remote_addr):
+    """Whether a request with this X-Admin-Token header and client address may call an admin endpoint."""
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(token or "", ADMIN_TOKEN)
+    return remote_addr in ("127.0.0.1", "::1")
+
+def reload_index():
+    """Reload the index and describe the swap (the /admin/reload response body)."""
+    previous, version = reload_local_index()
+    return {
+        "reloaded": version is not None and version != previous,
+        "previous_version": previous,
+        "version": version
+    }
@@ -0,0 +1,101 @@
+"""
+Approximate nearest-neighbor search with an inverted-file (IVF) index.
+
+Rows are clustered with spherical k-means; each cluster ("list") stores the
+row numbers assigned to it. A query is compared against the centroids, the
+``nprobe`` closest lists are scanned exactly, and only those rows are scored.
+Everything is plain numpy, so the structure is small enough to persist next
+to the vector matrix as an ``.npz`` file.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+from index_format import normalize_rows, _atomic_write
+
+# Rows scored per block while assigning rows to centroids
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def default_nlist(count):
+    """Number of lists for ``count`` rows (~4 * sqrt(n), at least 1)."""
+    return max(1, min(count, int(4 * np.sqrt(count))))
+
+
+def _assign(vectors, centroids):
+    """Closest centroid (by cosine) for every row, computed in blocks."""
+    assignments = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS])
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+class IVFIndex:
+    """Inverted-file index over a normalized vector matrix."""
+
+    def __init__(self, centroids, offsets, rows, index_version=None, nprobe=8):
+        self.centroids = centroids
+        # List i holds rows[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets
+        self.rows = rows
+        self.index_version = index_version
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, vectors, nlist=None, iterations=10, sample_size=None, seed=0):
+        """
+        Cluster normalized ``vectors`` with spherical k-means.
+        Centroids are trained on a sample (default 256 rows per list) and
+        every row is then assigned to its closest centroid.
+        """
+        count = vectors.shape[0]
+        nlist = min(nlist or default_nlist(count), count) if count else 1
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(count, sample_size or 256 * nlist)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=nlist) == 0
+            # Re-seed empty lists with random sample rows
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        assignments = _assign(vectors, centroids)
+        rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+        return cls(centroids, offsets, rows)
+
+    def save(self, path, index_version):
+        """Persist the structure, tagged with the version of the index it was built for."""
+        buffer = io.BytesIO()
+        np.savez(buffer, centroids=self.centroids, offsets=self.offsets,
+                 rows=self.rows, index_version=np.array(index_version))
+        # Renamed into place, so the index watcher never reads a half-written file
+        _atomic_write(Path(path), buffer.getvalue())
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        with np.load(path) as data:
+            return cls(data["centroids"], data["offsets"], data["rows"],
+                       index_version=str(data["index_version"]), nprobe=nprobe)
+
+    def candidates(self, query, nprobe=None):
+        """Row numbers in the ``nprobe`` lists whose centroids are closest to ``query``."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+        return np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in probes])
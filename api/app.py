@@ -1,89 +1,127 @@
-from flask import Flask, request, jsonify
+import startup
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from embedding_utils import create_embeddings
-from pinecone_utils import pinecone_query
-from reranker import rerank
-from chat_completion_utils import generate_smart_response
+from search_service import (search, run_batch_search, parse_search_request, parse_batch_request,
+                            streaming_mimetype, encoded_stream)
+from pinecone_utils import index_status
+from admin import admin_allowed, reload_index
+from monitoring import render_metrics, METRICS_CONTENT_TYPE
+from log_utils import get_logger
+
+logger = get_logger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
+startup.mark_imported()
+if startup.preload_at_import():
+    startup.start_preload()
+
 @app.route("/health", methods=["GET"])
 def health():
-    """Health check endpoint."""
-    return jsonify({"status": "healthy", "message": "RAG Professor Review API is running"})
+    """Health check endpoint, including the version of the loaded index."""
+    return jsonify({
+        "status": "healthy",
+        "message": "RAG Professor Review API is running",
+        "index": index_status()
+    })
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness check: 503 until the embedding model and the index are loaded.
+    The first call starts the preload when PRELOAD is off, so a probe never
+    waits on a load that only a user query would trigger; calls after a
+    failed preload start it again.
+    """
+    startup.start_preload()
+    is_ready, details = startup.readiness()
+    return jsonify({"ready": is_ready, **details}), 200 if is_ready else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-stage latency histograms, cache hit rates and index/model state in Prometheus text format."""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Reload the index from disk and swap it in atomically.
+    Other requests keep being served (from the old index) while it loads.
+    """
+    if not admin_allowed(request.headers.get("X-Admin-Token"), request.remote_addr):
+        return jsonify({"error": "Forbidden"}), 403
+    
+    try:
+        return jsonify(reload_index())
+    except Exception as e:
+        logger.error("Error in admin_reload: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/search', methods=['POST'])
-def search_professors():
+def search_professors(allow_streaming=True):
     """
     Main search endpoint for finding professors.
     Expects JSON: {"query": "your search query"}
+    Optional "filters": {"min_rating", "max_rating", "min_reviews",
+    "max_reviews", "tags", "exclude_tags", "department"}
+    Optional "weights": {"similarity_weight", "rating_weight",
+    "review_count_weight"} overriding the default rerank weights
+    With "Accept: application/x-ndjson" (or text/event-stream) the response
+    is streamed as frames: "professors" once retrieval and reranking are
+    done, then "answer", then "done" with per-stage timings (unless
+    ``allow_streaming`` is False, as for the legacy endpoint).
     """
     try:
-        data = request.get_json()
-        if not data or not data.get('query'):
-            return jsonify({"error": "Missing 'query' parameter"}), 400
-        
-        user_query = data['query'].strip()
-        if not user_query:
-            return jsonify({"error": "Query cannot be empty"}), 400
-        
-        print(f"Processing query: {user_query}")
+        try:
+            user_query, filters, weights = parse_search_request(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Step 1: Create embedding for user query
-        query_vector = create_embeddings(user_query)
+        logger.debug("Processing query: %s", user_query)
         
-        # Step 2: Search for similar professors (get more to allow for filtering)
-        raw_matches = pinecone_query(query_vector, top_k=20)
-        print(f"Found {len(raw_matches)} raw matches")
+        mimetype = streaming_mimetype(request.headers.get("Accept")) if allow_streaming else None
+        if mimetype:
+            return Response(stream_with_context(encoded_stream(user_query, filters, weights, mimetype)),
+                            mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
         
-        # Step 3: Remove duplicates by professor_id (keep highest score)
-        seen_professors = {}
-        for match in raw_matches:
-            prof_id = match.get("metadata", {}).get("professor_id")
-            if prof_id:
-                if prof_id not in seen_professors or match.get("score", 0) > seen_professors[prof_id].get("score", 0):
-                    seen_professors[prof_id] = match
+        # Embed, search + aggregate per professor + rerank, generate and format
+        # (served from the response cache when enabled)
+        result, cache_status = search(user_query, filters, weights)
         
-        unique_matches = list(seen_professors.values())
-        print(f"After deduplication: {len(unique_matches)} unique professors")
+        response = jsonify(result)
+        response.headers["X-Cache"] = cache_status
+        return response
         
-        # Step 4: Rerank results
-        ranked_matches = rerank(unique_matches)
-        top_matches = ranked_matches[:5]
-        
-        # Step 5: Generate smart response (this will also filter by subject)
-        response_data = generate_smart_response(user_query, top_matches)
-        
-        # Use the same filtered results for the professor list
-        final_professors = response_data.get("filtered_professors", top_matches)
+    except Exception as e:
+        logger.error("Error in search_professors: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/search/batch', methods=['POST'])
+def search_professors_batch():
+    """
+    Batch search endpoint for offline jobs.
+    Expects JSON: {"queries": ["query one", "query two", ...]}
+    with optional "filters" and "weights" (as for /api/search) applied to every query.
+    Returns {"results": [...]} in input order; failed queries carry an "error".
+    """
+    try:
+        try:
+            queries, filters, weights = parse_batch_request(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Step 6: Format results for frontend
-        formatted_matches = []
-        for match in final_professors:
-            metadata = match.get("metadata", {})
-            formatted_matches.append({
-                "id": metadata.get("professor_id", "unknown"),
-                "name": metadata.get("name", "Unknown"),
-                "subject": metadata.get("subject", "Unknown Subject"),
-                "department": metadata.get("department", "Unknown Department"),
-                "rating": metadata.get("avg_rating", 0),
-                "num_reviews": metadata.get("num_reviews", 0),
-                "tags": metadata.get("tags", []),
-                "similarity_score": round(match.get("score", 0), 4),
-                "final_score": round(match.get("final_score", 0), 4),
-                "bio": metadata.get("bio", "")
-            })
+        logger.debug("Processing batch of %d queries", len(queries))
+        results = run_batch_search(queries, filters, weights)
         
         return jsonify({
-            "query": user_query,
-            "answer": response_data["answer"],
-            "professors": formatted_matches,
-            "total_found": len(raw_matches)
+            "results": results,
+            "count": len(results),
+            "errors": sum(1 for result in results if "error" in result)
         })
         
     except Exception as e:
-        print(f"Error in search_professors: {e}")
+        logger.error("Error in search_professors_batch: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/process', methods=['POST'])
@@ -94,15 +132,17 @@ def process():
         # Convert old format to new format
         data['query'] = data['text']
     
-    # Call search and adapt response format for frontend
-    response = search_professors()
+    # Call search (always as one JSON body) and adapt response format for frontend
+    response = app.make_response(search_professors(allow_streaming=False))
     if response.status_code == 200:
         search_data = response.get_json()
         # Adapt to frontend expectations
-        return jsonify({
+        legacy_response = jsonify({
             "llm_answer": search_data.get("answer"),
             "matches": search_data.get("professors", [])
         })
+        legacy_response.headers["X-Cache"] = response.headers.get("X-Cache", "BYPASS")
+        return legacy_response
     return response
 
 @app.route('/', methods=['GET'])
@@ -112,8 +152,12 @@ def home():
         "message": "RAG Professor Review API",
         "version": "2.0",
         "endpoints": {
-            "/health": "GET - Health check",
+            "/health": "GET - Health check (with the loaded index version)",
+            "/ready": "GET - Readiness check (503 until the model and index are loaded)",
+            "/metrics": "GET - Stage latencies, cache hit rates and index/model state (Prometheus format)",
+            "/admin/reload": "POST - Reload the index from disk without downtime",
             "/api/search": "POST - Search professors (send JSON: {'query': 'your search'})",
+            "/api/search/batch": "POST - Search many queries at once (send JSON: {'queries': [...]})",
             "/api/process": "POST - Legacy endpoint"
         },
         "example_query": {
@@ -0,0 +1,226 @@
+"""
+Async (ASGI) serving mode with the same contract as app.py:
+/health, /ready, /metrics, /admin/reload, /api/search, /api/search/batch and /api/process.
+
+The event loop only parses requests and writes responses; the CPU-bound
+pipeline (embed, search, rerank, answer) runs on a bounded InferencePool.
+When its run slots and queue are full a request is refused at once with
+ASYNC_OVERLOAD_STATUS (503 by default, or 429) and a Retry-After header,
+and a request that outlives its deadline, or whose client disconnects,
+gets 504 and its queued or remaining work is dropped.
+
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import startup
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from search_service import (search, run_batch_search, parse_search_request, parse_batch_request,
+                            streaming_mimetype, encoded_stream, encode_frame)
+from pinecone_utils import index_status
+from admin import admin_allowed, reload_index
+from monitoring import render_metrics, METRICS_CONTENT_TYPE
+from log_utils import get_logger
+from inference_pool import InferencePool, Overloaded, DeadlineExceeded
+
+logger = get_logger(__name__)
+
+# Pipelines running at once (each is CPU-bound; numpy and the model release the GIL)
+ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", str(os.cpu_count() or 1)))
+# Requests allowed to wait for a worker before new ones are refused
+ASYNC_MAX_QUEUE = int(os.environ.get("ASYNC_MAX_QUEUE", "32"))
+# Status for refused requests: 503 (server overloaded) or 429 (client should back off)
+ASYNC_OVERLOAD_STATUS = int(os.environ.get("ASYNC_OVERLOAD_STATUS", "503"))
+# Default and maximum deadline per request; clients may ask for less with X-Request-Timeout-Ms
+REQUEST_TIMEOUT_MS = float(os.environ.get("REQUEST_TIMEOUT_MS", "10000"))
+
+pool = InferencePool(ASYNC_WORKERS, ASYNC_MAX_QUEUE)
+
+def request_timeout(request):
+    """Deadline of a request in seconds (X-Request-Timeout-Ms, capped at REQUEST_TIMEOUT_MS)."""
+    try:
+        requested = float(request.headers.get("X-Request-Timeout-Ms", REQUEST_TIMEOUT_MS))
+    except ValueError:
+        requested = REQUEST_TIMEOUT_MS
+    return max(min(requested, REQUEST_TIMEOUT_MS), 1) / 1000
+
+async def request_json(request):
+    """Body parsed as JSON, or None when it is missing or malformed (as Flask's get_json(silent))."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def run_pipeline(request, fn, *args):
+    """
+    Run ``fn(*args)`` on the inference pool for ``request``.
+    Returns (result, None) or (None, error response).
+    """
+    try:
+        result = await pool.run(fn, *args, timeout=request_timeout(request),
+                                is_disconnected=request.is_disconnected)
+        return result, None
+    except Overloaded:
+        return None, JSONResponse({"error": "Server busy, try again shortly"},
+                                  status_code=ASYNC_OVERLOAD_STATUS, headers={"Retry-After": "1"})
+    except DeadlineExceeded:
+        return None, JSONResponse({"error": "Request deadline exceeded"}, status_code=504)
+
+async def pooled_stream(request, chunks, first, mimetype):
+    """
+    Send ``first`` and then the rest of the blocking ``chunks`` generator,
+    advancing it on the inference pool one chunk at a time within the
+    request's deadline. A refusal or timeout mid-stream ends it with an error frame.
+    """
+    deadline = time.monotonic() + request_timeout(request)
+    chunk = first
+    while chunk is not None:
+        yield chunk
+        try:
+            chunk = await pool.run(next, chunks, None, timeout=max(deadline - time.monotonic(), 0.001),
+                                   is_disconnected=request.is_disconnected)
+        except (Overloaded, DeadlineExceeded) as e:
+            yield encode_frame({"type": "error", "error": str(e)}, mimetype)
+            return
+
+async def health(request):
+    """Health check endpoint, including the loaded index version and the pool's load."""
+    return JSONResponse({
+        "status": "healthy",
+        "message": "RAG Professor Review API is running",
+        "index": index_status(),
+        "inference_pool": pool.stats()
+    })
+
+async def ready(request):
+    """Readiness check: 503 until the embedding model and the index are loaded (see app.py)."""
+    startup.start_preload()
+    is_ready, details = startup.readiness()
+    return JSONResponse({"ready": is_ready, **details}, status_code=200 if is_ready else 503)
+
+async def metrics(request):
+    """Prometheus metrics (see app.py), plus the inference pool's counters."""
+    return Response(render_metrics(pool.stats()), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+async def admin_reload(request):
+    """Reload the index from disk and swap it in atomically (off the event loop)."""
+    if not admin_allowed(request.headers.get("X-Admin-Token"), request.client.host if request.client else None):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+
+    try:
+        # Not on the inference pool: a reload must not be refused or time out under load
+        return JSONResponse(await run_in_threadpool(reload_index))
+    except Exception as e:
+        logger.error("Error in admin_reload: %s", e)
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+async def search_professors(request, data=None, allow_streaming=True):
+    """Main search endpoint; same body and response (including streaming) as app.py's /api/search."""
+    try:
+        if data is None:
+            data = await request_json(request)
+        try:
+            user_query, filters, weights = parse_search_request(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        logger.debug("Processing query: %s", user_query)
+
+        mimetype = streaming_mimetype(request.headers.get("Accept")) if allow_streaming else None
+        if mimetype:
+            # The first frame is produced before the response starts, so a
+            # refused request still gets its status code
+            chunks = encoded_stream(user_query, filters, weights, mimetype)
+            first, error = await run_pipeline(request, next, chunks, None)
+            if error is not None:
+                return error
+            return StreamingResponse(pooled_stream(request, chunks, first, mimetype), media_type=mimetype,
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        found, error = await run_pipeline(request, search, user_query, filters, weights)
+        if error is not None:
+            return error
+
+        result, cache_status = found
+        return JSONResponse(result, headers={"X-Cache": cache_status})
+
+    except Exception as e:
+        logger.error("Error in search_professors: %s", e)
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+async def search_professors_batch(request):
+    """Batch search endpoint; same body and response as app.py's /api/search/batch."""
+    try:
+        try:
+            queries, filters, weights = parse_batch_request(await request_json(request))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        logger.debug("Processing batch of %d queries", len(queries))
+        results, error = await run_pipeline(request, run_batch_search, queries, filters, weights)
+        if error is not None:
+            return error
+
+        return JSONResponse({
+            "results": results,
+            "count": len(results),
+            "errors": sum(1 for result in results if "error" in result)
+        })
+
+    except Exception as e:
+        logger.error("Error in search_professors_batch: %s", e)
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+async def process(request):
+    """Legacy endpoint for backward compatibility."""
+    data = await request_json(request)
+    if isinstance(data, dict) and 'text' in data:
+        # Convert old format to new format
+        data['query'] = data['text']
+
+    # Always one JSON body, whatever the Accept header asks for
+    response = await search_professors(request, data, allow_streaming=False)
+    if response.status_code == 200:
+        search_data = json.loads(response.body)
+        # Adapt to frontend expectations
+        return JSONResponse({
+            "llm_answer": search_data.get("answer"),
+            "matches": search_data.get("professors", [])
+        }, headers={"X-Cache": response.headers.get("X-Cache", "BYPASS")})
+    return response
+
+@asynccontextmanager
+async def lifespan(app):
+    # Runs in each server process, after any fork
+    startup.mark_imported()
+    if startup.PRELOAD:
+        startup.start_preload()
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/ready", ready, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/admin/reload", admin_reload, methods=["POST"]),
+        Route("/api/search", search_professors, methods=["POST"]),
+        Route("/api/search/batch", search_professors_batch, methods=["POST"]),
+        Route("/api/process", process, methods=["POST"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    print("Starting RAG Professor Review API (async mode)...")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
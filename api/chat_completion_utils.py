@@ -1,4 +1,7 @@
 import re
+from log_utils import get_logger
+
+logger = get_logger(__name__)
 
 def detect_subject(query):
     """Detect subject from user query."""
@@ -34,37 +37,41 @@ def detect_subject(query):
     
     return None
 
+# Create subject mapping for better matching
+SUBJECT_KEYWORDS = {
+    'math': ['math', 'calculus', 'algebra', 'statistics', 'geometry'],
+    'computer': ['computer', 'data', 'programming', 'software', 'cs'],
+    'chemistry': ['chemistry', 'organic', 'inorganic', 'chemical'],
+    'physics': ['physics', 'mechanics', 'quantum'],
+    'psychology': ['psychology', 'psych', 'cognitive', 'behavioral'],
+    'medical': ['nursing', 'medical', 'health', 'medicine'],
+    'english': ['english', 'writing', 'literature', 'creative writing', 'composition']
+}
+
+def subject_relevance(metadata, target_subject):
+    """Number of the subject's keywords found in a professor's subject or department."""
+    subject = metadata.get('subject', '').lower()
+    department = metadata.get('department', '').lower()
+    
+    # Check if subject matches any keywords
+    relevance_score = 0
+    for keyword in SUBJECT_KEYWORDS.get(target_subject, []):
+        if keyword in subject or keyword in department:
+            relevance_score += 1
+    return relevance_score
+
 def filter_by_subject(professors, target_subject):
     """Filter professors by subject relevance."""
     if not target_subject:
         return professors
     
-    # Create subject mapping for better matching
-    subject_keywords = {
-        'math': ['math', 'calculus', 'algebra', 'statistics', 'geometry'],
-        'computer': ['computer', 'data', 'programming', 'software', 'cs'],
-        'chemistry': ['chemistry', 'organic', 'inorganic', 'chemical'],
-        'physics': ['physics', 'mechanics', 'quantum'],
-        'psychology': ['psychology', 'psych', 'cognitive', 'behavioral'],
-        'medical': ['nursing', 'medical', 'health', 'medicine'],
-        'english': ['english', 'writing', 'literature', 'creative writing', 'composition']
-    }
-    
-    keywords = subject_keywords.get(target_subject, [])
-    if not keywords:
+    if not SUBJECT_KEYWORDS.get(target_subject):
         return professors
     
     # Score professors by subject relevance
     scored_profs = []
     for prof in professors:
-        subject = prof.get('metadata', {}).get('subject', '').lower()
-        department = prof.get('metadata', {}).get('department', '').lower()
-        
-        # Check if subject matches any keywords
-        relevance_score = 0
-        for keyword in keywords:
-            if keyword in subject or keyword in department:
-                relevance_score += 1
+        relevance_score = subject_relevance(prof.get('metadata', {}), target_subject)
         
         if relevance_score > 0:
             prof['subject_relevance'] = relevance_score
@@ -91,35 +98,49 @@ def detect_query_intent(query):
     else:
         return 'search'
 
-def generate_smart_response(user_query, matches):
+NO_RESULTS_ANSWER = "No professors found matching your query. Try a different search term."
+
+def select_professors(user_query, matches):
     """
-    Generate a contextual response based on query intent and results.
+    The professors an answer is about: the matches relevant to the query's
+    subject (if any), top 3. Returns (professors, target_subject).
     """
-    if not matches:
-        return {"answer": "No professors found matching your query. Try a different search term."}
-    
-    # Detect subject and filter if relevant
     target_subject = detect_subject(user_query)
-    if target_subject:
+    if target_subject and matches:
         filtered_matches = filter_by_subject(matches, target_subject)
-        print(f"Subject '{target_subject}' detected. Filtered from {len(matches)} to {len(filtered_matches)} professors.")
+        logger.debug("Subject '%s' detected. Filtered from %d to %d professors.",
+                     target_subject, len(matches), len(filtered_matches))
     else:
         filtered_matches = matches
     
     # Limit to top 3 for cleaner responses
-    top_matches = filtered_matches[:3]
+    return filtered_matches[:3], target_subject
+
+def generate_answer(user_query, professors, target_subject):
+    """Answer text for the professors chosen by select_professors."""
+    if not professors:
+        return NO_RESULTS_ANSWER
+    
     intent = detect_query_intent(user_query)
     
     # Generate response based on intent
     if intent == 'list_all':
-        answer = generate_list_response(top_matches)
+        return generate_list_response(professors)
     elif intent == 'recommend':
-        answer = generate_recommendation_response(user_query, top_matches, target_subject)
+        return generate_recommendation_response(user_query, professors, target_subject)
     else:
-        answer = generate_search_response(user_query, top_matches, target_subject)
+        return generate_search_response(user_query, professors, target_subject)
+
+def generate_smart_response(user_query, matches):
+    """
+    Generate a contextual response based on query intent and results.
+    """
+    if not matches:
+        return {"answer": NO_RESULTS_ANSWER}
     
+    top_matches, target_subject = select_professors(user_query, matches)
     return {
-        "answer": answer,
+        "answer": generate_answer(user_query, top_matches, target_subject),
         "filtered_professors": top_matches  # Return filtered results for consistency
     }
 
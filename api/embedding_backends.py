@@ -0,0 +1,139 @@
+"""
+Embedding backends: the engines behind embedding_utils.get_model().
+
+Every backend has the ``encode`` signature of SentenceTransformer.encode
+(a string gives one vector, a list gives a matrix; vectors are float32 and
+L2-normalized), so callers do not care which one is loaded.
+
+- ``torch``: SentenceTransformer on PyTorch (the default).
+- ``onnx``: the same transformer exported to ONNX by
+  ``scripts/export_onnx.py`` and run with ONNX Runtime, optionally with
+  int8 dynamic quantization. It loads from a local directory only (no
+  network access) and needs neither torch nor sentence_transformers.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+# Directory written by scripts/export_onnx.py
+ONNX_MODEL_DIR = Path(os.environ.get("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-onnx"))
+# Run the int8 dynamically quantized export instead of the float32 one
+ONNX_QUANTIZED = os.environ.get("ONNX_QUANTIZED", "0") == "1"
+# Threads per inference call (0 = the engine's default)
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+ONNX_CONFIG_FILE = "export_config.json"
+
+
+def backend_key(model_name, backend=EMBEDDING_BACKEND, quantized=ONNX_QUANTIZED):
+    """
+    Identity of the vectors a backend produces, for cache keys and index
+    build info. Torch keeps the bare model name so existing indexes and
+    caches stay valid.
+    """
+    if backend == "torch":
+        return model_name
+    return f"{model_name}:{backend}{'-int8' if quantized else ''}"
+
+
+class TorchBackend:
+    """SentenceTransformer on PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_name, num_threads=0):
+        # Imported here: torch takes seconds to import and is not needed by the ONNX backend
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                 show_progress_bar=show_progress_bar, **kwargs)
+
+
+class OnnxBackend:
+    """Exported transformer on ONNX Runtime with mean pooling and L2 normalization."""
+
+    name = "onnx"
+
+    def __init__(self, model_name, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, num_threads=0):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(f"EMBEDDING_BACKEND=onnx needs onnxruntime and tokenizers: {e}") from e
+
+        model_dir = Path(model_dir)
+        config_path = model_dir / ONNX_CONFIG_FILE
+        model_path = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not config_path.exists() or not model_path.exists():
+            raise RuntimeError(f"ONNX model not found at {model_path}; "
+                               f"run: python scripts/export_onnx.py{' --quantize' if quantized else ''}")
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if config.get("model_name") != model_name:
+            raise RuntimeError(f"{model_dir} holds an export of {config.get('model_name')}, not {model_name}")
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 0))
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.quantized = quantized
+        self.dim = config["dim"]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+        # Mean over real tokens, then unit length (the Pooling and Normalize
+        # modules of the SentenceTransformer pipeline)
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        # Sorting by length keeps padding within each batch small
+        order = sorted(range(len(texts)), key=lambda position: len(texts[position]))
+        embeddings = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            positions = order[start:start + batch_size]
+            for position, embedding in zip(positions, self._encode_batch([texts[p] for p in positions])):
+                embeddings[position] = embedding
+        embeddings = np.stack(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def create_backend(model_name, backend=EMBEDDING_BACKEND, num_threads=EMBEDDING_THREADS):
+    """Instantiate the configured backend; raises ValueError for an unknown name."""
+    if backend == "torch":
+        return TorchBackend(model_name, num_threads=num_threads)
+    if backend == "onnx":
+        return OnnxBackend(model_name, num_threads=num_threads)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
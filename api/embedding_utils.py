@@ -1,31 +1,249 @@
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from concurrent.futures import Future
+import queue
+import threading
+import time
+import numpy as np
 import os
+from metrics_utils import Histogram
+from startup import phase
+from embedding_backends import create_backend, backend_key, EMBEDDING_BACKEND, EMBEDDING_THREADS
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+# Identity of the vectors the configured backend produces (the model name for torch)
+MODEL_KEY = backend_key(MODEL_NAME)
+
+# Number of query embeddings kept in the LRU cache (0 disables it)
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "1024"))
+
+def normalize_query_text(text):
+    """Cache key for a query: lowercase with collapsed whitespace.
+    The MiniLM tokenizer is uncased, so this never changes the embedding."""
+    return " ".join(text.lower().split())
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings.
+    Keys include the model key so a model or backend swap never serves stale vectors.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name, text):
+        """Return the cached embedding (a tuple of floats) or None."""
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model_name, text, embedding):
+        """Store an embedding, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            self._entries[key] = tuple(embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+query_cache = EmbeddingCache(EMBEDDING_CACHE_SIZE)
+
+# Micro-batching of concurrent query encodes (window 0 disables it)
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", "0"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", "32"))
+
+class MicroBatcher:
+    """
+    Collects single-query encode requests that arrive within a short window
+    (or until ``max_batch_size`` is reached), runs them as one model.encode
+    call on a background thread, and hands each vector back to its caller.
+    """
+
+    def __init__(self, window_ms, max_batch_size):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batch_sizes = Histogram(
+            "embedding_batch_size", "Queries per micro-batched encode call",
+            [1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_wait = Histogram(
+            "embedding_queue_wait_seconds", "Time a query waited for its micro-batch to start",
+            [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25])
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def _ensure_worker(self):
+        # Started lazily so a pre-forked worker gets its own thread
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text):
+        """Queue a text for encoding; returns a Future resolving to a float32 vector."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait.observe(started - enqueued)
+            self.batch_sizes.observe(len(batch))
+
+            try:
+                embeddings = get_model().encode([text for text, _, _ in batch], convert_to_numpy=True)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+    def stats(self):
+        """Batch-size and queue-wait histograms for tuning the window."""
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot()
+        }
+
+micro_batcher = MicroBatcher(EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_MAX_BATCH_SIZE)
 
 # Load the model once globally for efficiency
 model = None
+_model_lock = threading.Lock()
+_model_loader = None
 
-def get_model():
+def get_model(num_threads=None):
+    """
+    The embedding backend selected by EMBEDDING_BACKEND, loaded on first use.
+    ``num_threads`` (first call only) overrides EMBEDDING_THREADS.
+    """
     global model
     if model is None:
-        print("Loading embedding model...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("Model loaded successfully!")
+        # Concurrent first calls (or a background load) share one load
+        with _model_lock:
+            if model is None:
+                logger.info("Loading embedding model (%s backend)...", EMBEDDING_BACKEND)
+                with phase("model_load"):
+                    # The backends import torch / onnxruntime here, not at app import
+                    threads = EMBEDDING_THREADS if num_threads is None else num_threads
+                    model = create_backend(MODEL_NAME, num_threads=threads)
+                logger.info("Model loaded successfully!")
     return model
 
+def model_loaded():
+    """True once the embedding model is ready to encode."""
+    return model is not None
+
+def load_model_in_background():
+    """Start loading the model on a daemon thread (no-op if loaded or already loading)."""
+    global _model_loader
+    with _model_lock:
+        if model is not None or (_model_loader is not None and _model_loader.is_alive()):
+            return
+        _model_loader = threading.Thread(target=get_model, name="embedding-model-loader", daemon=True)
+        _model_loader.start()
+
 def create_embeddings(text: str):
     """
     Create embeddings using sentence-transformers.
     Returns a list of floats representing the text embedding.
+    Repeated queries are served from the LRU query cache; concurrent
+    misses are grouped into one encode call when micro-batching is enabled.
     """
     if not text or not text.strip():
         text = "empty"
     
+    cached = query_cache.get(MODEL_KEY, text)
+    if cached is not None:
+        return list(cached)
+    
     try:
-        model = get_model()
-        # Get embedding and convert to list
-        embedding = model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        if micro_batcher.enabled:
+            embedding = micro_batcher.submit(text).result().tolist()
+        else:
+            model = get_model()
+            # Get embedding and convert to list
+            embedding = model.encode(text, convert_to_numpy=True).tolist()
+        query_cache.put(MODEL_KEY, text, embedding)
+        return embedding
     except Exception as e:
-        print(f"Error creating embedding: {e}")
+        logger.error("Error creating embedding: %s", e)
         # Fallback: return zero vector of standard size
-        return [0.0] * 384
\ No newline at end of file
+        return [0.0] * EMBEDDING_DIM
+
+def create_embeddings_batch(texts, batch_size=64):
+    """
+    Create embeddings for many texts with batched model.encode calls.
+    Returns a float32 array of shape (len(texts), EMBEDDING_DIM).
+
+    Unlike create_embeddings, errors are raised rather than replaced with
+    zero vectors, so a bulk job never silently indexes empty embeddings.
+    """
+    texts = [text if text and text.strip() else "empty" for text in texts]
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    model = get_model()
+    embeddings = model.encode(texts, batch_size=batch_size,
+                              convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(embeddings, dtype=np.float32)
@@ -0,0 +1,109 @@
+"""
+Metadata pre-filter index.
+
+Built once from the columnar metadata store when the vector index is loaded,
+so a filtered query ranks only the matching rows:
+
+- subject categories and tags are precomputed as packed bitmaps (one bit
+  per row) and combined with bitwise AND / AND NOT;
+- department is matched by comparing the interned department codes;
+- ``avg_rating`` and ``num_reviews`` ranges are vectorized comparisons over
+  the numeric columns.
+"""
+import numpy as np
+
+from chat_completion_utils import SUBJECT_KEYWORDS, subject_relevance
+
+
+def _matching_codes(strings, predicate):
+    """Codes of the distinct strings satisfying ``predicate``."""
+    return np.array([code for code, value in enumerate(strings) if predicate(value)], dtype=np.int32)
+
+
+class FilterIndex:
+    """Bitmaps and columns for metadata filtering, built from a MetadataStore."""
+
+    def __init__(self, store):
+        self.count = len(store)
+        self.ratings = store.numeric_column("avg_rating")
+        self.reviews = store.numeric_column("num_reviews")
+        self.subject_codes, self.subjects = store.interned_column("subject")
+        self.department_codes, self.departments = store.interned_column("department")
+        self.tag_row_ids, self.tag_codes, self.tags = store.tag_rows()
+        self.bitmaps = {}
+
+        # Subject categories: evaluate the keyword rule once per distinct
+        # subject/department string instead of once per row
+        for category in SUBJECT_KEYWORDS:
+            subject_hits = _matching_codes(self.subjects, lambda value: subject_relevance({"subject": value}, category) > 0)
+            department_hits = _matching_codes(self.departments, lambda value: subject_relevance({"department": value}, category) > 0)
+            mask = np.isin(self.subject_codes, subject_hits) | np.isin(self.department_codes, department_hits)
+            if mask.any():
+                self.bitmaps[f"subject:{category}"] = np.packbits(mask)
+
+        # Tags: one bitmap per distinct (case-insensitive) tag
+        lowered = {}
+        for code, tag in enumerate(self.tags):
+            lowered.setdefault(tag.lower(), []).append(code)
+        for tag, codes in lowered.items():
+            self.bitmaps[f"tag:{tag}"] = self._pack(self.tag_row_ids[np.isin(self.tag_codes, codes)])
+
+    def _pack(self, rows):
+        """Packed bitmap with the bits of ``rows`` set."""
+        mask = np.zeros(self.count, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _bitmap(self, term):
+        bitmap = self.bitmaps.get(term)
+        if bitmap is None:
+            return np.zeros((self.count + 7) // 8, dtype=np.uint8)
+        return bitmap
+
+    def _department_mask(self, department):
+        codes = _matching_codes(self.departments, lambda value: value.lower() == department.lower())
+        return np.isin(self.department_codes, codes)
+
+    def rows(self, filters):
+        """
+        Rows matching every condition in ``filters``, as a sorted array.
+
+        Supported keys (all optional, combined with AND):
+            subject: subject category from detect_subject (e.g. "math")
+            department: exact department name (case-insensitive)
+            tags: tags that must all be present
+            exclude_tags: tags that must not be present
+            min_rating / max_rating: inclusive avg_rating range
+            min_reviews / max_reviews: inclusive num_reviews range
+
+        Returns None when ``filters`` has no conditions (every row matches).
+        """
+        bitmaps = []
+        if filters.get("subject"):
+            bitmaps.append(self._bitmap(f"subject:{filters['subject']}"))
+        for tag in filters.get("tags") or []:
+            bitmaps.append(self._bitmap(f"tag:{tag.lower()}"))
+        for tag in filters.get("exclude_tags") or []:
+            bitmaps.append(~self._bitmap(f"tag:{tag.lower()}"))
+
+        masks = []
+        if filters.get("department"):
+            masks.append(self._department_mask(filters["department"]))
+        ranges = [
+            (self.ratings, filters.get("min_rating"), filters.get("max_rating")),
+            (self.reviews, filters.get("min_reviews"), filters.get("max_reviews")),
+        ]
+        for column, low, high in ranges:
+            if low is not None:
+                masks.append(column >= low)
+            if high is not None:
+                masks.append(column <= high)
+        if masks:
+            bitmaps.append(np.packbits(np.logical_and.reduce(masks)))
+
+        if not bitmaps:
+            return None
+        combined = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            combined = combined & bitmap
+        return np.flatnonzero(np.unpackbits(combined, count=self.count))
@@ -0,0 +1,38 @@
+"""
+Pre-fork production launcher.
+
+    gunicorn -c gunicorn.conf.py app:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+
+The master imports the app, loads the index and the torch model weights
+once (startup.preload_before_fork) and then forks the workers, which share
+those pages copy-on-write instead of each loading its own copy. The vector
+matrix is memory-mapped from data/local_index.bin, so its pages sit in the
+page cache once for every process on the host regardless of forking.
+"""
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Load the app in the master so the workers inherit it
+preload_app = True
+# Read by startup.py when the app is imported: no preload thread in the
+# master, which must have no thread mid-operation when it forks (the log
+# listener is stopped around each fork by log_utils)
+os.environ["PREFORK"] = "1"
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+
+# Split the cores between workers so model threads do not oversubscribe the CPU
+# (read when the model loads in the master; torch keeps the setting across fork)
+os.environ.setdefault("EMBEDDING_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+
+def when_ready(server):
+    # Master, after the app is imported and before the first fork
+    import startup
+    startup.preload_before_fork()
+
+
+def post_fork(server, worker):
+    import startup
+    startup.after_fork()
@@ -0,0 +1,320 @@
+"""
+Binary on-disk format for the local vector index.
+
+``local_index.bin`` holds a fixed 64-byte header followed by one contiguous,
+row-major float32 matrix (count x dim) that can be memory-mapped as-is.
+Row ids live in a compact JSON sidecar (``local_index.meta.json``) so
+opening the index never parses vectors. Professor metadata is stored column
+by column (see metadata_store.py) in ``local_index.columns.bin``: a small
+JSON manifest followed by 64-byte aligned arrays that are memory-mapped on
+load rather than rebuilt from per-row dicts.
+
+The header records a magic string, the format version, the matrix shape,
+flags and CRC32 checksums of both the matrix and the sidecar; the sidecar
+records the checksum of the columns file. A mismatched or truncated set of
+files is detected on load. Sidecars written before the columns file existed
+keep the metadata as per-row dicts and are still read.
+"""
+import itertools
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from pathlib import Path
+
+from metadata_store import MetadataStore
+
+MAGIC = b"RMPIDX\x00\x00"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+# magic, version, flags, count, dim, vectors crc32, metadata crc32
+HEADER_STRUCT = struct.Struct("<8sIIQIII")
+
+# Rows are stored L2-normalized, ready for cosine similarity via dot product
+FLAG_NORMALIZED = 1
+# Rows normalized and written per block by write_binary_index
+WRITE_BLOCK_ROWS = 65536
+
+COLUMNS_MAGIC = b"RMPCOL\x00\x00"
+# magic, manifest length, crc32 of everything after the header
+COLUMNS_HEADER_STRUCT = struct.Struct("<8sQI")
+# Arrays start on this boundary so memory-mapped views are aligned
+COLUMNS_ALIGNMENT = 64
+
+
+class IndexFormatError(ValueError):
+    """Raised when an index file is missing, corrupt or of an unknown version."""
+
+
+def metadata_path(index_path):
+    """Return the sidecar path for a binary index file."""
+    return Path(index_path).with_suffix(".meta.json")
+
+
+def columns_path(index_path):
+    """Return the path of the columnar metadata file for a binary index."""
+    return Path(index_path).with_suffix(".columns.bin")
+
+
+def ann_path(index_path):
+    """Return the path of the ANN (IVF) structure built for a binary index."""
+    return Path(index_path).with_suffix(".ivf.npz")
+
+
+def quantized_path(index_path, mode):
+    """Return the path of the quantized copy (``float16`` or ``int8``) of a binary index."""
+    return Path(index_path).with_suffix(f".{mode}.npz")
+
+
+def shard_path(index_path, shard, shards):
+    """Return the path of shard ``shard`` of ``shards`` split from a binary index."""
+    return Path(index_path).with_suffix(f".shard-{shard:02d}-of-{shards:02d}.bin")
+
+
+def index_version(header):
+    """Version string identifying an index's contents, derived from its checksums."""
+    return f"{header['vectors_crc32']:08x}{header['metadata_crc32']:08x}"
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row of a float32 matrix (zero rows are left as-is)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def _atomic_write(path, payload):
+    """Write bytes (or an iterable of byte chunks) to a temp file and rename it over ``path``."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    chunks = [payload] if isinstance(payload, (bytes, bytearray)) else payload
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _padding(size):
+    return b"\x00" * (-size % COLUMNS_ALIGNMENT)
+
+
+def _columns_file(store):
+    """(bytes chunks, crc32 of the payload) of the columns file for a MetadataStore."""
+    manifest, arrays = store.to_columns()
+    blobs, layout, offset = [], {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        blob = array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes()
+        layout[name] = {"dtype": array.dtype.newbyteorder("<").str, "shape": list(array.shape), "offset": offset}
+        blobs += [blob, _padding(len(blob))]
+        offset += len(blob) + len(blobs[-1])
+    manifest["arrays"] = layout
+
+    manifest_bytes = json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    # Arrays start at an aligned offset after the header and manifest
+    payload = [manifest_bytes, _padding(COLUMNS_HEADER_STRUCT.size + len(manifest_bytes))] + blobs
+    crc32 = 0
+    for chunk in payload:
+        crc32 = zlib.crc32(chunk, crc32)
+    header = COLUMNS_HEADER_STRUCT.pack(COLUMNS_MAGIC, len(manifest_bytes), crc32)
+    return [header] + payload, crc32
+
+
+def read_columns(path, expected_crc32=None, verify=False):
+    """
+    Open a columns file as a MetadataStore whose arrays are read-only views
+    of one memory map.
+
+    Args:
+        path: Path to the ``.columns.bin`` file
+        expected_crc32: Checksum recorded in the sidecar (a file from another write is rejected)
+        verify: Also checksum the whole file (reads every page)
+    """
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(raw) < COLUMNS_HEADER_STRUCT.size:
+        raise IndexFormatError(f"{path} is too short to be a columns file")
+    magic, manifest_size, crc32 = COLUMNS_HEADER_STRUCT.unpack(raw[:COLUMNS_HEADER_STRUCT.size].tobytes())
+    if magic != COLUMNS_MAGIC:
+        raise IndexFormatError(f"{path} is not a columns file")
+    if expected_crc32 is not None and crc32 != expected_crc32:
+        raise IndexFormatError("Columns file checksum does not match the metadata sidecar")
+    if verify and zlib.crc32(raw[COLUMNS_HEADER_STRUCT.size:]) != crc32:
+        raise IndexFormatError("Columns file contents do not match their checksum")
+
+    start = COLUMNS_HEADER_STRUCT.size + manifest_size
+    manifest = json.loads(raw[COLUMNS_HEADER_STRUCT.size:start].tobytes())
+    start += len(_padding(start))
+    arrays = {}
+    for name, layout in manifest.pop("arrays").items():
+        dtype = np.dtype(layout["dtype"])
+        begin = start + layout["offset"]
+        end = begin + dtype.itemsize * int(np.prod(layout["shape"]))
+        if end > len(raw):
+            raise IndexFormatError(f"{path} is truncated")
+        # Plain ndarray views: the memory map stays open through their base
+        arrays[name] = np.asarray(raw[begin:end]).view(dtype).reshape(layout["shape"])
+    return MetadataStore.from_columns(manifest, arrays)
+
+
+def write_binary_index(index_path, ids, vectors, metadata, info=None, dim=384):
+    """
+    Write vectors and metadata in the binary index format.
+
+    Args:
+        index_path: Destination ``.bin`` path (sidecar is written next to it)
+        ids: List of row ids, one per vector
+        vectors: Array-like of shape (count, dim)
+        metadata: List of metadata dicts (or a MetadataStore), one per vector
+        info: Optional dict of build information stored in the sidecar
+        dim: Vector dimension used when ``vectors`` is empty
+
+    Returns:
+        The header fields that were written, as a dict.
+    """
+    index_path = Path(index_path)
+    if len(ids) != len(metadata):
+        raise ValueError("ids and metadata must have the same length")
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.size == 0:
+        matrix = np.zeros((0, dim), dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError(f"Expected {len(ids)} vectors, got shape {matrix.shape}")
+
+    # Normalized and serialized a block at a time (twice: checksum, then write),
+    # so a large matrix is never copied whole
+    def vector_blocks():
+        for start in range(0, matrix.shape[0], WRITE_BLOCK_ROWS):
+            block = normalize_rows(np.asarray(matrix[start:start + WRITE_BLOCK_ROWS], dtype=np.float32))
+            yield np.ascontiguousarray(block, dtype="<f4").tobytes()
+
+    vectors_crc32 = 0
+    for block in vector_blocks():
+        vectors_crc32 = zlib.crc32(block, vectors_crc32)
+
+    store = metadata if isinstance(metadata, MetadataStore) else MetadataStore.from_records(list(metadata))
+    columns_chunks, columns_crc32 = _columns_file(store)
+
+    sidecar = {
+        "format_version": FORMAT_VERSION,
+        "info": info or {},
+        "ids": list(ids),
+        "columns_crc32": columns_crc32,
+    }
+    meta_bytes = json.dumps(sidecar, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    header = {
+        "version": FORMAT_VERSION,
+        "flags": FLAG_NORMALIZED,
+        "count": matrix.shape[0],
+        "dim": matrix.shape[1],
+        "vectors_crc32": vectors_crc32,
+        "metadata_crc32": zlib.crc32(meta_bytes),
+    }
+    header_bytes = HEADER_STRUCT.pack(
+        MAGIC, header["version"], header["flags"], header["count"],
+        header["dim"], header["vectors_crc32"], header["metadata_crc32"],
+    ).ljust(HEADER_SIZE, b"\x00")
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Columns, then sidecar, then matrix: a reader never sees a new file
+    # paired with an old one without a checksum catching it.
+    _atomic_write(columns_path(index_path), columns_chunks)
+    _atomic_write(metadata_path(index_path), meta_bytes)
+    _atomic_write(index_path, itertools.chain([header_bytes], vector_blocks()))
+    return header
+
+
+def read_header(index_path):
+    """Read and validate the fixed-size header of a binary index file."""
+    with open(index_path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise IndexFormatError(f"{index_path} is too short to be an index file")
+
+    magic, version, flags, count, dim, vectors_crc, meta_crc = HEADER_STRUCT.unpack_from(raw)
+    if magic != MAGIC:
+        raise IndexFormatError(f"{index_path} is not a binary index file")
+    if version != FORMAT_VERSION:
+        raise IndexFormatError(f"Unsupported index format version {version} (expected {FORMAT_VERSION})")
+
+    expected_size = HEADER_SIZE + count * dim * 4
+    actual_size = os.path.getsize(index_path)
+    if actual_size != expected_size:
+        raise IndexFormatError(f"{index_path} is {actual_size} bytes, expected {expected_size}")
+
+    return {
+        "version": version,
+        "flags": flags,
+        "count": count,
+        "dim": dim,
+        "vectors_crc32": vectors_crc,
+        "metadata_crc32": meta_crc,
+    }
+
+
+def read_binary_index(index_path, verify_vectors=False):
+    """
+    Open a binary index without copying the vectors.
+
+    The matrix is returned as a read-only ``np.memmap``; pages are loaded
+    lazily by the OS and shared between processes mapping the same file.
+
+    Args:
+        index_path: Path to the ``.bin`` file
+        verify_vectors: Also checksum the full matrix and the columns file
+            (reads every page)
+
+    Returns:
+        Tuple of (header, vectors, ids, metadata, info); ``metadata`` is a
+        MetadataStore, or a list of dicts for a sidecar in the older layout.
+    """
+    index_path = Path(index_path)
+    header = read_header(index_path)
+
+    with open(metadata_path(index_path), "rb") as f:
+        meta_bytes = f.read()
+    if zlib.crc32(meta_bytes) != header["metadata_crc32"]:
+        raise IndexFormatError("Metadata sidecar checksum does not match index header")
+    sidecar = json.loads(meta_bytes)
+
+    count, dim = header["count"], header["dim"]
+    if count:
+        vectors = np.memmap(index_path, dtype="<f4", mode="r", offset=HEADER_SIZE, shape=(count, dim))
+    else:
+        vectors = np.zeros((0, dim), dtype=np.float32)
+
+    if verify_vectors and zlib.crc32(vectors) != header["vectors_crc32"]:
+        raise IndexFormatError("Vector matrix checksum does not match index header")
+
+    ids = sidecar["ids"]
+    if "columns_crc32" in sidecar:
+        metadata = read_columns(columns_path(index_path), sidecar["columns_crc32"], verify=verify_vectors)
+    else:
+        metadata = sidecar["metadata"]
+    if len(ids) != count or len(metadata) != count:
+        raise IndexFormatError("Metadata sidecar row count does not match index header")
+
+    return header, vectors, ids, metadata, sidecar.get("info", {})
+
+
+def convert_json_index(json_path, index_path):
+    """
+    Convert a legacy ``local_index.json`` into the binary format.
+
+    Returns:
+        Number of rows written.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    ids = [entry["id"] for entry in entries]
+    metadata = [entry.get("metadata", {}) for entry in entries]
+    vectors = [entry["vector"] for entry in entries]
+    dim = len(vectors[0]) if vectors else 384
+
+    write_binary_index(index_path, ids, vectors, metadata,
+                       info={"source": str(json_path)}, dim=dim)
+    return len(entries)
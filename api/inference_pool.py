@@ -0,0 +1,123 @@
+"""
+Bounded thread pool for the CPU-bound part of a request (embed, search,
+rerank, response generation) in the async serving mode.
+
+Admission control: at most ``workers`` calls run and ``max_queue`` wait;
+anything beyond is rejected at once with Overloaded instead of queueing
+without bound. Every call carries a deadline. A call still queued when its
+deadline passes (or its client disconnects) is dropped without running,
+and a running call stops at its next check_deadline() (the pipeline checks
+between stages). Neither can interrupt a single model.encode in progress.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# How often a waiting request checks whether its client disconnected
+DISCONNECT_POLL_SECONDS = 0.05
+
+_current = threading.local()
+
+
+class Overloaded(RuntimeError):
+    """Raised when the pool's run slots and queue are all taken."""
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when a call outlives its deadline or its client."""
+
+
+class _Call:
+    __slots__ = ("deadline", "cancelled")
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.cancelled = False
+
+    def expired(self):
+        return self.cancelled or time.monotonic() > self.deadline
+
+
+def check_deadline():
+    """
+    Raise DeadlineExceeded if the call running on this thread was cancelled
+    or is past its deadline. No-op outside the pool (e.g. in the Flask app).
+    """
+    call = getattr(_current, "call", None)
+    if call is not None and call.expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+class InferencePool:
+    """Thread pool with a bounded queue and per-call deadlines."""
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self.inflight -= 1
+
+    def _run(self, call, fn, args):
+        if call.expired():
+            # Waited in the queue past its deadline: skip the work entirely
+            raise DeadlineExceeded("Request deadline exceeded while queued")
+        _current.call = call
+        try:
+            return fn(*args)
+        finally:
+            _current.call = None
+
+    async def run(self, fn, *args, timeout, is_disconnected=None):
+        """
+        Run ``fn(*args)`` on the pool and return its result. Raises
+        Overloaded when the queue is full, DeadlineExceeded after
+        ``timeout`` seconds or once ``is_disconnected()`` returns True.
+        """
+        with self._lock:
+            if self.inflight >= self.capacity:
+                self.rejected += 1
+                raise Overloaded(f"{self.inflight} requests in flight")
+            self.inflight += 1
+
+        call = _Call(time.monotonic() + timeout)
+        future = self._executor.submit(self._run, call, fn, args)
+        # Freed when the call finishes, fails, or is cancelled before it starts
+        future.add_done_callback(self._release)
+        waiter = asyncio.wrap_future(future)
+
+        while True:
+            remaining = call.deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            poll = min(remaining, DISCONNECT_POLL_SECONDS) if is_disconnected else remaining
+            done, _ = await asyncio.wait({waiter}, timeout=poll)
+            if done:
+                return waiter.result()
+            if is_disconnected and await is_disconnected():
+                break
+
+        call.cancelled = True
+        future.cancel()
+        # The wrapped future may still finish; nobody reads its result
+        waiter.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+        with self._lock:
+            self.expired += 1
+        raise DeadlineExceeded("Request deadline exceeded")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "inflight": self.inflight,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
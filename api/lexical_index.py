@@ -0,0 +1,102 @@
+"""
+In-process BM25 index over the text metadata of the vector index.
+
+Built from the metadata store when the index is loaded: every row's
+``full_text``, ``tags`` and ``bio`` are tokenized into one document, and
+postings are kept in CSR form (per-term slices of row ids and term
+frequencies) so scoring a query touches only the postings of its terms.
+"""
+import math
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+LEXICAL_FIELDS = ("full_text", "tags", "bio")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its me my of on or "
+    "that the their they this to was who with".split()
+    # Boilerplate of seed_index.create_professor_text, present in every row
+    + "professor teaches department rating out stars reviews known student feedback".split()
+)
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_text(metadata):
+    """Text indexed for one row (its ``LEXICAL_FIELDS``, name when there is no full_text)."""
+    parts = []
+    if not metadata.get("full_text"):
+        parts.append(metadata.get("name") or "")
+    for field in LEXICAL_FIELDS:
+        value = metadata.get(field)
+        if isinstance(value, list):
+            parts.extend(str(item) for item in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+class BM25Index:
+    """Okapi BM25 over one document per index row."""
+
+    def __init__(self, vocabulary, offsets, rows, frequencies, lengths, k1=1.2, b=0.75):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+
+        self.count = len(lengths)
+        average = max(float(lengths.mean()), 1.0) if self.count else 1.0
+        # Per-row length normalization of the BM25 denominator
+        self._norm = (k1 * (1 - b + b * lengths / average)).astype(np.float32)
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def build(cls, store, k1=1.2, b=0.75):
+        """Tokenize every row of a MetadataStore into postings."""
+        vocabulary = {}
+        term_ids, row_ids, counts = array("q"), array("q"), array("q")
+        lengths = np.zeros(len(store), dtype=np.float32)
+
+        for row in range(len(store)):
+            tokens = tokenize(document_text(store.row(row)))
+            lengths[row] = len(tokens)
+            for token, frequency in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                row_ids.append(row)
+                counts.append(frequency)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+
+        rows = np.frombuffer(row_ids, dtype=np.int64)[order].astype(np.int32)
+        frequencies = np.frombuffer(counts, dtype=np.int64)[order].astype(np.float32)
+        return cls(vocabulary, offsets, rows, frequencies, lengths, k1, b)
+
+    def scores(self, text):
+        """BM25 score of every row for ``text`` (0 for rows sharing no term)."""
+        scores = np.zeros(self.count, dtype=np.float32)
+        for token in set(tokenize(text)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            rows = self.rows[start:end]
+            frequencies = self.frequencies[start:end]
+            idf = math.log(1 + (self.count - (end - start) + 0.5) / ((end - start) + 0.5))
+            # Each row appears once per term, so fancy-index accumulation is safe
+            scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + self._norm[rows])
+        return scores
@@ -0,0 +1,74 @@
+"""
+Leveled, non-blocking logging for the serving path.
+
+Records are put on an in-memory queue by the calling thread and written to
+stdout by a background listener thread, so a request never waits on a slow
+or blocked stdout. Records below LOG_LEVEL are dropped before they are
+formatted. The listener is stopped (after writing every queued record)
+before each fork, so no thread is holding stdout or a handler lock when a
+child (gunicorn worker, shard worker) is forked; it is restarted in the
+parent, and started afresh in the child, which does not inherit threads.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+# DEBUG, INFO, WARNING or ERROR; per-request lines are DEBUG
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+
+_logger = logging.getLogger("api")
+_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+_listener = None
+_lock = threading.Lock()
+# Whether the listener was running when it was stopped for a fork
+_paused = False
+
+def _start_listener():
+    global _listener
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _listener = logging.handlers.QueueListener(_handler.queue, handler, respect_handler_level=False)
+    _listener.start()
+
+def _stop_before_fork():
+    global _paused
+    _paused = _listener is not None and _listener._thread is not None
+    _stop_listener()
+
+def _restart_in_parent():
+    if _paused:
+        _listener.start()
+
+def _restart_in_child():
+    # Records still queued at the fork are the parent's to write
+    _handler.queue = queue.SimpleQueue()
+    _start_listener()
+
+def _stop_listener():
+    # Writes every queued record, then joins the thread
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+def _configure():
+    with _lock:
+        if _logger.handlers:
+            return
+        _logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        _logger.addHandler(_handler)
+        # Records stop here rather than reaching a root handler as well
+        _logger.propagate = False
+        _start_listener()
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(before=_stop_before_fork, after_in_parent=_restart_in_parent,
+                                after_in_child=_restart_in_child)
+
+def get_logger(name):
+    """Logger for a module of the API, e.g. get_logger(__name__)."""
+    _configure()
+    return _logger.getChild(name)
@@ -0,0 +1,310 @@
+"""
+Columnar metadata store for the vector index.
+
+Instead of one dict per row, metadata is kept column by column:
+
+- numeric fields (``avg_rating``, ``num_reviews``) as numpy arrays;
+- low-cardinality strings (``subject``, ``department``, ``tags``) and the
+  strings repeated across rows of a review-level index (``professor_id``,
+  ``row_type``) as integer codes into tables of interned strings, with tags
+  in CSR form;
+- other string fields (``bio``, ``full_text``, ...) packed as UTF-8 into one
+  byte buffer per field with an offsets array;
+- anything else (non-string values) as a plain list column.
+
+Search results get a ``MetadataRow``: a read-only mapping with ``__slots__``
+that reads the columns on access, so no per-row dicts exist at rest and a
+query only allocates views for the rows it returns.
+
+``to_columns`` / ``from_columns`` split a store into numpy arrays plus a small
+JSON-able manifest (field order, string tables, non-string columns), which
+``index_format`` writes next to the binary index and memory-maps on load, so
+opening an index does not rebuild the columns from per-row dicts.
+"""
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+NUMERIC_FIELDS = {"avg_rating": np.float64, "num_reviews": np.int64}
+INTERNED_FIELDS = ("subject", "department", "professor_id", "row_type")
+TAG_FIELD = "tags"
+
+# Marks a field a row does not have in list columns
+_MISSING = object()
+
+
+class StringTable:
+    """Interned strings addressed by integer code."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    @classmethod
+    def from_values(cls, values):
+        table = cls()
+        table.values = values
+        # Only needed to add strings, so built on first use
+        table._codes = None
+        return table
+
+    def code(self, value):
+        if self._codes is None:
+            self._codes = {string: code for code, string in enumerate(self.values)}
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(sys.intern(value))
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class TextColumn:
+    """Strings packed into one UTF-8 buffer; ``missing`` marks rows without a value."""
+
+    def __init__(self, values):
+        encoded = [value.encode("utf-8") if value is not _MISSING else b"" for value in values]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=self.offsets[1:])
+        self.buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        self.missing = np.array([value is _MISSING for value in values], dtype=bool)
+
+    @classmethod
+    def from_arrays(cls, offsets, buffer, missing):
+        column = cls.__new__(cls)
+        column.offsets, column.buffer, column.missing = offsets, buffer, missing
+        return column
+
+    def __getitem__(self, row):
+        if self.missing[row]:
+            return _MISSING
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+
+class MetadataStore:
+    """Parallel-array metadata for every row of the index."""
+
+    def __init__(self, count):
+        self.count = count
+        self.fields = []
+        self.numeric = {}
+        self.numeric_present = {}
+        self.interned = {}
+        self.tag_offsets = np.zeros(count + 1, dtype=np.int64)
+        self.tag_codes = np.empty(0, dtype=np.int32)
+        self.tag_present = np.zeros(count, dtype=bool)
+        self.tags = StringTable()
+        self.columns = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, row):
+        return self.row(row)
+
+    def __iter__(self):
+        return (self.row(row) for row in range(self.count))
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the store from a list of metadata dicts (the sidecar format)."""
+        count = len(records)
+        store = cls(count)
+
+        seen = {}
+        for record in records:
+            for key in record:
+                seen.setdefault(key, None)
+        store.fields = list(seen)
+
+        for field, dtype in NUMERIC_FIELDS.items():
+            if field in seen:
+                values = [record.get(field) for record in records]
+                store.numeric_present[field] = np.array([value is not None for value in values], dtype=bool)
+                store.numeric[field] = np.array([value if value is not None else 0 for value in values], dtype=dtype)
+
+        for field in INTERNED_FIELDS:
+            values = [record.get(field, _MISSING) for record in records]
+            # Non-string values (rare) keep the field as a plain list column
+            if field in seen and all(isinstance(value, str) or value is _MISSING for value in values):
+                table = StringTable()
+                codes = np.array([
+                    table.code(value) if value is not _MISSING else -1 for value in values
+                ], dtype=np.int32)
+                store.interned[field] = (codes, table)
+
+        if TAG_FIELD in seen:
+            tag_codes = []
+            for row, record in enumerate(records):
+                tags = record.get(TAG_FIELD)
+                if tags is not None:
+                    store.tag_present[row] = True
+                    tag_codes.extend(store.tags.code(tag) for tag in tags)
+                store.tag_offsets[row + 1] = len(tag_codes)
+            store.tag_codes = np.array(tag_codes, dtype=np.int32)
+
+        typed = set(store.numeric) | set(store.interned) | {TAG_FIELD}
+        for field in store.fields:
+            if field not in typed:
+                values = [record.get(field, _MISSING) for record in records]
+                if all(isinstance(value, str) or value is _MISSING for value in values):
+                    values = TextColumn(values)
+                store.columns[field] = values
+        return store
+
+    def to_columns(self):
+        """
+        Split the store into (manifest, arrays): ``arrays`` maps names to numpy
+        arrays and ``manifest`` holds the rest as JSON-serializable values.
+        """
+        arrays = {"tag_offsets": self.tag_offsets, "tag_codes": self.tag_codes, "tag_present": self.tag_present}
+        for field in self.numeric:
+            arrays[f"numeric/{field}"] = self.numeric[field]
+            arrays[f"numeric_present/{field}"] = self.numeric_present[field]
+        for field, (codes, _) in self.interned.items():
+            arrays[f"interned/{field}"] = codes
+
+        text, objects = [], {}
+        for field, column in self.columns.items():
+            if isinstance(column, TextColumn):
+                text.append(field)
+                arrays[f"text/{field}/offsets"] = column.offsets
+                arrays[f"text/{field}/buffer"] = column.buffer
+                arrays[f"text/{field}/missing"] = column.missing
+            else:
+                # Non-string values stay JSON; missing rows are marked separately from null
+                objects[field] = [None if value is _MISSING else value for value in column]
+                arrays[f"objects/{field}/missing"] = np.array([value is _MISSING for value in column], dtype=bool)
+
+        manifest = {
+            "count": self.count,
+            "fields": self.fields,
+            "numeric": list(self.numeric),
+            "interned": {field: table.values for field, (_, table) in self.interned.items()},
+            "tags": self.tags.values,
+            "text": text,
+            "objects": objects
+        }
+        return manifest, arrays
+
+    @classmethod
+    def from_columns(cls, manifest, arrays):
+        """Rebuild a store from ``to_columns`` output; the arrays are used as-is (e.g. memory-mapped)."""
+        store = cls(manifest["count"])
+        store.fields = manifest["fields"]
+        for field in manifest["numeric"]:
+            store.numeric[field] = arrays[f"numeric/{field}"]
+            store.numeric_present[field] = arrays[f"numeric_present/{field}"]
+        for field, values in manifest["interned"].items():
+            store.interned[field] = (arrays[f"interned/{field}"], StringTable.from_values(values))
+        store.tag_offsets = arrays["tag_offsets"]
+        store.tag_codes = arrays["tag_codes"]
+        store.tag_present = arrays["tag_present"]
+        store.tags = StringTable.from_values(manifest["tags"])
+
+        # Same column order as from_records
+        objects = manifest["objects"]
+        for field in store.fields:
+            if field in manifest["text"]:
+                store.columns[field] = TextColumn.from_arrays(
+                    arrays[f"text/{field}/offsets"], arrays[f"text/{field}/buffer"], arrays[f"text/{field}/missing"])
+            elif field in objects:
+                missing = arrays[f"objects/{field}/missing"]
+                store.columns[field] = [_MISSING if absent else value for value, absent in zip(objects[field], missing)]
+        return store
+
+    def value(self, row, field):
+        """Value of ``field`` for ``row``; raises KeyError if the row lacks it."""
+        if field in self.numeric:
+            if self.numeric_present[field][row]:
+                return self.numeric[field][row].item()
+        elif field in self.interned:
+            codes, table = self.interned[field]
+            code = codes[row]
+            if code >= 0:
+                return table.values[code]
+        elif field == TAG_FIELD and field in self.fields:
+            if self.tag_present[row]:
+                start, end = self.tag_offsets[row], self.tag_offsets[row + 1]
+                return [self.tags.values[code] for code in self.tag_codes[start:end]]
+        elif field in self.columns:
+            value = self.columns[field][row]
+            if value is not _MISSING:
+                return value
+        raise KeyError(field)
+
+    def has(self, row, field):
+        try:
+            self.value(row, field)
+        except KeyError:
+            return False
+        return True
+
+    def row(self, row):
+        """Lightweight read-only mapping view of one row."""
+        return MetadataRow(self, row)
+
+    def numeric_column(self, field, fill=0):
+        """Numeric column with missing values replaced by ``fill``."""
+        if field not in self.numeric:
+            return np.full(self.count, fill, dtype=NUMERIC_FIELDS.get(field, np.float64))
+        return np.where(self.numeric_present[field], self.numeric[field], fill)
+
+    def interned_column(self, field):
+        """(codes, strings) for an interned field; code -1 means missing."""
+        if field not in self.interned:
+            return np.full(self.count, -1, dtype=np.int32), []
+        codes, table = self.interned[field]
+        return codes, table.values
+
+    def codes(self, field):
+        """Integer code of every row's value of ``field`` (equal values share a code; -1 = missing)."""
+        if field in self.interned:
+            return self.interned[field][0]
+        codes = np.full(self.count, -1, dtype=np.int32)
+        if field in self.columns:
+            seen = {}
+            column = self.columns[field]
+            for row in range(self.count):
+                value = column[row]
+                if value is not _MISSING:
+                    codes[row] = seen.setdefault(value, len(seen))
+        return codes
+
+    def tag_rows(self):
+        """(rows, codes) of every (row, tag) pair, plus the tag strings."""
+        lengths = np.diff(self.tag_offsets)
+        rows = np.repeat(np.arange(self.count, dtype=np.int64), lengths)
+        return rows, self.tag_codes, self.tags.values
+
+
+class MetadataRow(Mapping):
+    """Read-only view of one row of a MetadataStore."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field):
+        return self._store.value(self._row, field)
+
+    def get(self, field, default=None):
+        try:
+            return self._store.value(self._row, field)
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        return (field for field in self._store.fields if self._store.has(self._row, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"MetadataRow({dict(self)!r})"
@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed upper bucket bounds
+    (cumulative counts, like a Prometheus histogram).
+    """
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Cumulative bucket counts plus sum and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding the q-th observation."""
+        snapshot = self.snapshot()
+        if not snapshot["count"]:
+            return 0.0
+        target = q * snapshot["count"]
+        for bound, running in snapshot["buckets"]:
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_histogram(name, histogram, labels=None):
+    """Prometheus text exposition lines of one histogram's samples."""
+    labels = labels or {}
+    snapshot = histogram.snapshot()
+    lines = [f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {running}"
+             for bound, running in snapshot["buckets"]]
+    lines.append(f"{name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+    lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+    return lines
+
+def render_metric(name, kind, description, samples):
+    """
+    Prometheus text exposition of a gauge or counter: ``samples`` is a list
+    of (labels dict or None, value).
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return lines
+
+class HistogramFamily:
+    """Histograms of one metric, one per value of a label (e.g. stage="embed")."""
+
+    def __init__(self, name, description, label, buckets):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value):
+        """The histogram for one label value (created on first use)."""
+        histogram = self._histograms.get(value)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(
+                    value, Histogram(self.name, self.description, self.buckets))
+        return histogram
+
+    def snapshot(self):
+        """Snapshot of every histogram, by label value."""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {value: histogram.snapshot() for value, histogram in histograms.items()}
+
+    def render(self):
+        """Prometheus text exposition of the family."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for value, histogram in histograms:
+            lines.extend(render_histogram(self.name, histogram, {self.label: value}))
+        return lines
+
+# Upper bounds (seconds) for pipeline stage and request latencies
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+STAGE_SECONDS = HistogramFamily(
+    "search_stage_seconds", "Time spent in each stage of the search pipeline", "stage", LATENCY_BUCKETS)
+REQUEST_SECONDS = HistogramFamily(
+    "search_request_seconds", "Search latency by response cache status", "cache", LATENCY_BUCKETS)
+
+def request_histogram(cache_status):
+    return REQUEST_SECONDS.labels(cache_status)
+
+class stage_timer:
+    """Context manager recording the time spent in a block into the histogram of ``stage``."""
+    __slots__ = ("histogram", "_started")
+
+    def __init__(self, stage):
+        self.histogram = STAGE_SECONDS.labels(stage)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._started)
+        return False
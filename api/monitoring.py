@@ -0,0 +1,68 @@
+"""
+The /metrics endpoint in Prometheus text format, shared by the Flask app
+(app.py) and the async app (asgi_app.py): per-stage and per-request
+latency histograms, cache counters and hit rates, the loaded index and
+the startup (model and index load) times.
+"""
+import startup
+from embedding_utils import query_cache, micro_batcher, model_loaded
+from metrics_utils import STAGE_SECONDS, REQUEST_SECONDS, render_metric, render_histogram
+from pinecone_utils import index_status
+from response_cache import response_cache
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CACHE_COUNTERS = {
+    "hits": "Lookups answered from the cache",
+    "misses": "Lookups not found in the cache",
+    "evictions": "Entries evicted to stay within the size limit",
+    "invalidations": "Times the cache was emptied because a new index was loaded"
+}
+
+def cache_metrics(prefix, stats):
+    """Counters, size and hit rate of a cache's stats()."""
+    lines = []
+    for counter, description in CACHE_COUNTERS.items():
+        if counter in stats:
+            lines += render_metric(f"{prefix}_{counter}_total", "counter", description, [(None, stats[counter])])
+    lines += render_metric(f"{prefix}_size", "gauge", "Entries currently cached", [(None, stats["size"])])
+    lines += render_metric(f"{prefix}_hit_rate", "gauge", "Hits per lookup since start", [(None, stats["hit_rate"])])
+    return lines
+
+def pool_metrics(stats):
+    """In-flight, rejected and expired requests of the async app's inference pool."""
+    return (render_metric("inference_pool_inflight", "gauge", "Requests running or queued", [(None, stats["inflight"])])
+            + render_metric("inference_pool_capacity", "gauge", "Requests allowed in flight",
+                            [(None, stats["capacity"])])
+            + render_metric("inference_pool_rejected_total", "counter", "Requests refused because the pool was full",
+                            [(None, stats["rejected"])])
+            + render_metric("inference_pool_expired_total", "counter", "Requests that outlived their deadline",
+                            [(None, stats["expired"])]))
+
+def render_metrics(pool_stats=None):
+    """The /metrics response body (``pool_stats``: the async app's InferencePool.stats())."""
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+    lines += cache_metrics("response_cache", response_cache.stats())
+    lines += cache_metrics("embedding_cache", query_cache.stats())
+
+    if micro_batcher.enabled:
+        for histogram in (micro_batcher.batch_sizes, micro_batcher.queue_wait):
+            lines += [f"# HELP {histogram.name} {histogram.description}", f"# TYPE {histogram.name} histogram"]
+            lines += render_histogram(histogram.name, histogram)
+
+    index = index_status()
+    lines += render_metric("index_loaded", "gauge", "Whether a search index is loaded", [(None, int(index["loaded"]))])
+    if index["loaded"]:
+        lines += render_metric("index_rows", "gauge", "Rows (vectors) in the loaded index", [(None, index["rows"])])
+        lines += render_metric("index_info", "gauge", "Version and granularity of the loaded index",
+                               [({"version": index["version"], "granularity": index["granularity"]}, 1)])
+        lines += render_metric("index_loaded_timestamp_seconds", "gauge", "When the loaded index was swapped in",
+                               [(None, index["loaded_at"])])
+
+    lines += render_metric("model_loaded", "gauge", "Whether the embedding model is loaded", [(None, int(model_loaded()))])
+    lines += render_metric("startup_phase_seconds", "gauge", "Duration of each startup phase (model_load, index_load, ...)",
+                           [({"phase": name}, seconds) for name, seconds in startup.phases().items()])
+
+    if pool_stats is not None:
+        lines += pool_metrics(pool_stats)
+    return "\n".join(lines) + "\n"
@@ -1,79 +1,688 @@
 import json
+import os
+import threading
+import time
+import weakref
 import numpy as np
 from pathlib import Path
+from index_format import (read_binary_index, normalize_rows, index_version, metadata_path, columns_path,
+                          ann_path, quantized_path, shard_path, IndexFormatError)
+from ann_index import IVFIndex
+from quantization import QuantizedVectors
+from filter_index import FilterIndex
+from metadata_store import MetadataStore
+from reranker import rerank_scores
+from lexical_index import BM25Index
+from sharding import ShardPool, ShardSearchError
+from startup import phase
+from metrics_utils import stage_timer
+from log_utils import get_logger
 
-LOCAL_INDEX_FILE = Path("data/local_index.json")
-_local_index = []
+logger = get_logger(__name__)
+
+LOCAL_INDEX_FILE = Path("data/local_index.bin")
+LEGACY_INDEX_FILE = Path("data/local_index.json")
+_local_index = None
+# Serializes loads; queries never take it (they read _local_index once)
+_reload_lock = threading.Lock()
+# Files of a load that failed, so the watcher does not retry until they change
+_failed_fingerprint = None
+_watcher = None
+_watcher_lock = threading.Lock()
+
+# Poll the index files every N seconds and hot-swap a changed index (0 = off)
+INDEX_WATCH_INTERVAL = float(os.environ.get("INDEX_WATCH_INTERVAL", "0"))
+
+# "exact" scores every row; "ivf" uses the IVF structure built by
+# seed_index.py --ann ivf, falling back to exact search when it is missing
+VECTOR_SEARCH_BACKEND = os.environ.get("VECTOR_SEARCH_BACKEND", "exact")
+# IVF lists scanned per query (higher = better recall, slower)
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "8"))
+# "float32" scores the full matrix; "float16"/"int8" score the quantized copy
+# written by seed_index.py --quantize and rescore a shortlist in full precision
+VECTOR_STORAGE = os.environ.get("VECTOR_STORAGE", "float32")
+# Shortlist size for rescoring, as a multiple of top_k
+RESCORE_FACTOR = int(os.environ.get("RESCORE_FACTOR", "4"))
+# Candidate rows (e.g. a filter's matches) are copied out of the matrix and
+# scored only when they are at most this fraction of the index; larger sets
+# are cheaper to score with the full matrix product and then select
+GATHER_MAX_FRACTION = float(os.environ.get("GATHER_MAX_FRACTION", "0.25"))
+
+# Hybrid retrieval: BM25 results are fused with the dense results by
+# reciprocal rank fusion, each list weighted (LEXICAL_WEIGHT=0 disables BM25)
+DENSE_WEIGHT = float(os.environ.get("DENSE_WEIGHT", "1"))
+LEXICAL_WEIGHT = float(os.environ.get("LEXICAL_WEIGHT", "0"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+# Answer from BM25 alone while the embedding model is still loading
+LEXICAL_FAST_PATH = os.environ.get("LEXICAL_FAST_PATH", "0") == "1"
+
+# Review-level indexes (seed_index.py --granularity review): rows fetched per
+# wanted professor, and how a professor's row scores are combined ("max", or
+# "mean" of its best MULTI_VECTOR_TOP_N rows)
+MULTI_VECTOR_FETCH_FACTOR = int(os.environ.get("MULTI_VECTOR_FETCH_FACTOR", "4"))
+MULTI_VECTOR_AGGREGATION = os.environ.get("MULTI_VECTOR_AGGREGATION", "max")
+MULTI_VECTOR_TOP_N = int(os.environ.get("MULTI_VECTOR_TOP_N", "3"))
+
+# Scatter-gather search over the shards written by seed_index.py --shards N
+# (0 = search in-process); workers default to one per shard. Shards that miss
+# the timeout fail over to in-process search, or with SHARD_PARTIAL_RESULTS=1
+# are left out of the results.
+INDEX_SHARDS = int(os.environ.get("INDEX_SHARDS", "0"))
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "0"))
+SHARD_TIMEOUT_MS = float(os.environ.get("SHARD_TIMEOUT_MS", "1000"))
+SHARD_PARTIAL_RESULTS = os.environ.get("SHARD_PARTIAL_RESULTS", "0") == "1"
+
+# Max cells in one (queries x rows) score matrix for batch search (~64 MB of float32)
+QUERY_BLOCK_CELLS = 16_000_000
+
+class LocalIndex:
+    """
+    In-memory search index: every row vector lives in one pre-normalized
+    float32 matrix, with ids in a parallel list and metadata in a columnar
+    MetadataStore (a list of metadata dicts is converted on construction).
+    Treated as immutable once published: a reload builds a new LocalIndex.
+    """
+
+    def __init__(self, ids, vectors, metadata, info=None, version=None):
+        self.ids = ids
+        self.vectors = vectors
+        if not isinstance(metadata, MetadataStore):
+            metadata = MetadataStore.from_records(metadata)
+        self.metadata = metadata
+        self.info = info or {}
+        # Identifies the index contents; caches key their entries on it
+        self.version = version
+        # Files it was read from (see _index_fingerprint) and when
+        self.fingerprint = None
+        self.loaded_at = None
+        # Optional approximate-search structure (IVFIndex)
+        self.ann = None
+        # Optional compact copy of the vectors (QuantizedVectors)
+        self.quantized = None
+        # Metadata pre-filter: filter terms -> candidate rows
+        self.filters = FilterIndex(metadata)
+        # Optional BM25 index over the text metadata (BM25Index)
+        self.lexical = None
+        # Optional worker processes searching the index shards (ShardPool)
+        self.shards = None
+        # Professor of each row, for aggregating results per professor; a
+        # review-level index has several rows (profile + reviews) per professor
+        self.groups = professor_groups(metadata)
+        self.multi_vector = self.info.get("granularity") == "review"
+        codes, row_types = metadata.interned_column("row_type")
+        self.review_rows = codes == row_types.index("review") if "review" in row_types else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def row_fetch(self, top_k):
+        """Rows to retrieve so that about ``top_k`` distinct professors remain after aggregation."""
+        return top_k * MULTI_VECTOR_FETCH_FACTOR if self.multi_vector else top_k
+
+    def scores(self, query, rows=None):
+        """Cosine similarity of a normalized query against ``rows`` (every row when None)."""
+        if rows is None:
+            return self.vectors @ query
+        if len(rows) > GATHER_MAX_FRACTION * len(self):
+            return (self.vectors @ query)[rows]
+        return np.asarray(self.vectors[rows]) @ query
+
+    def batch_scores(self, queries):
+        """Cosine similarity of normalized queries (m x dim) against every row: (m x count)."""
+        return queries @ self.vectors.T
+
+    def batch_search(self, queries, top_k):
+        """
+        Top-k rows over every row for each normalized query, as a list of
+        (rows, scores): scattered to the shard workers when attached,
+        otherwise one matrix-matrix product.
+        """
+        if self.shards is not None:
+            try:
+                return self.shards.search(queries, top_k)
+            except ShardSearchError as e:
+                logger.warning("Shard search failed, searching in-process: %s", e)
+        results = []
+        for scores in self.batch_scores(queries):
+            best = top_k_rows(scores, top_k)
+            results.append((best, scores[best]))
+        return results
+
+    def candidates(self, query, top_k, filters=None):
+        """
+        Rows worth scoring for ``query``: the pre-filtered slice when filters
+        are given, otherwise the probed IVF lists, or None for every row.
+        """
+        if filters:
+            rows = self.filters.rows(filters)
+            if rows is not None:
+                return rows
+        if self.ann is None:
+            return None
+        rows = self.ann.candidates(query)
+        if len(rows) < top_k:
+            return None
+        rows.sort()
+        return rows
+
+    def search(self, query, top_k, filters=None):
+        """
+        Top-k rows for a normalized query, best first, as (rows, scores).
+        Candidates come from the metadata filters or the ANN structure when
+        attached (otherwise every row, scattered to the shard workers when
+        attached); with quantized storage they are scored on the compact codes
+        and a shortlist is rescored in full precision.
+        """
+        rows = self.candidates(query, top_k, filters)
+        if rows is not None and not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+        if rows is None and self.quantized is None and self.shards is not None:
+            return self.batch_search(query[None, :], top_k)[0]
+
+        if self.quantized is not None:
+            approximate = self.quantized.scores(query, rows)
+            shortlist = top_k_rows(approximate, top_k * RESCORE_FACTOR)
+            rows = np.sort(shortlist if rows is None else rows[shortlist])
+
+        scores = self.scores(query, rows)
+        best = top_k_rows(scores, top_k)
+        return (best if rows is None else rows[best]), scores[best]
+
+    def lexical_search(self, text, top_k, filters=None):
+        """Top-k rows by BM25 score for ``text``, best first, as (rows, scores); rows scoring 0 are skipped."""
+        scores = self.lexical.scores(text)
+        rows = self.filters.rows(filters) if filters else None
+        rows = np.flatnonzero(scores > 0) if rows is None else rows[scores[rows] > 0]
+        best = top_k_rows(scores[rows], top_k)
+        return rows[best], scores[rows[best]]
+
+    def fuse(self, query, text, rows, top_k, filters=None):
+        """
+        Reciprocal rank fusion of dense result ``rows`` (best first) with the
+        BM25 results for ``text``. Returns the ``top_k`` fused rows as
+        (rows, cosine similarities, relevance), relevance being the fused
+        score scaled so a row ranked first in both lists gets 1.
+        """
+        lexical_rows, _ = self.lexical_search(text, top_k, filters)
+        candidates = np.concatenate([rows, lexical_rows])
+        contributions = np.concatenate([
+            DENSE_WEIGHT / (RRF_K + 1 + np.arange(len(rows))),
+            LEXICAL_WEIGHT / (RRF_K + 1 + np.arange(len(lexical_rows)))
+        ])
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        fused = np.bincount(inverse, weights=contributions, minlength=len(unique))
+
+        best = top_k_rows(fused, top_k)
+        rows = unique[best]
+        relevance = fused[best] * (RRF_K + 1) / (DENSE_WEIGHT + LEXICAL_WEIGHT)
+        return rows, self.scores(query, rows), relevance
+
+    def aggregate(self, rows, ranking):
+        """
+        Collapse candidate ``rows`` (best first, scored by ``ranking``) to one
+        entry per professor with vectorized group reductions. Each professor
+        keeps its best row and scores the max of its rows' ranking (or the mean
+        of its best MULTI_VECTOR_TOP_N with "mean" aggregation).
+
+        Returns (positions, aggregated, snippet_rows): positions into ``rows``
+        of each professor's best row ordered by aggregated score (ties keep
+        rank order), and the best review row of each professor (-1 if none),
+        or None when the index has no review rows.
+        """
+        groups = self.groups[rows]
+        order = np.lexsort((-ranking, groups))
+        starts = _group_starts(groups[order])
+        best = order[starts]
+
+        if self.multi_vector and MULTI_VECTOR_AGGREGATION == "mean":
+            counts = np.diff(np.append(starts, len(order)))
+            rank = np.arange(len(order)) - np.repeat(starts, counts)
+            keep = rank < MULTI_VECTOR_TOP_N
+            members = np.repeat(np.arange(len(starts)), counts)
+            totals = np.bincount(members[keep], weights=ranking[order][keep], minlength=len(starts))
+            aggregated = totals / np.minimum(counts, MULTI_VECTOR_TOP_N)
+        else:
+            aggregated = ranking[best]
+
+        # Professors in the order their best row was retrieved, then by score
+        by_rank = np.argsort(best, kind="stable")
+        best, aggregated = best[by_rank], aggregated[by_rank]
+        ranked = top_k_rows(aggregated, len(aggregated))
+        best, aggregated = best[ranked], aggregated[ranked]
+
+        snippet_rows = None
+        if self.review_rows is not None:
+            # Best review of each professor, sorted by group code
+            reviews = np.flatnonzero(self.review_rows[rows])
+            reviews = reviews[np.lexsort((-ranking[reviews], groups[reviews]))]
+            reviews = reviews[_group_starts(groups[reviews])]
+            snippet_rows = np.full(len(best), -1, dtype=np.int64)
+            if len(reviews):
+                found = np.minimum(np.searchsorted(groups[reviews], groups[best]), len(reviews) - 1)
+                matched = groups[reviews][found] == groups[best]
+                snippet_rows[matched] = rows[reviews[found[matched]]]
+
+        return best, aggregated, snippet_rows
+
+    def rerank(self, rows, scores, top_k, weights):
+        """
+        Rerank candidate ``rows`` (with similarity ``scores``) on the rating and
+        review-count columns and keep the ``top_k`` best with a partial selection.
+        Returns (order, final_scores, *components), all in ranked order.
+        """
+        final_scores, *components = rerank_scores(
+            scores, self.filters.ratings[rows], self.filters.reviews[rows], **weights)
+        order = top_k_rows(final_scores, top_k)
+        return (order, final_scores[order], *(component[order] for component in components))
+
+    def ranked_matches(self, rows, scores, top_k, weights, relevance=None, snippet_rows=None):
+        """
+        Result dicts for the ``top_k`` reranked candidates, with their score
+        components. ``relevance`` (e.g. fused or aggregated scores) replaces
+        the similarity component when given; each match's "score" stays
+        ``scores``.
+        """
+        ranking = scores if relevance is None else relevance
+        order, final_scores, similarity, rating, reviews = self.rerank(rows, ranking, top_k, weights)
+        matches = []
+        for i, candidate in enumerate(order):
+            snippet_row = snippet_rows[candidate] if snippet_rows is not None else None
+            match = self.match(rows[candidate], scores[candidate], snippet_row)
+            match["final_score"] = float(final_scores[i])
+            match["similarity_component"] = float(similarity[i])
+            match["rating_component"] = float(rating[i])
+            match["review_component"] = float(reviews[i])
+            matches.append(match)
+        return matches
+
+    def match(self, row, score, snippet_row=None):
+        """
+        Build the result dict for a single row (metadata is a slot-based row
+        view). ``snippet_row`` adds the text of that review row as "snippet"
+        (None when the professor has no matching review, i.e. -1).
+        """
+        match = {
+            "id": self.ids[row],
+            "score": float(score),
+            "metadata": self.metadata.row(row)
+        }
+        if snippet_row is not None:
+            match["snippet"] = self.metadata.row(snippet_row).get("full_text") if snippet_row >= 0 else None
+        return match
+
+def professor_groups(store):
+    """Group code of every row: its professor_id, rows without one forming their own group."""
+    groups = store.codes("professor_id").astype(np.int64)
+    missing = groups < 0
+    groups[missing] = groups.max(initial=-1) + 1 + np.arange(missing.sum())
+    return groups
+
+def _group_starts(sorted_groups):
+    """Start offset of each run of equal values in a sorted group array."""
+    if not len(sorted_groups):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate(([True], sorted_groups[1:] != sorted_groups[:-1])))
 
 def load_local_index():
-    """Load and prepare the local index for fast similarity search."""
-    global _local_index
-    
+    """
+    Load and prepare the local index for fast similarity search.
+    No-op if it is already loaded (by a concurrent first query or the preload).
+    """
+    global _local_index, _failed_fingerprint
+
+    with _reload_lock:
+        if _local_index is not None:
+            return
+        with phase("index_load"):
+            _local_index = _read_local_index()
+        if _local_index is None:
+            _failed_fingerprint = _index_fingerprint()
+
+def reload_local_index():
+    """
+    Build a new index from disk and swap it in atomically.
+    The index is fully prepared before it is published, queries already
+    running keep the index object they started with, and a failed load
+    keeps serving the current index. Returns (previous version, version).
+    """
+    global _local_index, _failed_fingerprint
+
+    with _reload_lock:
+        previous = _local_index
+        index = _read_local_index()
+        if index is not None:
+            _local_index = index
+        else:
+            _failed_fingerprint = _index_fingerprint()
+        return (previous.version if previous is not None else None,
+                _local_index.version if _local_index is not None else None)
+
+def _read_local_index():
+    """Read and fully prepare the index on disk; None if it is missing or unreadable."""
+    # Taken before reading, so a change made during the load triggers another reload
+    fingerprint = _index_fingerprint()
+
     if not LOCAL_INDEX_FILE.exists():
-        print(f"Local index not found at {LOCAL_INDEX_FILE}")
-        print("Run: python scripts/seed_index.py")
+        if LEGACY_INDEX_FILE.exists():
+            logger.warning("Binary index not found, falling back to %s", LEGACY_INDEX_FILE)
+            logger.warning("Run: python scripts/convert_index.py")
+            index = _load_legacy_index()
+        else:
+            logger.warning("Local index not found at %s", LOCAL_INDEX_FILE)
+            logger.warning("Run: python scripts/seed_index.py")
+            index = None
+    else:
+        try:
+            # Rows are stored pre-normalized, so the memory-mapped matrix is
+            # searched directly without copying it into the heap.
+            header, vectors, ids, metadata, info = read_binary_index(LOCAL_INDEX_FILE)
+            index = LocalIndex(ids, vectors, metadata, info, index_version(header))
+            index.lexical = _build_lexical(index)
+            if VECTOR_SEARCH_BACKEND == "ivf":
+                index.ann = _load_ann(index)
+            if VECTOR_STORAGE != "float32":
+                index.quantized = _load_quantized(index)
+            if INDEX_SHARDS > 0:
+                index.shards = ShardPool.open(LOCAL_INDEX_FILE, INDEX_SHARDS, index.version, SHARD_WORKERS,
+                                              SHARD_TIMEOUT_MS / 1000, SHARD_PARTIAL_RESULTS)
+                if index.shards is not None:
+                    # Stop the workers once no query holds this index any more
+                    weakref.finalize(index, index.shards.close)
+
+            logger.info("Loaded %s embeddings from local index", len(index))
+
+        except (OSError, IndexFormatError) as e:
+            logger.error("Error loading local index: %s", e)
+            index = None
+
+    if index is not None:
+        index.fingerprint = fingerprint
+        index.loaded_at = time.time()
+    return index
+
+def _index_fingerprint():
+    """(mtime, size) of every file the loaded index is built from (None for missing files)."""
+    paths = [LOCAL_INDEX_FILE, metadata_path(LOCAL_INDEX_FILE), columns_path(LOCAL_INDEX_FILE), LEGACY_INDEX_FILE]
+    if VECTOR_SEARCH_BACKEND == "ivf":
+        paths.append(ann_path(LOCAL_INDEX_FILE))
+    if VECTOR_STORAGE != "float32":
+        paths.append(quantized_path(LOCAL_INDEX_FILE, VECTOR_STORAGE))
+    paths.extend(shard_path(LOCAL_INDEX_FILE, shard, INDEX_SHARDS) for shard in range(INDEX_SHARDS))
+
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+def _watch_index():
+    """Reload the index whenever its files change (polled every INDEX_WATCH_INTERVAL seconds)."""
+    while True:
+        time.sleep(INDEX_WATCH_INTERVAL)
+        index = _local_index
+        fingerprint = _index_fingerprint()
+        current = index.fingerprint if index is not None else None
+        if fingerprint != current and fingerprint != _failed_fingerprint:
+            logger.info("Index files changed, reloading")
+            previous, version = reload_local_index()
+            if version != previous:
+                logger.info("Swapped in index version %s (was %s)", version, previous)
+
+def _ensure_watcher():
+    # Started lazily so a pre-forked worker gets its own thread
+    global _watcher
+    if INDEX_WATCH_INTERVAL <= 0:
         return
-    
+    with _watcher_lock:
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch_index, name="index-watcher", daemon=True)
+            _watcher.start()
+
+def _build_lexical(index):
+    """BM25 index over the metadata when hybrid search or the lexical fast path is on."""
+    if LEXICAL_WEIGHT <= 0 and not LEXICAL_FAST_PATH:
+        return None
+    lexical = BM25Index.build(index.metadata)
+    logger.info("Built BM25 index (%s terms)", len(lexical.vocabulary))
+    return lexical
+
+def _load_ann(index):
+    """Load the IVF structure for ``index``, or None to use exact search."""
+    path = ann_path(LOCAL_INDEX_FILE)
+    if not path.exists():
+        logger.warning("IVF index not found at %s, using exact search", path)
+        logger.warning("Run: python scripts/seed_index.py --ann ivf")
+        return None
+
+    try:
+        ivf = IVFIndex.load(path, nprobe=IVF_NPROBE)
+    except Exception as e:
+        logger.error("Error loading IVF index, using exact search: %s", e)
+        return None
+
+    if ivf.index_version != index.version:
+        logger.warning("IVF index was built for a different index version, using exact search")
+        return None
+
+    logger.info("Loaded IVF index (%s lists, nprobe=%s)", ivf.nlist, ivf.nprobe)
+    return ivf
+
+def _load_quantized(index):
+    """Load the quantized vectors for ``index``, or None to score full precision."""
+    path = quantized_path(LOCAL_INDEX_FILE, VECTOR_STORAGE)
+    if not path.exists():
+        logger.warning("Quantized vectors not found at %s, using float32", path)
+        logger.warning("Run: python scripts/seed_index.py --quantize %s", VECTOR_STORAGE)
+        return None
+
     try:
-        with open(LOCAL_INDEX_FILE, "r", encoding="utf-8") as f:
-            _local_index = json.load(f)
-        
-        # Convert vectors to numpy arrays and normalize for cosine similarity
-        for item in _local_index:
-            vector = np.array(item["vector"], dtype=np.float32)
-            # Normalize the vector
-            norm = np.linalg.norm(vector)
-            if norm > 0:
-                item["_normalized_vector"] = vector / norm
-            else:
-                item["_normalized_vector"] = vector
-                
-        print(f"Loaded {len(_local_index)} embeddings from local index")
-        
+        quantized = QuantizedVectors.load(path)
     except Exception as e:
-        print(f"Error loading local index: {e}")
-        _local_index = []
+        logger.error("Error loading quantized vectors, using float32: %s", e)
+        return None
+
+    if quantized.index_version != index.version:
+        logger.warning("Quantized vectors were built for a different index version, using float32")
+        return None
+
+    logger.info("Loaded %s vectors (%.1f MB)", quantized.mode, quantized.nbytes / 1e6)
+    return quantized
+
+def _load_legacy_index():
+    """Load the legacy JSON index (slow: parses every vector as text); None on failure."""
+    try:
+        with open(LEGACY_INDEX_FILE, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+
+        ids = [item["id"] for item in entries]
+        metadata = [item["metadata"] for item in entries]
+        vectors = np.array([item["vector"] for item in entries], dtype=np.float32).reshape(len(entries), -1)
+
+        version = f"legacy-{LEGACY_INDEX_FILE.stat().st_mtime_ns}"
+        index = LocalIndex(ids, normalize_rows(vectors), metadata, version=version)
+        index.lexical = _build_lexical(index)
+        logger.info("Loaded %s embeddings from legacy index", len(index))
+        return index
+
+    except Exception as e:
+        logger.error("Error loading legacy index: %s", e)
+        return None
 
 def cosine_similarity(vec1, vec2):
     """Calculate cosine similarity between two normalized vectors."""
     return float(np.dot(vec1, vec2))
 
-def pinecone_query(user_vector, top_k=10):
+def normalize_query(user_vector):
+    """Convert a query vector to a normalized float32 array."""
+    user_array = np.asarray(user_vector, dtype=np.float32)
+    user_norm = np.linalg.norm(user_array)
+    if user_norm > 0:
+        return user_array / user_norm
+    return user_array
+
+def top_k_rows(scores, top_k):
+    """
+    Return the row numbers of the ``top_k`` highest scores, best first.
+    Uses a partial selection so only the winners are sorted; ties keep
+    index order, matching a stable descending sort.
+    """
+    count = scores.shape[0]
+    if top_k <= 0 or count == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_k < count:
+        # Include every row tied with the k-th score so tie-breaking is stable
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        threshold = scores[candidates].min()
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(count)
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:top_k]
+
+def get_local_index():
+    """
+    Return the loaded index, loading it on first use (None if unavailable).
+    Callers should use the returned object for a whole query: a reload
+    replaces the module's index but never modifies a published one.
+    """
+    _ensure_watcher()
+    if _local_index is None:
+        load_local_index()
+    return _local_index
+
+def index_status():
+    """Version, size and load time of the current index (for /health)."""
+    index = _local_index
+    if index is None:
+        return {"loaded": False, "version": None}
+    return {
+        "loaded": True,
+        "version": index.version,
+        "rows": len(index),
+        "granularity": index.info.get("granularity", "professor"),
+        "loaded_at": index.loaded_at
+    }
+
+def get_index_version():
+    """Version string of the loaded index, or None if no index is loaded."""
+    index = get_local_index()
+    return index.version if index is not None else None
+
+def pinecone_query(user_vector, top_k=10, filters=None, rerank_weights=None, rerank_candidates=None,
+                   query_text=None):
     """
     Search the local index for similar professors.
     Returns list of matches with id, score, and metadata.
+    ``filters`` (see FilterIndex.rows) restricts scoring to matching rows.
+    With ``rerank_weights`` (see reranker.rerank_scores) the best
+    ``rerank_candidates`` rows by similarity are reranked on rating and review
+    count and the top_k matches also carry final_score and its components.
+    With ``query_text`` and LEXICAL_WEIGHT > 0, dense and BM25 results are
+    fused by reciprocal rank before reranking.
     """
-    global _local_index
-    
     # Load index if not already loaded
-    if not _local_index:
-        load_local_index()
-    
-    if not _local_index:
+    index = get_local_index()
+    if index is None or not len(index):
         return []
-    
-    # Normalize user vector
-    user_array = np.array(user_vector, dtype=np.float32)
-    user_norm = np.linalg.norm(user_array)
-    if user_norm > 0:
-        user_normalized = user_array / user_norm
-    else:
-        user_normalized = user_array
-    
-    # Calculate similarities
-    results = []
-    for item in _local_index:
-        similarity = cosine_similarity(user_normalized, item["_normalized_vector"])
-        results.append({
-            "id": item["id"],
-            "score": similarity,
-            "metadata": item["metadata"]
-        })
-    
-    # Sort by similarity score (descending)
-    results.sort(key=lambda x: x["score"], reverse=True)
-    
-    return results[:top_k]
-
-# Initialize on import
-load_local_index()
\ No newline at end of file
+
+    # One matrix-vector product (over all rows, the filtered slice or the probed IVF lists)
+    query = normalize_query(user_vector)
+    fetch = top_k if rerank_weights is None else max(top_k, rerank_candidates or top_k)
+    with stage_timer("vector_search"):
+        rows, scores = index.search(query, index.row_fetch(fetch), filters)
+    return _matches(index, rows, scores, top_k, rerank_weights, query, query_text, filters)
+
+def _matches(index, rows, scores, top_k, rerank_weights, query=None, query_text=None, filters=None):
+    """
+    Turn retrieved rows (best first) into the top_k result dicts: fuse with
+    BM25 and rerank as configured, and keep one match per professor.
+    """
+    ranking = scores
+    if query_text and index.lexical is not None and LEXICAL_WEIGHT > 0:
+        with stage_timer("fusion"):
+            rows, scores, ranking = index.fuse(query, query_text, rows, len(rows), filters)
+
+    # One entry per professor (deduplication, or review-level aggregation)
+    with stage_timer("dedup"):
+        positions, ranking, snippet_rows = index.aggregate(rows, ranking)
+        rows, scores = rows[positions], scores[positions]
+
+    with stage_timer("rerank"):
+        if rerank_weights is not None:
+            return index.ranked_matches(rows, scores, top_k, rerank_weights, ranking, snippet_rows)
+
+        # Result dicts are built only for the winners
+        return [
+            index.match(row, score, snippet_rows[i] if snippet_rows is not None else None)
+            for i, (row, score) in enumerate(zip(rows[:top_k], scores[:top_k]))
+        ]
+
+def lexical_query(query_text, top_k=10, filters=None, rerank_weights=None, rerank_candidates=None):
+    """
+    BM25-only search that needs no query vector (the fast path while the
+    embedding model loads). Each match's score is its BM25 score relative to
+    the best hit. Returns [] when no BM25 index is built.
+    """
+    index = get_local_index()
+    if index is None or not len(index) or index.lexical is None:
+        return []
+
+    fetch = top_k if rerank_weights is None else max(top_k, rerank_candidates or top_k)
+    with stage_timer("lexical_search"):
+        rows, scores = index.lexical_search(query_text, index.row_fetch(fetch), filters)
+    if len(scores):
+        scores = scores / scores[0]
+    return _matches(index, rows, scores, top_k, rerank_weights)
+
+def normalize_queries(user_vectors):
+    """Convert a batch of query vectors to a normalized float32 matrix."""
+    return normalize_rows(np.asarray(user_vectors, dtype=np.float32).reshape(len(user_vectors), -1))
+
+def pinecone_query_batch(user_vectors, top_k=10, filters=None, rerank_weights=None, rerank_candidates=None,
+                         query_texts=None):
+    """
+    Search the local index for many query vectors at once.
+    Unfiltered queries are scored with matrix-matrix products over blocks of
+    queries; ``filters`` and ``query_texts`` are optional per-query lists.
+    ``rerank_weights`` and ``rerank_candidates`` apply to every query, as in
+    pinecone_query. Returns one list of matches per query, in input order.
+    """
+    index = get_local_index()
+    if index is None or not len(index) or not len(user_vectors):
+        return [[] for _ in range(len(user_vectors))]
+
+    queries = normalize_queries(user_vectors)
+    filters = filters or [None] * len(queries)
+    query_texts = query_texts or [None] * len(queries)
+    results = [None] * len(queries)
+    fetch = top_k if rerank_weights is None else max(top_k, rerank_candidates or top_k)
+
+    def matches(position, rows, scores):
+        return _matches(index, rows, scores, top_k, rerank_weights,
+                        queries[position], query_texts[position], filters[position])
+
+    # Filtered queries score their own slice; with ANN or quantized storage
+    # each query probes its own candidates, so there is no shared product.
+    shared = []
+    for position, (query, query_filters) in enumerate(zip(queries, filters)):
+        if query_filters or index.ann is not None or index.quantized is not None:
+            results[position] = matches(position, *index.search(query, index.row_fetch(fetch), query_filters))
+        else:
+            shared.append(position)
+
+    # Bound the (block x count) score matrix for very large indexes
+    block = max(1, QUERY_BLOCK_CELLS // len(index))
+    for start in range(0, len(shared), block):
+        positions = shared[start:start + block]
+        for position, (rows, scores) in zip(positions, index.batch_search(queries[positions], index.row_fetch(fetch))):
+            results[position] = matches(position, rows, scores)
+    return results
@@ -0,0 +1,109 @@
+"""
+Scalar-quantized copies of the vector matrix (float16 or int8).
+
+Quantized codes are scored first to pick a shortlist; the shortlist is then
+rescored against the full-precision float32 matrix, which stays memory-mapped
+on disk and is only paged in for the rows actually rescored.
+
+int8 uses a per-dimension affine mapping: ``x ~= (code + 128) * scale + offset``
+where ``offset`` is the dimension minimum and ``scale`` spans its range in 255
+steps.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+from index_format import _atomic_write
+
+QUANTIZATION_MODES = ("float16", "int8")
+# Rows converted to float32 at a time (small enough for the temporaries to stay in cache)
+BLOCK_ROWS = 4096
+
+
+class QuantizedVectors:
+    """Compact representation of a normalized vector matrix."""
+
+    def __init__(self, mode, codes, scale=None, offset=None, index_version=None):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode {mode!r}")
+        self.mode = mode
+        self.codes = codes
+        self.scale = scale
+        self.offset = offset
+        self.index_version = index_version
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory by the codes and their parameters."""
+        extra = 0 if self.scale is None else self.scale.nbytes + self.offset.nbytes
+        return self.codes.nbytes + extra
+
+    @classmethod
+    def encode(cls, vectors, mode):
+        """Quantize a (count x dim) float32 matrix, block by block."""
+        count, dim = vectors.shape
+        if mode == "float16":
+            codes = np.empty((count, dim), dtype=np.float16)
+            for start in range(0, count, BLOCK_ROWS):
+                codes[start:start + BLOCK_ROWS] = vectors[start:start + BLOCK_ROWS]
+            return cls(mode, codes)
+
+        if mode != "int8":
+            raise ValueError(f"Unknown quantization mode {mode!r}")
+
+        low = np.full(dim, np.inf, dtype=np.float32)
+        high = np.full(dim, -np.inf, dtype=np.float32)
+        for start in range(0, count, BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS])
+            low = np.minimum(low, block.min(axis=0))
+            high = np.maximum(high, block.max(axis=0))
+        if not count:
+            low = high = np.zeros(dim, dtype=np.float32)
+
+        offset = low
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        codes = np.empty((count, dim), dtype=np.int8)
+        for start in range(0, count, BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS])
+            steps = np.clip(np.rint((block - offset) / scale), 0, 255)
+            codes[start:start + BLOCK_ROWS] = (steps - 128).astype(np.int8)
+        return cls(mode, codes, scale.astype(np.float32), offset.astype(np.float32))
+
+    def scores(self, query, rows=None):
+        """Approximate cosine scores of a normalized query against ``rows`` (all when None)."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.mode == "float16":
+            weights, bias = query, 0.0
+        else:
+            # (c + 128) * s + o  dotted with q  ==  c . (q * s) + 128 * sum(q * s) + o . q
+            weights = query * self.scale
+            bias = 128.0 * float(weights.sum()) + float(self.offset @ query)
+
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], BLOCK_ROWS):
+            block = codes[start:start + BLOCK_ROWS].astype(np.float32)
+            scores[start:start + BLOCK_ROWS] = block @ weights + bias
+        return scores
+
+    def save(self, path, index_version):
+        """Persist codes and parameters, tagged with the index version they encode."""
+        arrays = {"codes": self.codes, "mode": np.array(self.mode), "index_version": np.array(index_version)}
+        if self.scale is not None:
+            arrays.update(scale=self.scale, offset=self.offset)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        # Renamed into place, so the index watcher never reads a half-written file;
+        # passed as one chunk (a view of the buffer) rather than copied to bytes
+        _atomic_write(Path(path), [buffer.getbuffer()])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(str(data["mode"]), data["codes"],
+                       data["scale"] if "scale" in data else None,
+                       data["offset"] if "offset" in data else None,
+                       index_version=str(data["index_version"]))
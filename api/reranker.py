@@ -1,56 +1,72 @@
+import numpy as np
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+def rerank_scores(similarity, avg_rating, num_reviews, similarity_weight=0.7,
+                  rating_weight=0.25, review_count_weight=0.05):
+    """
+    Vectorized reranking scores for any number of candidates.
+
+    Args:
+        similarity: Array of cosine similarities, one per candidate
+        avg_rating: Array of ratings (0 when unknown)
+        num_reviews: Array of review counts (0 when unknown)
+        similarity_weight, rating_weight, review_count_weight: Component weights
+
+    Returns:
+        (final_scores, similarity_component, rating_component, review_component)
+    """
+    similarity = np.maximum(np.asarray(similarity, dtype=np.float64), 0)
+    rating_score = np.asarray(avg_rating, dtype=np.float64) / 5.0
+
+    # Review counts are normalized by the most reviewed candidate
+    num_reviews = np.asarray(num_reviews, dtype=np.float64)
+    max_reviews = max(num_reviews.max(initial=0), 1)
+    review_score = np.minimum(num_reviews / max_reviews, 1.0)
+
+    final_scores = (similarity_weight * similarity +
+                    rating_weight * rating_score +
+                    review_count_weight * review_score)
+    return final_scores, similarity, rating_score, review_score
+
 def rerank(matches, similarity_weight=0.7, rating_weight=0.25, review_count_weight=0.05):
     """
     Improved reranking that considers similarity, rating, and review count.
-    
+    Compatibility wrapper over rerank_scores for lists of match dicts.
+
     Args:
         matches: List of search results with score and metadata
         similarity_weight: Weight for semantic similarity (0-1)
-        rating_weight: Weight for professor rating (0-1) 
+        rating_weight: Weight for professor rating (0-1)
         review_count_weight: Weight for number of reviews (0-1)
-    
+
     Returns:
         Reranked list of matches
     """
     if not matches:
         return matches
-    
-    # Find max review count for normalization
-    max_reviews = max(match.get('metadata', {}).get('num_reviews', 0) for match in matches)
-    max_reviews = max(max_reviews, 1)  # Avoid division by zero
-    
-    for match in matches:
-        metadata = match.get('metadata', {})
-        
-        # Get similarity score (0-1, already normalized from cosine similarity)
-        similarity_score = max(0, match.get('score', 0))
-        
-        # Get rating score (normalize to 0-1)
-        avg_rating = metadata.get('avg_rating', 0)
-        rating_score = avg_rating / 5.0 if avg_rating else 0
-        
-        # Get review count score (normalize to 0-1)
-        num_reviews = metadata.get('num_reviews', 0)
-        review_score = min(num_reviews / max_reviews, 1.0) if max_reviews > 0 else 0
-        
-        # Calculate weighted combined score
-        combined_score = (
-            similarity_weight * similarity_score + 
-            rating_weight * rating_score +
-            review_count_weight * review_score
-        )
-        
-        match['final_score'] = combined_score
-        
+
+    metadata = [match.get('metadata', {}) for match in matches]
+    final_scores, similarity, rating_score, review_score = rerank_scores(
+        [match.get('score', 0) for match in matches],
+        [item.get('avg_rating', 0) or 0 for item in metadata],
+        [item.get('num_reviews', 0) for item in metadata],
+        similarity_weight, rating_weight, review_count_weight)
+
+    for i, match in enumerate(matches):
+        match['final_score'] = float(final_scores[i])
+
         # Add individual scores for debugging
-        match['similarity_component'] = similarity_score
-        match['rating_component'] = rating_score
-        match['review_component'] = review_score
-    
+        match['similarity_component'] = float(similarity[i])
+        match['rating_component'] = float(rating_score[i])
+        match['review_component'] = float(review_score[i])
+
     # Sort by final score (descending)
     ranked = sorted(matches, key=lambda x: x.get('final_score', 0), reverse=True)
-    
+
     # Debug info
-    print(f"Reranking complete. Top result: {ranked[0]['metadata']['name']} "
-          f"(final_score: {ranked[0]['final_score']:.3f})")
-    
-    return ranked
\ No newline at end of file
+    logger.debug("Reranking complete. Top result: %s (final_score: %.3f)",
+                 ranked[0]['metadata']['name'], ranked[0]['final_score'])
+
+    return ranked
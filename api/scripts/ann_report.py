@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Recall@k vs. latency report for the IVF backend compared to exact search.
+Uses a synthetic clustered catalog by default (no model download needed),
+or the real index with --index.
+
+Both modes time LocalIndex.search, the path queries take when serving: exact
+search without an ANN structure, and IVF with the structure attached as
+VECTOR_SEARCH_BACKEND=ivf attaches it (including its fallback to exact search
+when the probed lists hold fewer than top_k rows).
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ann_index import IVFIndex
+from index_format import normalize_rows, read_binary_index
+from pinecone_utils import LocalIndex
+
+DIM = 384
+
+def synthetic_vectors(rows, clusters, noise, rng):
+    """Clustered unit vectors, closer to real embedding distributions than pure noise."""
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    assignments = rng.integers(0, clusters, rows)
+    vectors = centers[assignments] + noise * rng.standard_normal((rows, DIM)).astype(np.float32)
+    return normalize_rows(vectors)
+
+def median_ms(timings):
+    return float(np.median(timings) * 1000)
+
+def run_report(vectors, queries, top_k, nprobes, nlist):
+    """Measure exact latency, then recall@k and latency for each nprobe."""
+    index = LocalIndex([str(row) for row in range(vectors.shape[0])], vectors, [{}] * vectors.shape[0])
+    exact_results, exact_timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(query, top_k)
+        exact_timings.append(time.perf_counter() - start)
+        exact_results.append(set(rows.tolist()))
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(vectors, nlist=nlist)
+    build_seconds = time.perf_counter() - start
+    index.ann = ivf
+
+    report = {
+        "rows": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "top_k": top_k,
+        "nlist": ivf.nlist,
+        "build_seconds": round(build_seconds, 3),
+        "exact": {"median_ms": round(median_ms(exact_timings), 3)},
+        "ivf": []
+    }
+
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        recalls, timings = [], []
+        for query, expected in zip(queries, exact_results):
+            start = time.perf_counter()
+            rows, _ = index.search(query, top_k)
+            timings.append(time.perf_counter() - start)
+            recalls.append(len(expected & set(rows.tolist())) / top_k)
+        report["ivf"].append({
+            "nprobe": nprobe,
+            f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+            "median_ms": round(median_ms(timings), 3)
+        })
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare IVF search to exact search.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--clusters", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--index", type=Path, default=None, help="Use a real binary index instead of synthetic data")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    if args.index:
+        _, vectors, _, _, _ = read_binary_index(args.index)
+        vectors = np.asarray(vectors)
+    else:
+        vectors = synthetic_vectors(args.rows, args.clusters, args.noise, rng)
+
+    # Queries are perturbed catalog rows, like a user describing a real professor
+    picks = rng.integers(0, vectors.shape[0], args.queries)
+    queries = normalize_rows(vectors[picks] + 0.05 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32))
+
+    report = run_report(vectors, queries, args.top_k, args.nprobe, args.nlist)
+
+    print(f"📊 {report['rows']:,} rows x {report['dim']} dims, top_k={report['top_k']}, "
+          f"nlist={report['nlist']} (built in {report['build_seconds']}s)")
+    print(f"  exact          recall=1.0000  {report['exact']['median_ms']:.3f} ms")
+    for entry in report["ivf"]:
+        print(f"  ivf nprobe={entry['nprobe']:<4} recall={entry[f'recall@{args.top_k}']:.4f}  {entry['median_ms']:.3f} ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"📁 Saved to: {args.output}")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Offline microbenchmarks of the search pipeline on synthetic catalogs.
+
+For each catalog size a binary index is written from the synthetic catalog
+(clustered random vectors, so no model download is needed) and each stage
+is timed on its own:
+
+- load_local_index: reading and preparing the index (warm page cache);
+- pinecone_query / pinecone_query_filtered: the full index query for a stub
+  query vector (a perturbed catalog row), without and with the subject
+  filter that search_service derives from the query text;
+- dedup: collapsing retrieved rows to one per professor (LocalIndex.aggregate);
+- rerank: the vectorized rerank that pinecone_query runs (ranked_matches),
+  and rerank_dicts: the dict-based reranker.rerank;
+- filter_by_subject and generate_smart_response on the top matches.
+
+Results are written as JSON (--output). With --compare the medians are
+checked against an earlier run, and the script exits with status 1 when any
+is slower than --max-regression allows, so runs on two commits can be
+compared directly.
+
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --sizes 1000 100000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+# Keep the index load messages out of the report (set LOG_LEVEL=INFO to see them)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pinecone_utils
+from ann_report import DIM
+from chat_completion_utils import detect_subject, filter_by_subject, generate_smart_response
+from index_format import write_binary_index, normalize_rows
+from pinecone_utils import load_local_index, get_local_index, pinecone_query, normalize_query
+from reranker import rerank
+from search_service import query_filters, SEARCH_TOP_K, RERANK_CANDIDATES, RERANK_TOP_N, RERANK_WEIGHTS
+from synthetic_catalog import generate_metadata, sample_queries
+
+# Prefixes giving the sampled queries the intents generate_smart_response distinguishes
+QUERY_PREFIXES = ["", "best ", "list all ", "recommend a ", "avoid the worst "]
+
+def timings_summary(timings):
+    """Latency statistics in milliseconds for a list of durations in seconds."""
+    timings = np.asarray(timings) * 1000
+    return {
+        "iterations": len(timings),
+        "median_ms": round(float(np.median(timings)), 4),
+        "mean_ms": round(float(timings.mean()), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "min_ms": round(float(timings.min()), 4)
+    }
+
+def measure(fn, inputs, warmup=2):
+    """Time ``fn(item)`` once per item of ``inputs`` after a few untimed calls."""
+    for item in inputs[:warmup]:
+        fn(item)
+    timings = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return timings_summary(timings)
+
+def catalog_vectors(path, rows, rng, clusters=300, noise=1.5, block=100_000):
+    """
+    Clustered unit vectors (as ann_report.synthetic_vectors) in a memory-mapped
+    scratch file at ``path``, generated a block at a time so a 1M-row catalog
+    does not hold the matrix in process memory.
+    """
+    centers = rng.standard_normal((max(1, min(clusters, rows // 10)), DIM)).astype(np.float32)
+    vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(rows, DIM))
+    for start in range(0, rows, block):
+        count = min(block, rows - start)
+        noisy = centers[rng.integers(0, len(centers), count)]
+        noisy += noise * rng.standard_normal((count, DIM), dtype=np.float32)
+        vectors[start:start + count] = normalize_rows(noisy)
+    return vectors
+
+def write_catalog(directory, rows, seed, rng):
+    """Write a synthetic catalog of ``rows`` professors as data/local_index.bin under ``directory``."""
+    vectors_path = Path(directory) / "vectors.npy"
+    metadata = generate_metadata(rows, seed)
+    write_binary_index(Path(directory) / "data" / "local_index.bin",
+                       ids=[item["professor_id"] for item in metadata],
+                       vectors=catalog_vectors(vectors_path, rows, rng),
+                       metadata=metadata)
+    vectors_path.unlink()
+
+def reload_index():
+    pinecone_utils._local_index = None
+    load_local_index()
+
+def benchmark_catalog(rows, args, rng):
+    """Every benchmark on a catalog of ``rows`` professors."""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_catalog(tmp, rows, args.seed, rng)
+        generate_seconds = time.perf_counter() - start
+
+        # The index paths are relative to the working directory, as for the API
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            results = {"load_local_index": measure(lambda _: reload_index(), [None] * args.load_repeats, warmup=1)}
+            index = get_local_index()
+            results.update(benchmark_queries(index, args, rng))
+        finally:
+            pinecone_utils._local_index = None
+            os.chdir(cwd)
+
+    return {"rows": rows, "generate_seconds": round(generate_seconds, 3), "benchmarks": results}
+
+def benchmark_queries(index, args, rng):
+    """Query-time benchmarks on the loaded ``index``."""
+    texts = [QUERY_PREFIXES[rng.integers(len(QUERY_PREFIXES))] + text for text in sample_queries(args.queries, rng)]
+    # Stub embeddings: perturbed catalog rows, so each query has close neighbours as a real one would
+    vectors = normalize_rows(np.asarray(index.vectors[rng.integers(0, len(index), args.queries)])
+                             + 0.05 * rng.standard_normal((args.queries, index.dim)).astype(np.float32))
+    queries = list(zip(vectors, texts))
+    options = {"top_k": SEARCH_TOP_K, "rerank_weights": RERANK_WEIGHTS, "rerank_candidates": RERANK_CANDIDATES}
+    fetch = index.row_fetch(max(SEARCH_TOP_K, RERANK_CANDIDATES))
+
+    results = {
+        "pinecone_query": measure(lambda query: pinecone_query(query[0], query_text=query[1], **options), queries),
+        "pinecone_query_filtered": measure(
+            lambda query: pinecone_query(query[0], query_text=query[1], filters=query_filters(query[1]), **options),
+            queries)
+    }
+
+    # The inputs of each later stage are the outputs of the stage before it
+    retrieved = [index.search(normalize_query(vector), fetch) for vector, _ in queries]
+    results["dedup"] = measure(lambda found: index.aggregate(*found), retrieved)
+
+    aggregated = []
+    for rows, scores in retrieved:
+        positions, ranking, snippet_rows = index.aggregate(rows, scores)
+        aggregated.append((rows[positions], scores[positions], ranking, snippet_rows))
+    results["rerank"] = measure(
+        lambda found: index.ranked_matches(found[0], found[1], SEARCH_TOP_K, RERANK_WEIGHTS, found[2], found[3]),
+        aggregated)
+
+    candidates = [[index.match(row, score) for row, score in zip(rows, scores)] for rows, scores, _, _ in aggregated]
+    # rerank only adds score keys to the dicts and sorts a new list, so repeated runs see the same input
+    results["rerank_dicts"] = measure(lambda matches: rerank(matches, **RERANK_WEIGHTS), candidates)
+
+    top_matches = [(text, index.ranked_matches(*found[:2], SEARCH_TOP_K, RERANK_WEIGHTS, *found[2:])[:RERANK_TOP_N])
+                   for found, (_, text) in zip(aggregated, queries)]
+    results["filter_by_subject"] = measure(
+        lambda query: filter_by_subject(list(query[1]), detect_subject(query[0])), top_matches)
+    results["generate_smart_response"] = measure(lambda query: generate_smart_response(*query), top_matches)
+    return results
+
+def git_commit():
+    """Commit of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, max_regression):
+    """(rows, benchmark, baseline ms, current ms, ratio) for every median slower than allowed."""
+    previous = {(size["rows"], name): stats["median_ms"]
+                for size in baseline["sizes"] for name, stats in size["benchmarks"].items()}
+    regressions = []
+    for size in report["sizes"]:
+        for name, stats in size["benchmarks"].items():
+            before = previous.get((size["rows"], name))
+            if before and stats["median_ms"] > before * (1 + max_regression):
+                regressions.append((size["rows"], name, before, stats["median_ms"], stats["median_ms"] / before))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search pipeline stages on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="Catalog sizes (professors) to benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed per query-time benchmark")
+    parser.add_argument("--load-repeats", type=int, default=3, help="Timed index loads per size")
+    parser.add_argument("--output", type=Path, default=None, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="With --compare, fail if a median is more than this fraction slower")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "settings": {
+            "queries": args.queries,
+            "seed": args.seed,
+            "top_k": SEARCH_TOP_K,
+            "rerank_candidates": RERANK_CANDIDATES,
+            "vector_search_backend": pinecone_utils.VECTOR_SEARCH_BACKEND,
+            "vector_storage": pinecone_utils.VECTOR_STORAGE,
+            "lexical_weight": pinecone_utils.LEXICAL_WEIGHT
+        },
+        "sizes": []
+    }
+
+    for rows in args.sizes:
+        result = benchmark_catalog(rows, args, rng)
+        report["sizes"].append(result)
+        print(f"📊 {rows:,} rows (catalog generated in {result['generate_seconds']:.1f}s)")
+        for name, stats in result["benchmarks"].items():
+            print(f"  {name:<24} median {stats['median_ms']:>10.4f} ms   p95 {stats['p95_ms']:>10.4f} ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"📁 Saved to: {args.output}")
+
+    failed = False
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        print(f"\n🔍 Compared with {args.compare} (commit {baseline.get('commit')})")
+        for rows, name, before, after, ratio in regressions:
+            print(f"  ❌ {name} at {rows:,} rows: {before:.4f} ms -> {after:.4f} ms (x{ratio:.2f})")
+        if not regressions:
+            print(f"  ✅ No median more than {args.max_regression:.0%} slower")
+        failed = bool(regressions)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Parity and latency check for the vectorized pinecone_query.
+Compares it against the original per-item Python loop on random indexes
+and prints query latency as the catalog grows. No model download needed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pinecone_utils
+from pinecone_utils import LocalIndex, cosine_similarity, normalize_query
+from index_format import normalize_rows
+
+DIM = 384
+
+def reference_query(index, user_vector, top_k):
+    """The original implementation: score each item in Python, sort everything."""
+    user_normalized = normalize_query(user_vector)
+    results = []
+    for row in range(len(index)):
+        similarity = cosine_similarity(user_normalized, index.vectors[row])
+        results.append({
+            "id": index.ids[row],
+            "score": similarity,
+            "metadata": index.metadata.row(row)
+        })
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results[:top_k]
+
+def random_index(rows, rng):
+    """Build a LocalIndex of random unit vectors."""
+    vectors = normalize_rows(rng.standard_normal((rows, DIM)).astype(np.float32))
+    ids = [f"prof_{i}" for i in range(rows)]
+    metadata = [{"professor_id": ids[i], "name": f"Professor {i}"} for i in range(rows)]
+    return LocalIndex(ids, vectors, metadata)
+
+def check_parity(rows, queries, top_k, rng):
+    """Return the number of queries whose results differ from the reference."""
+    pinecone_utils._local_index = random_index(rows, rng)
+    mismatches = 0
+    for _ in range(queries):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        ranked = reference_query(pinecone_utils._local_index, query, rows)
+        expected = ranked[:top_k]
+        actual = pinecone_utils.pinecone_query(query, top_k=top_k)
+        # BLAS and per-row dot products can round differently, so near-ties
+        # may swap places; require the same score at every rank and that
+        # each returned id really has the score it was reported with.
+        reference_scores = {m["id"]: m["score"] for m in ranked}
+        same_scores = np.allclose([m["score"] for m in expected], [m["score"] for m in actual], atol=1e-5)
+        consistent = all(abs(reference_scores[m["id"]] - m["score"]) < 1e-5 for m in actual)
+        if len(actual) != len(expected) or not (same_scores and consistent):
+            mismatches += 1
+    return mismatches
+
+def time_queries(rows, queries, top_k, rng):
+    """Median pinecone_query latency in milliseconds for an index of ``rows``."""
+    pinecone_utils._local_index = random_index(rows, rng)
+    timings = []
+    for _ in range(queries):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        start = time.perf_counter()
+        pinecone_utils.pinecone_query(query, top_k=top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check vectorized search against the reference loop.")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print("🧪 Parity against reference implementation")
+    failed = False
+    for rows in (1, 18, 500, 5000):
+        for top_k in (1, args.top_k, rows + 5):
+            mismatches = check_parity(rows, args.queries, top_k, rng)
+            status = "✅" if mismatches == 0 else "❌"
+            failed = failed or mismatches > 0
+            print(f"  {status} rows={rows:<6} top_k={top_k:<6} mismatches={mismatches}")
+
+    print("\n⏱️  Median query latency")
+    for rows in (1_000, 10_000, 100_000, 300_000):
+        print(f"  rows={rows:<8} {time_queries(rows, 20, args.top_k, rng):.2f} ms")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+One-shot converter from the legacy JSON index to the binary index format.
+Reads data/local_index.json and writes data/local_index.bin plus its
+metadata sidecar, without re-embedding anything.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from index_format import convert_json_index, read_binary_index, metadata_path, columns_path
+
+DEFAULT_SOURCE = Path("data/local_index.json")
+DEFAULT_OUTPUT = Path("data/local_index.bin")
+
+def main(source, output):
+    """Convert ``source`` to ``output`` and verify the result."""
+    if not source.exists():
+        print(f"❌ Error: {source} not found!")
+        return False
+    
+    try:
+        start = time.perf_counter()
+        count = convert_json_index(source, output)
+        elapsed = time.perf_counter() - start
+        
+        # Re-open with full checksum verification
+        header, _, _, _, _ = read_binary_index(output, verify_vectors=True)
+    except Exception as e:
+        print(f"❌ Error converting index: {e}")
+        return False
+    
+    print(f"✅ Converted {count} rows ({header['dim']} dims) in {elapsed:.2f}s")
+    print(f"📁 Vectors: {output} ({output.stat().st_size:,} bytes)")
+    print(f"📁 Ids: {metadata_path(output)} ({metadata_path(output).stat().st_size:,} bytes)")
+    print(f"📁 Metadata: {columns_path(output)} ({columns_path(output).stat().st_size:,} bytes)")
+    print(f"📊 Source JSON was {source.stat().st_size:,} bytes")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert local_index.json to the binary index format.")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    
+    if not main(args.source, args.output):
+        sys.exit(1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Parity and throughput report for the embedding backends.
+Encodes professor texts from the synthetic catalog (and short queries) with
+the torch backend and with each ONNX variant, then reports the cosine
+similarity between the two vectors of every text, the recall@k of search
+results ranked with the candidate's vectors, single-query latency and batch
+throughput. Exits with status 1 if any text drifts further than
+--max-drift (1 - cosine) from its torch vector, so it can gate a switch of
+EMBEDDING_BACKEND.
+
+Run ``python scripts/export_onnx.py --quantize`` first.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from embedding_utils import MODEL_NAME
+from embedding_backends import TorchBackend, OnnxBackend, ONNX_MODEL_DIR
+from pinecone_utils import top_k_rows
+from seed_index import create_professor_text
+from synthetic_catalog import generate_professors, sample_queries
+
+CANDIDATES = {
+    "onnx": {"quantized": False},
+    "onnx-int8": {"quantized": True},
+}
+
+def measure(backend, documents, queries, batch_size, repeats):
+    """(document vectors, query vectors, median single-query ms, batch texts/sec)."""
+    backend.encode(queries[:4], batch_size=batch_size)  # warm-up
+
+    start = time.perf_counter()
+    document_vectors = backend.encode(documents, batch_size=batch_size)
+    batch_rate = len(documents) / (time.perf_counter() - start)
+
+    timings = []
+    for query in queries[:repeats]:
+        start = time.perf_counter()
+        backend.encode(query)
+        timings.append(time.perf_counter() - start)
+
+    query_vectors = backend.encode(queries, batch_size=batch_size)
+    return (np.asarray(document_vectors, dtype=np.float32), np.asarray(query_vectors, dtype=np.float32),
+            float(np.median(timings) * 1000), batch_rate)
+
+def summary(name, single_ms, batch_rate):
+    return {"backend": name, "single_query_ms": round(single_ms, 3), "batch_texts_per_sec": round(batch_rate, 1)}
+
+def run_report(documents, queries, model_dir, batch_size, repeats, top_k):
+    reference = measure(TorchBackend(MODEL_NAME), documents, queries, batch_size, repeats)
+    reference_documents, reference_queries, reference_ms, reference_rate = reference
+    expected = [set(top_k_rows(reference_documents @ query, top_k).tolist()) for query in reference_queries]
+
+    entries = [summary("torch", reference_ms, reference_rate)]
+    entries[0].update({"speedup_single": 1.0, "speedup_batch": 1.0})
+    for name, options in CANDIDATES.items():
+        try:
+            backend = OnnxBackend(MODEL_NAME, model_dir=model_dir, **options)
+        except RuntimeError as e:
+            print(f"⚠️  Skipping {name}: {e}")
+            continue
+
+        document_vectors, query_vectors, single_ms, batch_rate = measure(backend, documents, queries, batch_size, repeats)
+        # Every backend returns unit vectors, so the row-wise dot product is the cosine
+        cosines = np.concatenate([
+            np.sum(document_vectors * reference_documents, axis=1),
+            np.sum(query_vectors * reference_queries, axis=1)
+        ])
+        recalls = [
+            len(wanted & set(top_k_rows(document_vectors @ query, top_k).tolist())) / top_k
+            for wanted, query in zip(expected, query_vectors)
+        ]
+
+        entry = summary(name, single_ms, batch_rate)
+        entry.update({
+            "mean_cosine": round(float(cosines.mean()), 6),
+            "min_cosine": round(float(cosines.min()), 6),
+            "max_drift": round(float(1 - cosines.min()), 6),
+            "recall_at_k": round(float(np.mean(recalls)), 4),
+            "speedup_single": round(reference_ms / single_ms, 2),
+            "speedup_batch": round(batch_rate / reference_rate, 2)
+        })
+        entries.append(entry)
+
+    return {"model": MODEL_NAME, "documents": len(documents), "queries": len(queries),
+            "batch_size": batch_size, "top_k": top_k, "backends": entries}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ONNX embedding backends to torch.")
+    parser.add_argument("--documents", type=int, default=500, help="Synthetic professor texts to encode")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=100, help="Single-query encodes to time")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--max-drift", type=float, default=0.02,
+                        help="Fail if any text's 1 - cosine to its torch vector exceeds this")
+    parser.add_argument("--model-dir", type=Path, default=ONNX_MODEL_DIR)
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    documents = [create_professor_text(professor) for professor in generate_professors(args.documents, args.seed)]
+    report = run_report(documents, sample_queries(args.queries, rng), args.model_dir,
+                        args.batch_size, args.repeats, args.top_k)
+
+    print(f"📊 {report['documents']} documents + {report['queries']} queries, batch size {report['batch_size']}")
+    failed = False
+    for entry in report["backends"]:
+        line = (f"  {entry['backend']:<10} {entry['single_query_ms']:>8.3f} ms/query (x{entry['speedup_single']})  "
+                f"{entry['batch_texts_per_sec']:>8.1f} texts/sec (x{entry['speedup_batch']})")
+        if "min_cosine" in entry:
+            line += (f"  cosine mean={entry['mean_cosine']:.5f} min={entry['min_cosine']:.5f}  "
+                     f"recall@{report['top_k']}={entry['recall_at_k']:.4f}")
+            if entry["max_drift"] > args.max_drift:
+                line += f"  ❌ drift {entry['max_drift']:.4f} > {args.max_drift}"
+                failed = True
+        print(line)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"📁 Saved to: {args.output}")
+    sys.exit(1 if failed else 0)
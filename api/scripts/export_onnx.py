@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Export the embedding model to ONNX for EMBEDDING_BACKEND=onnx.
+
+Writes model.onnx (float32), and with --quantize also model_quantized.onnx
+(int8 dynamic quantization of the weights), plus the tokenizer and an
+export_config.json to ONNX_MODEL_DIR. This is the only step that needs
+torch and the model download; serving loads the directory offline.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from embedding_utils import MODEL_NAME, EMBEDDING_DIM
+from embedding_backends import ONNX_MODEL_DIR, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, ONNX_CONFIG_FILE
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+def export(output_dir, quantize=False, opset=14):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    sentence_model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+
+    sample = tokenizer(["export sample", "a slightly longer export sample"],
+                       padding=True, return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = output_dir / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in INPUT_NAMES),
+            str(model_path),
+            input_names=INPUT_NAMES,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"✅ Wrote {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = output_dir / ONNX_QUANTIZED_MODEL_FILE
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        print(f"✅ Wrote {quantized_path}")
+
+    # tokenizer.json is all the tokenizers library needs at serving time
+    tokenizer.save_pretrained(str(output_dir))
+    with open(output_dir / ONNX_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": MODEL_NAME,
+            "dim": EMBEDDING_DIM,
+            "max_seq_length": sentence_model.max_seq_length,
+            "pad_token_id": tokenizer.pad_token_id,
+            "opset": opset
+        }, f, indent=2)
+    print(f"✅ Exported {MODEL_NAME} to {output_dir}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    parser.add_argument("--output", type=Path, default=ONNX_MODEL_DIR)
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 dynamically quantized model")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.output, args.quantize, args.opset)
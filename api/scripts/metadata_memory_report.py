@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Memory report for the columnar metadata store.
+Loads a synthetic metadata sidecar either as per-row dicts (the previous
+layout) or into a MetadataStore, each in a fresh subprocess, and reports
+resident memory plus bytes allocated per query (building top-k results and
+formatting them for the frontend).
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from metadata_store import MetadataStore
+from synthetic_catalog import generate_metadata
+
+def rss_bytes():
+    """Current resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def format_professor(match):
+    """Same field reads as search_service.format_professor (kept local: no model imports)."""
+    metadata = match.get("metadata", {})
+    return {
+        "id": metadata.get("professor_id", "unknown"),
+        "name": metadata.get("name", "Unknown"),
+        "subject": metadata.get("subject", "Unknown Subject"),
+        "department": metadata.get("department", "Unknown Department"),
+        "rating": metadata.get("avg_rating", 0),
+        "num_reviews": metadata.get("num_reviews", 0),
+        "tags": metadata.get("tags", []),
+        "similarity_score": round(match.get("score", 0), 4),
+        "final_score": round(match.get("final_score", 0), 4),
+        "bio": metadata.get("bio", "")
+    }
+
+def measure(mode, path, top_k, queries):
+    """Load the sidecar in ``mode`` and return RSS and per-query allocation figures."""
+    gc.collect()
+    baseline = rss_bytes()
+    with open(path, "rb") as f:
+        records = json.load(f)
+
+    if mode == "columnar":
+        store = MetadataStore.from_records(records)
+        del records
+        gc.collect()
+        row_view = store.row
+    else:
+        row_view = records.__getitem__
+    resident = rss_bytes() - baseline
+
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    allocated = []
+    for _ in range(queries):
+        rows = rng.integers(0, len(store) if mode == "columnar" else len(records), top_k)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        matches = [{"id": str(row), "score": 0.5, "metadata": row_view(int(row))} for row in rows]
+        formatted = [format_professor(match) for match in matches]
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+        del matches, formatted
+    tracemalloc.stop()
+
+    return {"mode": mode, "resident_mb": resident / 1e6, "bytes_per_query": float(np.median(allocated))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-row dict metadata with the columnar store.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--measure", choices=["dicts", "columnar"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.path, args.top_k, args.queries)))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "metadata.json"
+        path.write_text(json.dumps(generate_metadata(args.rows), separators=(",", ":")))
+        results = []
+        for mode in ("dicts", "columnar"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--path", str(path),
+                 "--top-k", str(args.top_k), "--queries", str(args.queries)],
+                check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output))
+
+    print(f"📊 {args.rows:,} rows, top_k={args.top_k}")
+    for result in results:
+        print(f"  {result['mode']:<9} resident {result['resident_mb']:8.1f} MB   "
+              f"{result['bytes_per_query']:>9,.0f} bytes allocated per query")
+
+    if args.output:
+        args.output.write_text(json.dumps({"rows": args.rows, "top_k": args.top_k, "results": results}, indent=2))
+        print(f"📁 Saved to: {args.output}")
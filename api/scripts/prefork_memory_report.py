@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Memory report for pre-fork serving.
+Writes a synthetic binary index, then runs N serving processes two ways:
+
+- independent: N fresh processes that each load the index (and model);
+- prefork: one master that loads everything (startup.preload_before_fork,
+  as gunicorn.conf.py does) and forks N workers.
+
+Every worker runs the same queries, then the driver reads
+/proc/<pid>/smaps_rollup. RSS counts shared pages in full for every
+process. PSS splits them between their sharers, so the sum of PSS is the
+real memory footprint. Private memory is what each worker adds.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ann_report import synthetic_vectors
+from index_format import write_binary_index
+from synthetic_catalog import generate_metadata
+
+def smaps_rollup(pid):
+    """RSS, PSS, shared and private memory of a process in MB (Linux)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024 / 1e6
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)
+    }
+
+def serve_queries(queries, use_model):
+    """Answer ``queries`` search requests the way a worker would."""
+    from pinecone_utils import pinecone_query
+    rng = np.random.default_rng(os.getpid())
+    for position in range(queries):
+        if use_model:
+            from embedding_utils import create_embeddings
+            vector = create_embeddings(f"professor with clear lectures {position}")
+        else:
+            vector = rng.standard_normal(384).astype(np.float32)
+        pinecone_query(vector, top_k=20, query_text="clear lectures")
+
+def serve(mode, workers, queries, use_model):
+    """Run in the index directory: load, serve ``queries``, report pids, wait for stdin to close."""
+    import startup
+    from embedding_utils import get_model
+    from pinecone_utils import load_local_index
+
+    if mode == "independent":
+        load_local_index()
+        if use_model:
+            get_model()
+        serve_queries(queries, use_model)
+        pids = [os.getpid()]
+    else:
+        startup.preload_before_fork()
+        pids = []
+        for _ in range(workers):
+            pid = os.fork()
+            if pid == 0:
+                if use_model:
+                    get_model()
+                serve_queries(queries, use_model)
+                sys.stdin.read()
+                os._exit(0)
+            pids.append(pid)
+        # The master stays alive (it holds the shared pages) but serves nothing
+        pids.insert(0, os.getpid())
+
+    print(json.dumps({"pids": pids}), flush=True)
+    sys.stdin.read()
+    for pid in pids[1:]:
+        os.waitpid(pid, 0)
+
+def measure(mode, directory, workers, queries, use_model):
+    """Start the processes of ``mode`` and collect smaps_rollup of each."""
+    command = [sys.executable, __file__, "--serve", mode, "--workers", str(workers), "--queries", str(queries)]
+    if not use_model:
+        command.append("--no-model")
+    count = workers if mode == "independent" else 1
+    processes = [subprocess.Popen(command, cwd=directory, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True) for _ in range(count)]
+    try:
+        pids = []
+        for process in processes:
+            while True:
+                line = process.stdout.readline()
+                if not line:
+                    raise RuntimeError(f"{mode} process exited before reporting")
+                if line.startswith("{"):
+                    pids.extend(json.loads(line)["pids"])
+                    break
+        usage = {pid: smaps_rollup(pid) for pid in pids}
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+    master = usage.pop(pids[0]) if mode == "prefork" else None
+    worker_usage = list(usage.values())
+    result = {
+        "mode": mode,
+        "workers": workers,
+        "rss_per_worker_mb": float(np.mean([item["rss_mb"] for item in worker_usage])),
+        "private_per_worker_mb": float(np.mean([item["private_mb"] for item in worker_usage])),
+        "shared_per_worker_mb": float(np.mean([item["shared_mb"] for item in worker_usage])),
+        "total_pss_mb": float(sum(item["pss_mb"] for item in worker_usage) + (master["pss_mb"] if master else 0))
+    }
+    if master:
+        result["master_rss_mb"] = master["rss_mb"]
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare worker memory of independent and pre-forked processes.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50, help="Queries each worker serves before measuring")
+    parser.add_argument("--no-model", action="store_true", help="Do not load the embedding model (index only)")
+    parser.add_argument("--serve", choices=["independent", "prefork"], help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.workers, args.queries, not args.no_model)
+        sys.exit(0)
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        metadata = generate_metadata(args.rows, args.seed)
+        write_binary_index(Path(tmp) / "data" / "local_index.bin",
+                           ids=[f"row_{row}" for row in range(args.rows)],
+                           vectors=synthetic_vectors(args.rows, 300, 1.5, rng),
+                           metadata=metadata)
+        del metadata
+        results = [measure(mode, tmp, args.workers, args.queries, not args.no_model)
+                   for mode in ("independent", "prefork")]
+
+    print(f"📊 {args.rows:,} rows, {args.workers} workers, model {'off' if args.no_model else 'on'}")
+    for result in results:
+        print(f"  {result['mode']:<11} per worker: RSS {result['rss_per_worker_mb']:7.1f} MB, "
+              f"private {result['private_per_worker_mb']:7.1f} MB   total PSS {result['total_pss_mb']:8.1f} MB")
+
+    if args.output:
+        args.output.write_text(json.dumps({"rows": args.rows, "results": results}, indent=2))
+        print(f"📁 Saved to: {args.output}")
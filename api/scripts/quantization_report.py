@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Recall and memory report for quantized vector storage.
+For float16 and int8 it measures recall@k of the compact scores alone and
+after rescoring a shortlist in full precision, plus query latency and the
+memory needed per million 384-dim vectors. Uses a synthetic clustered
+catalog by default (no model download needed).
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ann_report import synthetic_vectors
+from index_format import normalize_rows, read_binary_index
+from pinecone_utils import top_k_rows
+from quantization import QuantizedVectors, QUANTIZATION_MODES
+
+def megabytes_per_million(nbytes, rows):
+    return nbytes / rows * 1_000_000 / 1e6
+
+def run_report(vectors, queries, top_k, rescore_factor):
+    """Compare each storage mode against exact float32 search."""
+    rows = vectors.shape[0]
+    exact = [set(top_k_rows(vectors @ query, top_k).tolist()) for query in queries]
+    report = {
+        "rows": int(rows),
+        "dim": int(vectors.shape[1]),
+        "top_k": top_k,
+        "rescore_factor": rescore_factor,
+        "modes": [{
+            "mode": "float32",
+            "mb_per_million": round(megabytes_per_million(vectors.nbytes, rows), 1),
+            "recall_compact": 1.0,
+            "recall_rescored": 1.0
+        }]
+    }
+
+    for mode in QUANTIZATION_MODES:
+        quantized = QuantizedVectors.encode(vectors, mode)
+        compact_recalls, rescored_recalls, timings = [], [], []
+        for query, expected in zip(queries, exact):
+            start = time.perf_counter()
+            approximate = quantized.scores(query)
+            shortlist = np.sort(top_k_rows(approximate, top_k * rescore_factor))
+            rescored = shortlist[top_k_rows(vectors[shortlist] @ query, top_k)]
+            timings.append(time.perf_counter() - start)
+
+            compact = top_k_rows(approximate, top_k)
+            compact_recalls.append(len(expected & set(compact.tolist())) / top_k)
+            rescored_recalls.append(len(expected & set(rescored.tolist())) / top_k)
+
+        report["modes"].append({
+            "mode": mode,
+            "mb_per_million": round(megabytes_per_million(quantized.nbytes, rows), 1),
+            "recall_compact": round(float(np.mean(compact_recalls)), 4),
+            "recall_rescored": round(float(np.mean(rescored_recalls)), 4),
+            "median_ms": round(float(np.median(timings) * 1000), 3)
+        })
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare quantized storage modes to float32.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--clusters", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--index", type=Path, default=None, help="Use a real binary index instead of synthetic data")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    if args.index:
+        _, vectors, _, _, _ = read_binary_index(args.index)
+        vectors = np.asarray(vectors)
+    else:
+        vectors = synthetic_vectors(args.rows, args.clusters, args.noise, rng)
+
+    picks = rng.integers(0, vectors.shape[0], args.queries)
+    queries = normalize_rows(vectors[picks] + 0.05 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32))
+
+    # Time exact float32 search for reference
+    start = time.perf_counter()
+    for query in queries:
+        top_k_rows(vectors @ query, args.top_k)
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    report = run_report(vectors, queries, args.top_k, args.rescore_factor)
+    report["modes"][0]["median_ms"] = round(exact_ms, 3)
+
+    print(f"📊 {report['rows']:,} rows x {report['dim']} dims, top_k={report['top_k']}, "
+          f"shortlist={report['top_k'] * report['rescore_factor']}")
+    for entry in report["modes"]:
+        print(f"  {entry['mode']:<8} {entry['mb_per_million']:>7.1f} MB/1M vectors  "
+              f"recall compact={entry['recall_compact']:.4f} rescored={entry['recall_rescored']:.4f}  "
+              f"{entry['median_ms']:.3f} ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"📁 Saved to: {args.output}")
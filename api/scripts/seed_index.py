@@ -2,19 +2,39 @@
 """
 Improved seed script - creates ONE embedding per professor to avoid duplicates.
 Run this script after updating professors.json to rebuild the search index.
+Rebuilds are incremental: only professors whose text changed are re-embedded.
+With --granularity review, each review and each profile (bio) is embedded
+as its own row tagged with the professor_id; search aggregates them back
+per professor.
 """
+import argparse
+import hashlib
+import inspect
+import itertools
 import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
 # Add parent directory to path to import our modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from embedding_utils import create_embeddings
+from embedding_utils import create_embeddings_batch, get_model, MODEL_KEY, EMBEDDING_DIM
+from index_format import write_binary_index, read_binary_index, metadata_path, columns_path, ann_path, quantized_path, index_version
+from ann_index import IVFIndex
+from quantization import QuantizedVectors, QUANTIZATION_MODES
+from sharding import write_shards
 
 # File paths
 DATA_FILE = Path("data/professors.json")
-OUTPUT_FILE = Path("data/local_index.json")
+OUTPUT_FILE = Path("data/local_index.bin")
+LEGACY_OUTPUT_FILE = Path("data/local_index.json")
+
+DEFAULT_BATCH_SIZE = 64
 
 def create_professor_text(professor):
     """
@@ -58,7 +78,186 @@ def create_professor_text(professor):
     
     return ' '.join(text_parts)
 
-def main():
+def create_profile_text(professor):
+    """Profile row of a review-level index: core info, bio and tags (no reviews)."""
+    name = professor.get('name', 'Unknown')
+    subject = professor.get('subject', 'Unknown Subject')
+    department = professor.get('department', 'Unknown Department')
+    
+    text_parts = [f"Professor {name} teaches {subject} in the {department} department."]
+    bio = professor.get('bio', '').strip()
+    if bio:
+        text_parts.append(bio)
+    tags = professor.get('tags', [])
+    if tags:
+        text_parts.append(f"Known for: {', '.join(tags)}.")
+    return ' '.join(text_parts)
+
+def professor_rows(professor, prof_id, granularity):
+    """
+    (row id, text, row type) of every row embedded for a professor: one
+    professor row, or a profile row plus one row per non-empty review.
+    """
+    if granularity == "professor":
+        return [(prof_id, create_professor_text(professor), None)]
+    
+    rows = [(f"{prof_id}#profile", create_profile_text(professor), "profile")]
+    for i, review in enumerate(professor.get('reviews', [])):
+        text = review.get('text', '').strip()
+        if text:
+            rows.append((f"{prof_id}#review-{i}", text, "review"))
+    return rows
+
+def content_hash(text):
+    """Stable hash of a professor's embedded text, used to detect changed rows."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# Any edit to the text functions of a granularity changes its hash and forces a full rebuild
+TEXT_TEMPLATE_HASH = content_hash(inspect.getsource(create_professor_text))
+TEXT_TEMPLATE_HASHES = {
+    "professor": TEXT_TEMPLATE_HASH,
+    "review": content_hash(inspect.getsource(create_profile_text) + inspect.getsource(professor_rows))
+}
+
+def build_info(granularity="professor"):
+    """Build information stored in the index sidecar."""
+    return {
+        "source": str(DATA_FILE),
+        "embedding_model": MODEL_KEY,
+        "text_template": TEXT_TEMPLATE_HASHES[granularity],
+        "granularity": granularity
+    }
+
+def load_reusable_vectors(granularity="professor"):
+    """
+    Map row id -> (content hash, vector) from the existing index.
+    Returns an empty dict (full rebuild) when there is no usable index or it
+    was built with a different model, text template or granularity.
+    """
+    if not OUTPUT_FILE.exists():
+        return {}
+    
+    try:
+        _, vectors, ids, metadata, info = read_binary_index(OUTPUT_FILE)
+    except Exception as e:
+        print(f"⚠️  Existing index unreadable, doing a full rebuild: {e}")
+        return {}
+    
+    if info.get("embedding_model") != MODEL_KEY:
+        print(f"🔁 Embedding model changed ({info.get('embedding_model')} -> {MODEL_KEY}), doing a full rebuild")
+        return {}
+    if info.get("granularity", "professor") != granularity:
+        print(f"🔁 Index granularity changed ({info.get('granularity', 'professor')} -> {granularity}), doing a full rebuild")
+        return {}
+    if info.get("text_template") != TEXT_TEMPLATE_HASHES[granularity]:
+        print("🔁 Professor text template changed, doing a full rebuild")
+        return {}
+    
+    return {
+        row_id: (meta.get("content_hash"), vectors[row])
+        for row, (row_id, meta) in enumerate(zip(ids, metadata))
+    }
+
+def save_index(index_entries, output_format, granularity="professor"):
+    """Write index entries in the binary format (default) or legacy JSON."""
+    if output_format == "json":
+        LEGACY_OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        entries = [{**entry, "vector": np.asarray(entry["vector"]).tolist()} for entry in index_entries]
+        with open(LEGACY_OUTPUT_FILE, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        return [LEGACY_OUTPUT_FILE]
+    
+    write_binary_index(
+        OUTPUT_FILE,
+        ids=[entry["id"] for entry in index_entries],
+        vectors=[entry["vector"] for entry in index_entries],
+        metadata=[entry["metadata"] for entry in index_entries],
+        info=build_info(granularity),
+    )
+    return [OUTPUT_FILE, metadata_path(OUTPUT_FILE), columns_path(OUTPUT_FILE)]
+
+def build_ann_index(nlist=None):
+    """Build the IVF structure for the binary index just written and save it next to it."""
+    header, vectors, _, _, _ = read_binary_index(OUTPUT_FILE)
+    start_time = time.perf_counter()
+    ivf = IVFIndex.build(vectors, nlist=nlist)
+    ivf.save(ann_path(OUTPUT_FILE), index_version(header))
+    print(f"🧭 Built IVF index with {ivf.nlist} lists in {time.perf_counter() - start_time:.2f}s")
+    return ann_path(OUTPUT_FILE)
+
+def build_quantized_vectors(mode):
+    """Quantize the binary index just written and save it next to it."""
+    header, vectors, _, _, _ = read_binary_index(OUTPUT_FILE)
+    quantized = QuantizedVectors.encode(vectors, mode)
+    quantized.save(quantized_path(OUTPUT_FILE, mode), index_version(header))
+    print(f"🗜️  Quantized vectors to {mode} ({quantized.nbytes / 1e6:.2f} MB in memory)")
+    return quantized_path(OUTPUT_FILE, mode)
+
+def create_index_entry(professor, prof_id, professor_text, embedding, text_hash, row_id=None, row_type=None):
+    """
+    Build the index entry (vector + metadata) for one professor, or for one
+    of its rows (``row_id``, ``row_type``) in a review-level index.
+    """
+    entry = {
+        "id": row_id or prof_id,
+        "vector": embedding,
+        "metadata": {
+            "professor_id": prof_id,
+            "name": professor.get("name", "Unknown"),
+            "subject": professor.get("subject", "Unknown Subject"),
+            "department": professor.get("department", "Unknown Department"),
+            "avg_rating": professor.get("avg_rating", 0),
+            "num_reviews": professor.get("num_reviews", 0),
+            "tags": professor.get("tags", []),
+            "bio": professor.get("bio", ""),
+            "full_text": professor_text,  # Store for debugging
+            "content_hash": text_hash,  # Lets the next rebuild reuse this vector
+            "profile_url": professor.get("profile_url", "")
+        }
+    }
+    if row_type:
+        # Review rows keep the review as full_text, returned as the match snippet
+        entry["metadata"]["row_type"] = row_type
+    return entry
+
+def _init_worker(num_threads):
+    """Process-pool initializer: load one model per worker, limited to ``num_threads``."""
+    get_model(num_threads=num_threads)
+
+def _encode_batches(batches, batch_size, workers):
+    """Yield one embedding matrix per batch, in order, serially or from a process pool."""
+    if workers <= 1:
+        for batch in batches:
+            yield create_embeddings_batch(batch, batch_size=batch_size)
+        return
+    
+    # Split the cores between workers so they do not oversubscribe the CPU
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as pool:
+        yield from pool.map(create_embeddings_batch, batches, itertools.repeat(batch_size))
+
+def embed_texts(texts, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """
+    Embed texts in batches of ``batch_size``, optionally fanned out across
+    ``workers`` processes, printing throughput as batches complete.
+    Returns a float32 array of shape (len(texts), EMBEDDING_DIM).
+    """
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    
+    start_time = time.perf_counter()
+    done = 0
+    for embeddings in _encode_batches(batches, batch_size, workers):
+        vectors[done:done + len(embeddings)] = embeddings
+        done += len(embeddings)
+        elapsed = time.perf_counter() - start_time
+        print(f"  Embedded {done}/{len(texts)} rows ({done / max(elapsed, 1e-9):.1f} rows/sec)")
+    
+    return vectors
+
+def main(output_format="binary", batch_size=DEFAULT_BATCH_SIZE, workers=1, full_rebuild=False,
+         ann=None, nlist=None, quantize=(), granularity="professor", shards=0):
     """Main function to create and save the search index."""
     
     # Check if professors data exists
@@ -76,61 +275,77 @@ def main():
         print(f"❌ Error loading professor data: {e}")
         return False
     
-    # Create index entries (ONE per professor)
-    index_entries = []
-    
-    print("🔄 Creating embeddings...")
-    
+    # Create comprehensive text for each professor (ONE per professor,
+    # or one per review plus a profile row at review granularity)
+    rows = []
     for i, professor in enumerate(professors):
         prof_name = professor.get('name', f'Professor {i+1}')
         prof_id = professor.get('id', f'prof_{i}')
-        
-        print(f"  Processing {prof_name}...")
+        try:
+            for row_id, text, row_type in professor_rows(professor, prof_id, granularity):
+                rows.append((professor, prof_id, row_id, text, content_hash(text), row_type))
+        except Exception as e:
+            print(f"    ⚠️  Warning: Failed to build text for {prof_name}: {e}")
+    
+    # Reuse vectors of unchanged rows from the previous index
+    existing = {} if full_rebuild or output_format != "binary" else load_reusable_vectors(granularity)
+    vectors = np.zeros((len(rows), EMBEDDING_DIM), dtype=np.float32)
+    to_embed = []
+    for i, (_, _, row_id, _, text_hash, _) in enumerate(rows):
+        cached = existing.get(row_id)
+        if cached is not None and cached[0] == text_hash:
+            vectors[i] = cached[1]
+        else:
+            to_embed.append(i)
+    
+    current_ids = {row_id for _, _, row_id, _, _, _ in rows}
+    deleted = sum(1 for row_id in existing if row_id not in current_ids)
+    print(f"♻️  Reusing {len(rows) - len(to_embed)} vectors, embedding {len(to_embed)} "
+          f"new/changed, dropping {deleted} deleted")
+    
+    if to_embed:
+        print(f"🔄 Creating embeddings (batch size {batch_size}, {workers} worker(s))...")
         
         try:
-            # Create comprehensive text for this professor
-            professor_text = create_professor_text(professor)
-            
-            # Create single embedding
-            embedding = create_embeddings(professor_text)
-            
-            # Create index entry
-            entry = {
-                "id": prof_id,
-                "vector": embedding,
-                "metadata": {
-                    "professor_id": prof_id,
-                    "name": professor.get("name", "Unknown"),
-                    "subject": professor.get("subject", "Unknown Subject"),
-                    "department": professor.get("department", "Unknown Department"),
-                    "avg_rating": professor.get("avg_rating", 0),
-                    "num_reviews": professor.get("num_reviews", 0),
-                    "tags": professor.get("tags", []),
-                    "bio": professor.get("bio", ""),
-                    "full_text": professor_text,  # Store for debugging
-                    "profile_url": professor.get("profile_url", "")
-                }
-            }
-            
-            index_entries.append(entry)
-            
+            start_time = time.perf_counter()
+            vectors[to_embed] = embed_texts([rows[i][3] for i in to_embed],
+                                            batch_size=batch_size, workers=workers)
+            elapsed = time.perf_counter() - start_time
+            print(f"⚡ Embedded {len(to_embed)} rows in {elapsed:.2f}s "
+                  f"({len(to_embed) / max(elapsed, 1e-9):.1f} rows/sec)")
         except Exception as e:
-            print(f"    ⚠️  Warning: Failed to create embedding for {prof_name}: {e}")
-            continue
+            print(f"❌ Error creating embeddings: {e}")
+            return False
+    
+    index_entries = [
+        create_index_entry(professor, prof_id, text, vectors[i], text_hash,
+                           row_id=row_id if row_type else None, row_type=row_type)
+        for i, (professor, prof_id, row_id, text, text_hash, row_type) in enumerate(rows)
+    ]
     
     # Save index
     try:
-        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(index_entries, f, indent=2)
+        written = save_index(index_entries, output_format, granularity)
+        if ann == "ivf" and output_format == "binary":
+            written.append(build_ann_index(nlist))
+        if output_format == "binary":
+            for mode in quantize:
+                written.append(build_quantized_vectors(mode))
+            if shards > 0:
+                written.extend(write_shards(OUTPUT_FILE, shards))
+                print(f"🧩 Split the index into {shards} shards by professor_id")
         
-        print(f"✅ Successfully created index with {len(index_entries)} professors")
-        print(f"📁 Saved to: {OUTPUT_FILE}")
-        print(f"📊 One embedding per professor (no duplicates)")
+        professor_entries = {entry['metadata']['professor_id']: entry for entry in index_entries}
+        print(f"✅ Successfully created index with {len(professor_entries)} professors")
+        print(f"📁 Saved to: {', '.join(str(path) for path in written)}")
+        if granularity == "professor":
+            print(f"📊 One embedding per professor (no duplicates)")
+        else:
+            print(f"📊 {len(index_entries)} review/profile embeddings, aggregated per professor at query time")
         
         # Show some stats
         subjects = {}
-        for entry in index_entries:
+        for entry in professor_entries.values():
             subject = entry['metadata']['subject']
             subjects[subject] = subjects.get(subject, 0) + 1
         
@@ -145,10 +360,33 @@ def main():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the professor search index.")
+    parser.add_argument("--format", choices=["binary", "json"], default="binary",
+                        help="Index format to write (default: memory-mappable binary)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Texts per model.encode call")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Embedding worker processes (each loads its own model)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-embed every professor instead of only changed ones")
+    parser.add_argument("--ann", choices=["ivf"], default=None,
+                        help="Also build an approximate-search structure (binary format only)")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="IVF list count (default ~4*sqrt(rows))")
+    parser.add_argument("--quantize", choices=QUANTIZATION_MODES, action="append", default=[],
+                        help="Also write a quantized copy of the vectors (repeatable)")
+    parser.add_argument("--granularity", choices=["professor", "review"], default="professor",
+                        help="One row per professor, or one per review plus a profile row")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Also split the index into N shards for scatter-gather search (binary format only)")
+    args = parser.parse_args()
+    
     print("🚀 RAG Professor Review - Improved Index Builder")
     print("=" * 50)
     
-    success = main()
+    success = main(output_format=args.format, batch_size=args.batch_size, workers=args.workers,
+                   full_rebuild=args.full, ann=args.ann, nlist=args.nlist,
+                   quantize=args.quantize, granularity=args.granularity, shards=args.shards)
     
     if success:
         print("\n🎉 Index creation completed successfully!")
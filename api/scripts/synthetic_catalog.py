@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Synthetic professor catalog shaped like data/professors.json.
+Used by the offline reports and benchmarks so they can run at any catalog
+size without real data or a model download.
+"""
+import hashlib
+
+import numpy as np
+
+SUBJECTS = [
+    ("Mathematics", ["Calculus I", "Linear Algebra", "Statistics", "Geometry"]),
+    ("Computer Science", ["Data Structures", "Intro to Programming", "Software Engineering", "Algorithms"]),
+    ("Chemistry", ["Organic Chemistry", "Inorganic Chemistry", "General Chemistry"]),
+    ("Physics", ["Classical Mechanics", "Quantum Physics", "Thermodynamics"]),
+    ("Psychology", ["Introduction to Psychology", "Cognitive Psychology", "Behavioral Science"]),
+    ("Nursing", ["Medical-Surgical Nursing", "Public Health"]),
+    ("English", ["Creative Writing", "American Literature", "Composition"]),
+    ("History", ["World History", "Modern Europe"]),
+    ("Economics", ["Microeconomics", "Macroeconomics"]),
+    ("Biology", ["Molecular Biology", "Genetics"]),
+]
+TAGS = [
+    "clear lectures", "helpful office hours", "fair grading", "tough grader", "engaging",
+    "lots of homework", "inspirational", "caring", "test heavy", "amazing teacher",
+    "group projects", "respected", "accessible outside class", "lecture heavy", "funny",
+]
+FIRST_NAMES = ["Jane", "John", "Lisa", "Mike", "Amanda", "Tom", "Emily", "Mark", "Sophia", "Alex",
+               "Olivia", "Robert", "Sarah", "David", "Maria", "James", "Nina", "Omar", "Grace", "Wei"]
+LAST_NAMES = ["Doe", "Smith", "Chen", "Davis", "Taylor", "Green", "Clark", "Evans", "Lee", "Patel",
+              "Walker", "Wilson", "Kim", "Garcia", "Nguyen", "Brown", "Khan", "Lopez", "Ito", "Novak"]
+REVIEW_SNIPPETS = [
+    "Explains concepts clearly and gives great examples.",
+    "Exams are fair but you need to keep up with the reading.",
+    "Office hours are really helpful for difficult material.",
+    "Lectures can be dry, but the notes are excellent.",
+    "Grades harshly, start assignments early.",
+    "Makes a hard subject feel manageable.",
+]
+
+def sample_queries(count, rng):
+    """Short search-style queries built from the catalog vocabulary."""
+    queries = []
+    for _ in range(count):
+        _, subjects = SUBJECTS[rng.integers(len(SUBJECTS))]
+        tag = TAGS[rng.integers(len(TAGS))]
+        queries.append(f"{subjects[rng.integers(len(subjects))]} professor with {tag}")
+    return queries
+
+def generate_professors(count, seed=0):
+    """``count`` professor records in the professors.json format."""
+    rng = np.random.default_rng(seed)
+    professors = []
+    for i in range(count):
+        department, subjects = SUBJECTS[rng.integers(len(SUBJECTS))]
+        name = f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]}"
+        reviews = [
+            {"text": REVIEW_SNIPPETS[j], "rating": int(rng.integers(1, 6)), "term": "Fall 2024"}
+            for j in rng.choice(len(REVIEW_SNIPPETS), size=int(rng.integers(1, 6)), replace=False)
+        ]
+        professors.append({
+            "id": f"prof_{i}",
+            "name": name,
+            "department": department,
+            "subject": subjects[rng.integers(len(subjects))],
+            "avg_rating": round(float(rng.uniform(1.5, 5.0)), 1),
+            "num_reviews": int(rng.integers(1, 400)),
+            "tags": [TAGS[j] for j in rng.choice(len(TAGS), size=3, replace=False)],
+            "reviews": reviews,
+            "bio": f"PhD in {department}. Teaching for {int(rng.integers(2, 30))} years.",
+            "profile_url": f"https://university.example/prof_{i}"
+        })
+    return professors
+
+def index_metadata(professor, professor_text):
+    """Index metadata for a professor, as written by seed_index.py."""
+    return {
+        "professor_id": professor["id"],
+        "name": professor["name"],
+        "subject": professor["subject"],
+        "department": professor["department"],
+        "avg_rating": professor["avg_rating"],
+        "num_reviews": professor["num_reviews"],
+        "tags": professor["tags"],
+        "bio": professor["bio"],
+        "full_text": professor_text,
+        "content_hash": hashlib.sha256(professor_text.encode("utf-8")).hexdigest(),
+        "profile_url": professor["profile_url"]
+    }
+
+def generate_metadata(count, seed=0):
+    """``count`` index metadata records (with a representative full_text)."""
+    metadata = []
+    for professor in generate_professors(count, seed):
+        text = (f"Professor {professor['name']} teaches {professor['subject']} in the "
+                f"{professor['department']} department. {professor['bio']} "
+                f"Known for: {', '.join(professor['tags'])}. Student feedback: "
+                + " ".join(review["text"] for review in professor["reviews"][:3]))
+        metadata.append(index_metadata(professor, text))
+    return metadata
@@ -0,0 +1,379 @@
+import json
+import os
+import time
+from functools import partial
+from embedding_utils import (create_embeddings, create_embeddings_batch, normalize_query_text,
+                             model_loaded, load_model_in_background)
+from pinecone_utils import (pinecone_query, pinecone_query_batch, lexical_query, get_index_version,
+                            LEXICAL_FAST_PATH)
+from chat_completion_utils import detect_subject, select_professors, generate_answer
+from response_cache import response_cache
+from inference_pool import check_deadline, DeadlineExceeded
+from log_utils import get_logger
+from metrics_utils import stage_timer, request_histogram
+
+logger = get_logger(__name__)
+
+# Reranked matches (one per professor) fetched from the index
+SEARCH_TOP_K = 20
+# Candidates (by similarity) reranked on rating and review count; the
+# vectorized reranker handles 10k+ per query
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", str(SEARCH_TOP_K)))
+# Accept values that switch /api/search to a streamed response
+STREAM_MIMETYPES = ("application/x-ndjson", "text/event-stream")
+# Max queries accepted by one /api/search/batch request
+BATCH_MAX_QUERIES = 1000
+# Reranked results handed to response generation
+RERANK_TOP_N = 5
+RERANK_WEIGHTS = {
+    "similarity_weight": 0.7,
+    "rating_weight": 0.25,
+    "review_count_weight": 0.05
+}
+
+def format_professor(match):
+    """Format one match for the frontend."""
+    metadata = match.get("metadata", {})
+    return {
+        "id": metadata.get("professor_id", "unknown"),
+        "name": metadata.get("name", "Unknown"),
+        "subject": metadata.get("subject", "Unknown Subject"),
+        "department": metadata.get("department", "Unknown Department"),
+        "rating": metadata.get("avg_rating", 0),
+        "num_reviews": metadata.get("num_reviews", 0),
+        "tags": metadata.get("tags", []),
+        "similarity_score": round(match.get("score", 0), 4),
+        "final_score": round(match.get("final_score", 0), 4),
+        "bio": metadata.get("bio", ""),
+        "review_snippet": match.get("snippet")
+    }
+
+def build_response(user_query, raw_matches):
+    """Generate the answer and format the response body for reranked matches."""
+    # Matches arrive reranked from the index, one per professor
+    top_matches = raw_matches[:RERANK_TOP_N]
+    
+    # Filter by subject; the answer and the professor list use the same results
+    with stage_timer("subject_filter"):
+        professors, target_subject = select_professors(user_query, top_matches)
+    with stage_timer("answer"):
+        answer = generate_answer(user_query, professors, target_subject)
+    with stage_timer("format"):
+        formatted = [format_professor(match) for match in professors]
+    
+    return {
+        "query": user_query,
+        "answer": answer,
+        "professors": formatted,
+        "total_found": len(raw_matches)
+    }
+
+def parse_filters(raw_filters):
+    """
+    Validate the optional structured filters of a request:
+    {"min_rating", "max_rating", "min_reviews", "max_reviews",
+     "tags", "exclude_tags", "department"}.
+    Returns a clean dict (or None) and raises ValueError on bad input.
+    """
+    if raw_filters is None:
+        return None
+    if not isinstance(raw_filters, dict):
+        raise ValueError("'filters' must be an object")
+    
+    filters = {}
+    for key, value in raw_filters.items():
+        if value is None:
+            continue
+        if key in ("min_rating", "max_rating", "min_reviews", "max_reviews"):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Filter '{key}' must be a number")
+        elif key in ("tags", "exclude_tags"):
+            if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+                raise ValueError(f"Filter '{key}' must be a list of strings")
+        elif key == "department":
+            if not isinstance(value, str):
+                raise ValueError("Filter 'department' must be a string")
+        else:
+            raise ValueError(f"Unknown filter '{key}'")
+        filters[key] = value
+    return filters or None
+
+def parse_weights(raw_weights):
+    """
+    Validate optional per-request rerank weight overrides, e.g.
+    {"rating_weight": 0.5}. Returns the full weight dict (defaults from
+    RERANK_WEIGHTS) and raises ValueError on bad input.
+    """
+    if raw_weights is None:
+        return dict(RERANK_WEIGHTS)
+    if not isinstance(raw_weights, dict):
+        raise ValueError("'weights' must be an object")
+    
+    weights = dict(RERANK_WEIGHTS)
+    for key, value in raw_weights.items():
+        if key not in RERANK_WEIGHTS:
+            raise ValueError(f"Unknown weight '{key}'")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"Weight '{key}' must be a non-negative number")
+        weights[key] = float(value)
+    return weights
+
+def parse_search_request(data):
+    """
+    Validate an /api/search body. Returns (query, filters, weights) and
+    raises ValueError with the message for the client on bad input.
+    """
+    if not isinstance(data, dict) or not data.get('query'):
+        raise ValueError("Missing 'query' parameter")
+    if not isinstance(data['query'], str) or not data['query'].strip():
+        raise ValueError("Query cannot be empty")
+    return data['query'].strip(), parse_filters(data.get('filters')), parse_weights(data.get('weights'))
+
+def parse_batch_request(data):
+    """
+    Validate an /api/search/batch body. Returns (queries, filters, weights)
+    and raises ValueError with the message for the client on bad input.
+    """
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("Missing 'queries' list")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f"At most {BATCH_MAX_QUERIES} queries per batch")
+    return queries, parse_filters(data.get('filters')), parse_weights(data.get('weights'))
+
+def query_filters(user_query, structured_filters=None):
+    """Metadata pre-filter for a query: structured filters plus its detected subject."""
+    filters = dict(structured_filters or {})
+    target_subject = detect_subject(user_query)
+    if target_subject:
+        filters["subject"] = target_subject
+    return filters or None
+
+def without_subject(filters):
+    """The structured part of a pre-filter (hard constraints that are never relaxed)."""
+    remaining = {key: value for key, value in (filters or {}).items() if key != "subject"}
+    return remaining or None
+
+def retrieve(query_fn, filters):
+    """Run ``query_fn(filters=...)``, retrying without the subject when its slice is empty."""
+    raw_matches = query_fn(filters=filters)
+    if not raw_matches and filters and "subject" in filters:
+        # No professor indexed under that subject: drop only the subject
+        raw_matches = query_fn(filters=without_subject(filters))
+    return raw_matches
+
+def use_lexical_fast_path():
+    """True while queries should be answered from BM25 alone (model still loading)."""
+    return LEXICAL_FAST_PATH and not model_loaded()
+
+def retrieve_matches(user_query, structured_filters=None, weights=None):
+    """Embed, search and rerank: the reranked matches (one per professor) for a query."""
+    weights = weights or RERANK_WEIGHTS
+    options = {"top_k": SEARCH_TOP_K, "rerank_weights": weights, "rerank_candidates": RERANK_CANDIDATES}
+    
+    # Search only the slice of the index that matches the filters and
+    # detected subject (get more to allow for filtering)
+    filters = query_filters(user_query, structured_filters)
+    
+    raw_matches = []
+    if use_lexical_fast_path():
+        # Answer from BM25 instead of blocking on the model load
+        load_model_in_background()
+        raw_matches = retrieve(partial(lexical_query, user_query, **options), filters)
+    
+    if not raw_matches:
+        # Create embedding for user query
+        with stage_timer("embed"):
+            query_vector = create_embeddings(user_query)
+        # In async mode, stop here if the client has given up (no-op otherwise)
+        check_deadline()
+        raw_matches = retrieve(partial(pinecone_query, query_vector, query_text=user_query, **options), filters)
+    logger.debug("Found %d raw matches", len(raw_matches))
+    return raw_matches
+
+def run_search(user_query, structured_filters=None, weights=None):
+    """Run the full RAG pipeline for one query (no caching)."""
+    raw_matches = retrieve_matches(user_query, structured_filters, weights)
+    check_deadline()
+    
+    return build_response(user_query, raw_matches)
+
+def response_cache_key(user_query, structured_filters=None, weights=None):
+    """Cache key: normalized query text plus every setting that shapes the response."""
+    weights = tuple(sorted((weights or RERANK_WEIGHTS).items()))
+    filters = json.dumps(structured_filters, sort_keys=True)
+    return (normalize_query_text(user_query), filters, weights, SEARCH_TOP_K, RERANK_CANDIDATES, RERANK_TOP_N)
+
+def search(user_query, structured_filters=None, weights=None):
+    """
+    Run a search, consulting the response cache when it is enabled.
+    Returns (response body, cache status) where status is HIT, MISS or BYPASS.
+    """
+    started = time.perf_counter()
+    response, cache_status = cached_search(user_query, structured_filters, weights)
+    request_histogram(cache_status).observe(time.perf_counter() - started)
+    return response, cache_status
+
+def cached_search(user_query, structured_filters=None, weights=None):
+    """search() without the latency metric."""
+    # Fast-path (BM25-only) answers are never cached
+    if not response_cache.enabled or use_lexical_fast_path():
+        return run_search(user_query, structured_filters, weights), "BYPASS"
+    
+    index_version = get_index_version()
+    key = response_cache_key(user_query, structured_filters, weights)
+    cached = response_cache.get(key, index_version)
+    if cached is not None:
+        # Queries differing only in case/spacing share an entry; echo this caller's query
+        return {**cached, "query": user_query}, "HIT"
+    
+    response = run_search(user_query, structured_filters, weights)
+    response_cache.put(key, index_version, response)
+    return response, "MISS"
+
+def elapsed_ms(since):
+    """Milliseconds since a time.perf_counter() reading."""
+    return round((time.perf_counter() - since) * 1000, 3)
+
+def response_frames(response, cache_status, timings):
+    """A complete response body as the frames of stream_search."""
+    yield {"type": "professors", "query": response["query"], "professors": response["professors"],
+           "total_found": response["total_found"]}
+    yield {"type": "answer", "answer": response["answer"]}
+    yield {"type": "done", "total_found": response["total_found"], "cache": cache_status, "timings_ms": timings}
+
+def stream_search(user_query, structured_filters=None, weights=None):
+    """
+    Run a search as frames for streaming responses: "professors" as soon as
+    retrieval and reranking are done, then "answer", then "done" with the
+    cache status and per-stage timings. The frames carry the same fields as
+    the /api/search body, and the response cache is used as in search().
+    """
+    started = time.perf_counter()
+    
+    # Fast-path (BM25-only) answers are never cached
+    cacheable = response_cache.enabled and not use_lexical_fast_path()
+    if cacheable:
+        index_version = get_index_version()
+        key = response_cache_key(user_query, structured_filters, weights)
+        cached = response_cache.get(key, index_version)
+        if cached is not None:
+            request_histogram("HIT").observe(time.perf_counter() - started)
+            yield from response_frames({**cached, "query": user_query}, "HIT", {"total": elapsed_ms(started)})
+            return
+    
+    raw_matches = retrieve_matches(user_query, structured_filters, weights)
+    timings = {"retrieve": elapsed_ms(started)}
+    check_deadline()
+    
+    answered = time.perf_counter()
+    with stage_timer("subject_filter"):
+        professors, target_subject = select_professors(user_query, raw_matches[:RERANK_TOP_N])
+    with stage_timer("format"):
+        formatted = [format_professor(match) for match in professors]
+    timings["answer"] = elapsed_ms(answered)
+    yield {"type": "professors", "query": user_query, "professors": formatted, "total_found": len(raw_matches)}
+    
+    # The answer stage excludes the time spent sending the professors frame
+    answered = time.perf_counter()
+    with stage_timer("answer"):
+        answer = generate_answer(user_query, professors, target_subject)
+    timings["answer"] = round(timings["answer"] + elapsed_ms(answered), 3)
+    yield {"type": "answer", "answer": answer}
+    
+    if cacheable:
+        response_cache.put(key, index_version, {
+            "query": user_query,
+            "answer": answer,
+            "professors": formatted,
+            "total_found": len(raw_matches)
+        })
+    timings["total"] = elapsed_ms(started)
+    cache_status = "MISS" if cacheable else "BYPASS"
+    # Excludes the time the client took to read the frames already sent
+    request_histogram(cache_status).observe((timings["retrieve"] + timings["answer"]) / 1000)
+    yield {"type": "done", "total_found": len(raw_matches), "cache": cache_status,
+           "timings_ms": timings}
+
+def streaming_mimetype(accept_header):
+    """The streaming format a request asked for with its Accept header (NDJSON or SSE), or None."""
+    accept = accept_header or ""
+    for mimetype in STREAM_MIMETYPES:
+        if mimetype in accept:
+            return mimetype
+    return None
+
+def encode_frame(frame, mimetype):
+    """One frame as an NDJSON line or a Server-Sent Event named after its type."""
+    data = json.dumps(frame)
+    if mimetype == "text/event-stream":
+        return f"event: {frame['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+def encoded_stream(user_query, structured_filters, weights, mimetype):
+    """stream_search encoded for the wire; a failure mid-stream becomes a final "error" frame."""
+    try:
+        for frame in stream_search(user_query, structured_filters, weights):
+            yield encode_frame(frame, mimetype)
+    except DeadlineExceeded as e:
+        yield encode_frame({"type": "error", "error": str(e)}, mimetype)
+    except Exception as e:
+        logger.error("Error in stream_search: %s", e)
+        yield encode_frame({"type": "error", "error": "Internal server error"}, mimetype)
+
+def batch_matches(texts, structured_filters, weights):
+    """Reranked matches for every query text, from one batched encode and one batched search."""
+    query_vectors = create_embeddings_batch(texts)
+    check_deadline()
+    filters = [query_filters(query, structured_filters) for query in texts]
+    all_matches = pinecone_query_batch(query_vectors, top_k=SEARCH_TOP_K, filters=filters,
+                                       rerank_weights=weights, rerank_candidates=RERANK_CANDIDATES,
+                                       query_texts=texts)
+
+    # Subject slices that came back empty are retried without the subject, as in run_search
+    retry = [i for i, matches in enumerate(all_matches) if not matches and filters[i] and "subject" in filters[i]]
+    if retry:
+        retried = pinecone_query_batch(query_vectors[retry], top_k=SEARCH_TOP_K,
+                                       filters=[without_subject(filters[i]) for i in retry],
+                                       rerank_weights=weights, rerank_candidates=RERANK_CANDIDATES,
+                                       query_texts=[texts[i] for i in retry])
+        for i, matches in zip(retry, retried):
+            all_matches[i] = matches
+    return all_matches
+
+def run_batch_search(queries, structured_filters=None, weights=None):
+    """
+    Run the pipeline for many queries with one batched encode and a single
+    matrix-matrix similarity pass. Returns one entry per query, in input
+    order; a query that fails gets {"query", "error"} without affecting others.
+    If the shared encode or search fails, every valid query gets that error
+    (a missed deadline still raises DeadlineExceeded).
+    """
+    weights = weights or RERANK_WEIGHTS
+    results = [None] * len(queries)
+    valid = []
+    for position, query in enumerate(queries):
+        if not isinstance(query, str) or not query.strip():
+            results[position] = {"query": query, "error": "Query cannot be empty"}
+        else:
+            valid.append((position, query.strip()))
+    
+    if valid:
+        try:
+            all_matches = batch_matches([query for _, query in valid], structured_filters, weights)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Error in batch search: %s", e)
+            for position, query in valid:
+                results[position] = {"query": query, "error": "Internal server error"}
+            return results
+        
+        for (position, query), raw_matches in zip(valid, all_matches):
+            try:
+                results[position] = build_response(query, raw_matches)
+            except Exception as e:
+                logger.error("Error in batch query %d: %s", position, e)
+                results[position] = {"query": query, "error": "Internal server error"}
+    
+    return results
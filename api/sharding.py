@@ -0,0 +1,253 @@
+"""
+Sharded vector index with scatter-gather search.
+
+``seed_index.py --shards N`` splits the binary index into N shard files
+(``local_index.shard-00-of-N.bin`` + sidecar), assigning each row by a hash
+of its ``professor_id`` so all rows of a professor share a shard. Each shard
+is a regular binary index whose sidecar info lists the global row numbers
+of its rows and the version of the index it was split from.
+
+At query time a ShardPool scatters the query matrix to worker processes,
+each owning (memory-mapping) one or more shards. Workers return their
+per-shard top-k as global row numbers and the pool merges them into the
+global top-k. A worker that misses the deadline (or fails) either fails the
+search (the caller falls back to in-process scoring) or, in partial-results
+mode, is left out of the merge.
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from index_format import read_binary_index, write_binary_index, metadata_path, columns_path, shard_path, index_version
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class ShardSearchError(RuntimeError):
+    """Raised when shard workers time out or fail and partial results are not allowed."""
+
+
+def shard_of(key, shards):
+    """Shard number for a professor_id (stable across processes and runs)."""
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+def write_shards(index_path, shards):
+    """
+    Split the binary index at ``index_path`` into ``shards`` shard files and
+    remove shard files left over from a different shard count.
+    Returns the paths written.
+    """
+    header, vectors, ids, metadata, _ = read_binary_index(index_path)
+    version = index_version(header)
+    assignments = np.array([
+        shard_of(meta.get("professor_id") or row_id, shards) for row_id, meta in zip(ids, metadata)
+    ], dtype=np.int64)
+
+    written = []
+    for shard in range(shards):
+        rows = np.flatnonzero(assignments == shard)
+        path = shard_path(index_path, shard, shards)
+        write_binary_index(
+            path,
+            ids=[ids[row] for row in rows],
+            vectors=np.asarray(vectors[rows]) if len(rows) else np.zeros((0, header["dim"]), dtype=np.float32),
+            # Workers only need vectors; metadata stays in the main sidecar
+            metadata=[{}] * len(rows),
+            info={"index_version": version, "shard": shard, "shards": shards, "rows": rows.tolist()},
+            dim=header["dim"],
+        )
+        written.append(path)
+
+    current = {path.name for shard in written for path in (shard, metadata_path(shard), columns_path(shard))}
+    index_path = Path(index_path)
+    for stale in index_path.parent.glob(f"{index_path.stem}.shard-*"):
+        if stale.name not in current:
+            stale.unlink()
+    return written
+
+
+def _shard_top_k(vectors, rows, queries, top_k):
+    """Per-query top-k of one shard as (global rows, scores), each (queries x k)."""
+    scores = queries @ vectors.T
+    count = scores.shape[1]
+    if top_k < count:
+        best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        return rows[best], np.take_along_axis(scores, best, axis=1)
+    return np.broadcast_to(rows, scores.shape), scores
+
+
+def _worker(paths, inbox, outbox):
+    """Worker process: memory-map its shards and answer search requests until told to stop."""
+    # Handlers inherited from a server worker (e.g. gunicorn's) would keep
+    # SIGTERM from stopping us
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    shards = []
+    for path in paths:
+        _, vectors, _, _, info = read_binary_index(path)
+        shards.append((vectors, np.asarray(info["rows"], dtype=np.int64)))
+
+    parent = os.getppid()
+    while True:
+        try:
+            message = inbox.get(timeout=1)
+        except queue.Empty:
+            # Exit if the owning server process died without stopping us
+            if os.getppid() != parent:
+                return
+            continue
+        if message is None:
+            return
+        request_id, queries, top_k = message
+        try:
+            parts = [_shard_top_k(vectors, rows, queries, top_k) for vectors, rows in shards if len(rows)]
+            outbox.put((request_id, parts, None))
+        except Exception as e:
+            outbox.put((request_id, [], repr(e)))
+
+
+class _Gather:
+    """Replies collected for one scattered request."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.parts = []
+        self.replies = 0
+        self.failures = 0
+        self.done = threading.Event()
+
+
+class ShardPool:
+    """Worker processes that each own a subset of the shards of one index."""
+
+    def __init__(self, paths, workers, timeout, partial_results=False):
+        self.paths = list(paths)
+        self.timeout = timeout
+        self.partial_results = partial_results
+        self.workers = max(1, min(workers or len(self.paths), len(self.paths)))
+        # Workers start on the first search, in the process that searches:
+        # a pre-fork master that only loads the index starts none
+        self._owner = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        # Fork: workers inherit the loaded modules instead of re-importing the app
+        context = multiprocessing.get_context("fork")
+        self._outbox = context.Queue()
+        self._inboxes = []
+        self._processes = []
+        for worker in range(self.workers):
+            inbox = context.Queue()
+            owned = self.paths[worker::self.workers]
+            process = context.Process(target=_worker, args=(owned, inbox, self._outbox),
+                                      name=f"index-shard-worker-{worker}", daemon=True)
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._collector = threading.Thread(target=self._collect, name="index-shard-collector", daemon=True)
+        self._collector.start()
+        # Set last: searches on other threads check it without the lock
+        self._owner = os.getpid()
+
+    def _ensure_started(self):
+        # A pool inherited by a forked server worker has no collector thread and
+        # would share the parent's workers: start this process's own
+        if self._owner != os.getpid():
+            with self._start_lock:
+                if self._owner != os.getpid():
+                    self._start()
+
+    @classmethod
+    def open(cls, index_path, shards, version, workers=0, timeout=1.0, partial_results=False):
+        """
+        Pool over the ``shards`` shard files of ``index_path``, or
+        return None (with a message) if any is missing or was split from a
+        different index version.
+        """
+        paths = [shard_path(index_path, shard, shards) for shard in range(shards)]
+        missing = [path for path in paths if not path.exists()]
+        if missing:
+            logger.warning("Index shards not found (%s), searching in-process", missing[0])
+            logger.warning("Run: python scripts/seed_index.py --shards %s", shards)
+            return None
+        for path in paths:
+            _, _, _, _, info = read_binary_index(path)
+            if info.get("index_version") != version:
+                logger.warning("Index shard %s was split from a different index version, searching in-process", path)
+                return None
+        return cls(paths, workers, timeout, partial_results)
+
+    def _collect(self):
+        while True:
+            request_id, parts, error = self._outbox.get()
+            with self._lock:
+                gather = self._pending.get(request_id)
+                if gather is None:
+                    # Reply to a request that already timed out
+                    continue
+                if error is not None:
+                    logger.error("Index shard worker error: %s", error)
+                    gather.failures += 1
+                gather.parts.extend(parts)
+                gather.replies += 1
+                if gather.replies == gather.expected:
+                    gather.done.set()
+
+    def search(self, queries, top_k):
+        """
+        Global top-k of every query (rows of ``queries``), best first, as a
+        list of (rows, scores). Raises ShardSearchError when a worker misses
+        the deadline or fails, unless partial results are enabled.
+        """
+        self._ensure_started()
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        request_id = next(self._ids)
+        gather = _Gather(len(self._inboxes))
+        with self._lock:
+            self._pending[request_id] = gather
+        for inbox in self._inboxes:
+            inbox.put((request_id, queries, top_k))
+
+        gather.done.wait(self.timeout)
+        with self._lock:
+            del self._pending[request_id]
+            parts = list(gather.parts)
+            missing = gather.expected - gather.replies + gather.failures
+        if missing:
+            message = f"{missing} of {gather.expected} shard workers timed out or failed"
+            if not self.partial_results:
+                raise ShardSearchError(message)
+            logger.warning("Partial results: %s", message)
+
+        results = []
+        for query in range(len(queries)):
+            rows = np.concatenate([part_rows[query] for part_rows, _ in parts]) if parts else np.empty(0, dtype=np.int64)
+            scores = np.concatenate([part_scores[query] for _, part_scores in parts]) if parts else np.empty(0, dtype=np.float32)
+            # Ties resolve by row number, as in single-process search
+            best = np.lexsort((rows, -scores))[:top_k]
+            results.append((rows[best], scores[best]))
+        return results
+
+    def close(self):
+        """Stop the worker processes (only those this process started)."""
+        if self._owner != os.getpid():
+            return
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
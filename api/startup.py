@@ -0,0 +1,152 @@
+"""
+Startup sequencing: per-phase timings, optional preload of the index and
+embedding model at boot (followed by a warm-up encode and search), and the
+readiness check behind ``/ready``.
+
+Only the standard library is imported at module level; the index and model
+modules are imported by the functions that need them, so importing this
+module (and timing the app import) stays cheap.
+"""
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Load the index and model on a background thread at boot instead of on the first query
+PRELOAD = os.environ.get("PRELOAD", "0") == "1"
+# Set by gunicorn.conf.py: the master preloads synchronously before forking
+# (preload_before_fork) and each worker starts its own thread (after_fork)
+PREFORK = os.environ.get("PREFORK", "0") == "1"
+# Query encoded and searched once after the preload (empty disables the warm-up)
+WARMUP_QUERY = os.environ.get("WARMUP_QUERY", "professor with clear lectures")
+
+_process_started = time.perf_counter()
+_phases = {}
+_phases_lock = threading.Lock()
+_preloader = None
+_preloader_lock = threading.Lock()
+
+
+def record_phase(name, seconds):
+    """Record how long a startup phase took (the first measurement of a phase wins)."""
+    with _phases_lock:
+        if name in _phases:
+            return
+        _phases[name] = round(seconds, 4)
+    logger.info("Startup phase %s: %.3fs", name, seconds)
+
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as startup phase ``name``."""
+    started = time.perf_counter()
+    yield
+    record_phase(name, time.perf_counter() - started)
+
+
+def phases():
+    """Seconds per recorded phase, in the order they finished."""
+    with _phases_lock:
+        return dict(_phases)
+
+
+def mark_imported():
+    """Record the time from the first import of this module until the app finished importing."""
+    record_phase("import", time.perf_counter() - _process_started)
+
+
+def log_breakdown():
+    """Log every recorded phase and the time since the process started importing the app."""
+    parts = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in phases().items())
+    logger.info("Startup breakdown: %s (ready after %.3fs)", parts, time.perf_counter() - _process_started)
+
+
+def preload():
+    """
+    Load the index and the model, then run one warm-up encode and search.
+    If either fails to load, the next start_preload() (e.g. the next /ready
+    probe) runs it again.
+    """
+    global _preloader
+    from embedding_utils import get_model
+    from pinecone_utils import get_local_index, pinecone_query
+
+    try:
+        # None when the index files are missing or unreadable (e.g. still being written)
+        failed = get_local_index() is None
+        model = get_model()
+        if WARMUP_QUERY:
+            with phase("warmup"):
+                # Straight to the model: the warm-up query stays out of the query cache
+                vector = model.encode(WARMUP_QUERY, convert_to_numpy=True)
+                pinecone_query(vector, top_k=5)
+    except Exception as e:
+        logger.error("Error during preload: %s", e)
+        failed = True
+    if failed:
+        with _preloader_lock:
+            _preloader = None
+    log_breakdown()
+
+
+def preload_before_fork():
+    """
+    Load the index (and torch model weights) in a pre-fork master so every
+    worker shares their pages copy-on-write. Runs synchronously and starts
+    no threads; the log listener thread is stopped around each fork
+    (log_utils), so nothing is mid-operation when the master forks. The
+    warm-up is left to the workers (after_fork): running inference would
+    start the model's thread pools, which do not survive a fork.
+    """
+    from embedding_utils import get_model
+    from embedding_backends import EMBEDDING_BACKEND
+    from pinecone_utils import load_local_index
+
+    load_local_index()
+    # An ONNX Runtime session owns its thread pool from creation, so workers load their own
+    if EMBEDDING_BACKEND == "torch":
+        get_model()
+    # Move everything loaded so far out of the collector's reach: a GC pass in
+    # a worker would otherwise write to (and so copy) every object header
+    gc.freeze()
+    logger.info("Preloaded for fork (%s objects frozen)", gc.get_freeze_count())
+
+
+def after_fork():
+    """Per-worker startup after a pre-fork: load what was not shared, then warm up."""
+    global _preloader
+    # A thread object inherited from the master does not run in this process
+    _preloader = None
+    start_preload()
+
+
+def preload_at_import():
+    """Whether importing the app should start the preload thread (PRELOAD=1, unless pre-forked)."""
+    return PRELOAD and not PREFORK
+
+
+def start_preload():
+    """Run preload() on a daemon thread (no-op if it is running or has succeeded)."""
+    global _preloader
+    with _preloader_lock:
+        if _preloader is None:
+            _preloader = threading.Thread(target=preload, name="startup-preload", daemon=True)
+            _preloader.start()
+
+
+def readiness():
+    """(ready, details): ready once both the model and the index are loaded."""
+    from embedding_utils import model_loaded
+    from pinecone_utils import index_status
+
+    model_ready = model_loaded()
+    index_ready = index_status()["loaded"]
+    return model_ready and index_ready, {
+        "model_loaded": model_ready,
+        "index_loaded": index_ready,
+        "phases": phases()
+    }
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: a small synthetic index on disk (scripts/synthetic_catalog.py)
+and stub query embeddings, so the tests need neither real data nor a model.
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+API_DIR = Path(__file__).parent.parent
+sys.path[:0] = [str(API_DIR), str(API_DIR / "scripts")]
+
+import pinecone_utils
+import search_service
+from index_format import write_binary_index, normalize_rows
+from synthetic_catalog import generate_metadata
+
+DIM = 384
+CATALOG_ROWS = 200
+
+
+def stub_embedding(text):
+    """A unit vector derived from the text, stable across runs."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """(metadata, vectors) of a synthetic catalog, written to data/local_index.bin under tmp_path."""
+    metadata = generate_metadata(CATALOG_ROWS, seed=0)
+    vectors = normalize_rows(np.random.default_rng(0).standard_normal((CATALOG_ROWS, DIM)).astype(np.float32))
+    write_binary_index(tmp_path / "data" / "local_index.bin",
+                       ids=[item["professor_id"] for item in metadata], vectors=vectors, metadata=metadata)
+    return metadata, vectors
+
+
+@pytest.fixture
+def loaded_index(catalog, tmp_path, monkeypatch):
+    """The synthetic catalog loaded as the served index, with stub query embeddings."""
+    # Index paths are relative to the working directory, as for the API
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pinecone_utils, "_local_index", None)
+    monkeypatch.setattr(search_service, "create_embeddings", stub_embedding)
+    index = pinecone_utils.get_local_index()
+    assert index is not None and len(index) == CATALOG_ROWS
+    yield index
+    pinecone_utils._local_index = None
@@ -0,0 +1,25 @@
+"""IVF structure: persistence and the serving path through LocalIndex.search."""
+import numpy as np
+
+from ann_index import IVFIndex
+from index_format import ann_path
+
+
+def test_ivf_search_through_local_index(loaded_index, tmp_path):
+    ivf = IVFIndex.build(loaded_index.vectors, nlist=8)
+    path = ann_path(tmp_path / "data" / "local_index.bin")
+    ivf.save(path, loaded_index.version)
+    # Written through a temp file that is renamed into place
+    assert sorted(p.name for p in path.parent.glob(path.name + "*")) == [path.name]
+
+    loaded = IVFIndex.load(path, nprobe=ivf.nlist)
+    assert loaded.index_version == loaded_index.version
+    np.testing.assert_array_equal(loaded.rows, ivf.rows)
+
+    query = np.asarray(loaded_index.vectors[3])
+    exact_rows, exact_scores = loaded_index.search(query, 10)
+    loaded_index.ann = loaded
+    # Probing every list finds the exact top-k
+    rows, scores = loaded_index.search(query, 10)
+    np.testing.assert_array_equal(rows, exact_rows)
+    np.testing.assert_allclose(scores, exact_scores, atol=1e-6)
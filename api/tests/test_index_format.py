@@ -0,0 +1,60 @@
+"""Binary index format: the columnar metadata file and the older per-row sidecar."""
+import json
+import zlib
+
+import pytest
+
+from index_format import (write_binary_index, read_binary_index, read_header, metadata_path, columns_path,
+                          IndexFormatError, HEADER_STRUCT, MAGIC)
+from metadata_store import MetadataStore
+
+
+def test_columns_round_trip(catalog, tmp_path):
+    metadata, _ = catalog
+    _, _, ids, store, _ = read_binary_index(tmp_path / "data" / "local_index.bin", verify_vectors=True)
+
+    assert isinstance(store, MetadataStore)
+    assert ids == [item["professor_id"] for item in metadata]
+    assert [dict(row) for row in store] == metadata
+
+
+def test_columns_keep_missing_and_non_string_fields(tmp_path):
+    metadata = [{"name": "A", "extra": {"rooms": [1, None]}}, {"extra": None}, {"name": "C", "avg_rating": 4.5}]
+    path = tmp_path / "local_index.bin"
+    write_binary_index(path, ids=["a", "b", "c"], vectors=[[1, 0], [0, 1], [1, 1]], metadata=metadata, dim=2)
+
+    _, _, _, store, _ = read_binary_index(path, verify_vectors=True)
+
+    assert [dict(row) for row in store] == metadata
+
+
+def test_mismatched_columns_file_is_rejected(tmp_path):
+    path = tmp_path / "local_index.bin"
+    write_binary_index(path, ids=["a"], vectors=[[1, 0]], metadata=[{"name": "A"}], dim=2)
+    stale = columns_path(path).read_bytes()
+    write_binary_index(path, ids=["a"], vectors=[[1, 0]], metadata=[{"name": "B"}], dim=2)
+    columns_path(path).write_bytes(stale)
+
+    with pytest.raises(IndexFormatError):
+        read_binary_index(path)
+
+
+def test_older_sidecar_with_per_row_metadata(tmp_path):
+    path = tmp_path / "local_index.bin"
+    write_binary_index(path, ids=["a"], vectors=[[1, 0]], metadata=[{"name": "A"}], dim=2)
+    # The layout before the columns file: metadata dicts in the sidecar, covered by the header checksum
+    sidecar = json.loads(metadata_path(path).read_bytes())
+    del sidecar["columns_crc32"]
+    sidecar["metadata"] = [{"name": "A"}]
+    meta_bytes = json.dumps(sidecar).encode("utf-8")
+    metadata_path(path).write_bytes(meta_bytes)
+    columns_path(path).unlink()
+    header = read_header(path)
+    with open(path, "r+b") as f:
+        f.write(HEADER_STRUCT.pack(MAGIC, header["version"], header["flags"], header["count"], header["dim"],
+                                   header["vectors_crc32"], zlib.crc32(meta_bytes)))
+
+    _, _, ids, metadata, _ = read_binary_index(path)
+
+    assert ids == ["a"]
+    assert metadata == [{"name": "A"}]
@@ -0,0 +1,94 @@
+"""Admission control and deadlines of the async mode's InferencePool."""
+import asyncio
+import threading
+
+import pytest
+
+from inference_pool import InferencePool, Overloaded, DeadlineExceeded, check_deadline
+
+
+def test_full_pool_refuses_and_late_calls_expire():
+    pool = InferencePool(workers=1, max_queue=1)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait, 5, timeout=5))
+        queued = asyncio.ensure_future(pool.run(ran.append, "queued", timeout=0.05))
+        await asyncio.sleep(0.01)
+        # One running, one queued: the next call is refused without waiting
+        with pytest.raises(Overloaded):
+            await pool.run(ran.append, "refused", timeout=5)
+        with pytest.raises(DeadlineExceeded):
+            await queued
+        release.set()
+        assert await running is True
+
+    asyncio.run(scenario())
+    pool._executor.shutdown(wait=True)
+    # The queued call outlived its deadline before a worker was free, so it never ran
+    assert ran == []
+    assert pool.stats() == {"workers": 1, "capacity": 2, "inflight": 0, "rejected": 1, "expired": 1}
+
+
+def test_running_call_stops_at_its_next_deadline_check():
+    pool = InferencePool(workers=1, max_queue=0)
+    stages = []
+
+    def pipeline():
+        stages.append("embed")
+        threading.Event().wait(0.1)
+        check_deadline()
+        stages.append("search")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(pool.run(pipeline, timeout=0.02))
+    pool._executor.shutdown(wait=True)
+    assert stages == ["embed"]
+
+
+@pytest.fixture
+def asgi_client(monkeypatch):
+    """The ASGI app with a one-slot pool and a search that blocks until released."""
+    pytest.importorskip("starlette")
+    pytest.importorskip("httpx")
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_search(*args):
+        started.set()
+        release.wait(5)
+        return {"professors": []}, "MISS"
+
+    monkeypatch.setattr(asgi_app, "pool", InferencePool(workers=1, max_queue=0))
+    monkeypatch.setattr(asgi_app, "search", blocking_search)
+    with TestClient(asgi_app.app) as client:
+        yield client, started, release
+        release.set()
+
+
+def test_asgi_search_returns_503_with_retry_after_when_the_pool_is_full(asgi_client):
+    client, started, release = asgi_client
+    first = []
+    thread = threading.Thread(target=lambda: first.append(client.post("/api/search", json={"query": "calculus"})))
+    thread.start()
+    assert started.wait(5)
+
+    response = client.post("/api/search", json={"query": "calculus"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    release.set()
+    thread.join(5)
+    assert first[0].status_code == 200
+
+
+def test_asgi_search_returns_504_past_its_deadline(asgi_client):
+    client, _, _ = asgi_client
+
+    response = client.post("/api/search", json={"query": "calculus"}, headers={"X-Request-Timeout-Ms": "50"})
+
+    assert response.status_code == 504
+    assert response.json() == {"error": "Request deadline exceeded"}
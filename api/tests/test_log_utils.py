@@ -0,0 +1,28 @@
+"""The queued logger across forks."""
+import os
+
+import pytest
+
+import log_utils
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def test_listener_is_stopped_across_a_fork():
+    logger = log_utils.get_logger("tests")
+    logger.info("before fork")
+    listener = log_utils._listener
+
+    pid = os.fork()
+    if pid == 0:
+        # The parent's listener as it was at the fork: no thread that could
+        # have held stdout, and this process writes through its own listener
+        status = 0 if listener._thread is None and log_utils._listener is not listener else 1
+        logger.info("child")
+        log_utils._stop_listener()
+        os._exit(status)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    # Restarted in the parent
+    assert log_utils._listener is listener and listener._thread.is_alive()
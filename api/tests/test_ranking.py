@@ -0,0 +1,140 @@
+"""Ranking stages after retrieval, on the synthetic index (see conftest.py)."""
+import numpy as np
+import pytest
+
+from conftest import DIM
+
+WEIGHTS = {"similarity_weight": 0.6, "rating_weight": 0.3, "review_count_weight": 0.1}
+
+
+def per_item_rerank(matches, similarity_weight, rating_weight, review_count_weight):
+    """The per-match loop that rerank_scores replaced, kept as the reference."""
+    max_reviews = max(max(match["metadata"].get("num_reviews", 0) for match in matches), 1)
+    for match in matches:
+        metadata = match["metadata"]
+        avg_rating = metadata.get("avg_rating", 0)
+        match["similarity_component"] = max(0, match["score"])
+        match["rating_component"] = avg_rating / 5.0 if avg_rating else 0
+        match["review_component"] = min(metadata.get("num_reviews", 0) / max_reviews, 1.0)
+        match["final_score"] = (similarity_weight * match["similarity_component"]
+                                + rating_weight * match["rating_component"]
+                                + review_count_weight * match["review_component"])
+    return sorted(matches, key=lambda match: match["final_score"], reverse=True)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_vectorized_rerank_matches_per_item_scoring(loaded_index, seed):
+    from pinecone_utils import pinecone_query
+    from reranker import rerank
+
+    query = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    ranked = pinecone_query(query, top_k=10, rerank_weights=WEIGHTS, rerank_candidates=40)
+    candidates = [{**match, "metadata": dict(match["metadata"])} for match in pinecone_query(query, top_k=40)]
+    expected = per_item_rerank([dict(match) for match in candidates], **WEIGHTS)[:10]
+
+    assert [match["id"] for match in ranked] == [match["id"] for match in expected]
+    for key in ("final_score", "similarity_component", "rating_component", "review_component"):
+        np.testing.assert_allclose([match[key] for match in ranked], [match[key] for match in expected], atol=1e-6)
+    # The dict-based wrapper orders the same candidates the same way
+    assert [match["id"] for match in rerank(candidates, **WEIGHTS)[:10]] == [match["id"] for match in expected]
+
+
+CORPUS = [
+    {"professor_id": "p0", "full_text": "calculus calculus lectures", "tags": ["clear"]},
+    {"professor_id": "p1", "full_text": "organic chemistry lab"},
+    {"professor_id": "p2", "full_text": "calculus exams", "bio": "chemistry minor"},
+]
+
+
+def reference_bm25(documents, query, k1=1.2, b=0.75):
+    """Okapi BM25 written out term by term over tokenized documents."""
+    average = sum(len(document) for document in documents) / len(documents)
+    scores = []
+    for document in documents:
+        score = 0.0
+        for term in set(query):
+            containing = sum(term in other for other in documents)
+            if not containing:
+                continue
+            idf = np.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            frequency = document.count(term)
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(document) / average))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_scores_on_a_small_corpus():
+    from lexical_index import BM25Index, document_text, tokenize
+    from metadata_store import MetadataStore
+
+    lexical = BM25Index.build(MetadataStore.from_records(CORPUS))
+    documents = [tokenize(document_text(record)) for record in CORPUS]
+
+    for text in ("calculus", "chemistry lab", "calculus chemistry", "astronomy"):
+        np.testing.assert_allclose(lexical.scores(text), reference_bm25(documents, tokenize(text)), rtol=1e-5)
+    # More occurrences in a document of the same length scores higher; no shared term scores 0
+    scores = lexical.scores("calculus")
+    assert scores[0] > scores[2] > 0 and scores[1] == 0
+
+
+def test_reciprocal_rank_fusion_order(monkeypatch):
+    import pinecone_utils
+    from lexical_index import BM25Index
+    from pinecone_utils import LocalIndex
+
+    monkeypatch.setattr(pinecone_utils, "DENSE_WEIGHT", 1.0)
+    monkeypatch.setattr(pinecone_utils, "LEXICAL_WEIGHT", 1.0)
+    monkeypatch.setattr(pinecone_utils, "RRF_K", 60)
+    vectors = np.eye(3, dtype=np.float32)
+    index = LocalIndex(["p0", "p1", "p2"], vectors, CORPUS)
+    index.lexical = BM25Index.build(index.metadata)
+    query = np.array([0.6, 0.0, 0.8], dtype=np.float32)
+
+    # Dense ranking 2, 0, 1; "organic" only matches row 1
+    rows, scores, relevance = index.fuse(query, "organic", np.array([2, 0, 1]), top_k=3)
+
+    fused = {2: 1 / 61, 0: 1 / 62, 1: 1 / 63 + 1 / 61}
+    assert rows.tolist() == [1, 2, 0]
+    np.testing.assert_allclose(relevance, [fused[row] * 61 / 2 for row in rows.tolist()])
+    np.testing.assert_allclose(scores, vectors[rows] @ query)
+
+
+# Review-level rows: professor A has a profile and three reviews, B a profile
+# and one review, C only a profile
+REVIEW_ROWS = [
+    {"professor_id": "A", "row_type": "profile"},
+    {"professor_id": "A", "row_type": "review"},
+    {"professor_id": "A", "row_type": "review"},
+    {"professor_id": "A", "row_type": "review"},
+    {"professor_id": "B", "row_type": "profile"},
+    {"professor_id": "B", "row_type": "review"},
+    {"professor_id": "C", "row_type": "profile"},
+]
+
+
+@pytest.mark.parametrize("aggregation, expected", [
+    # Best row of each professor: A 0.9, B 0.85, C 0.2
+    ("max", [(0, 0.9), (1, 0.85), (5, 0.2)]),
+    # Mean of the best three rows: B (0.85 + 0.4) / 2, A (0.9 + 0.5 + 0.3) / 3, C 0.2
+    ("mean", [(1, 0.625), (0, 1.7 / 3), (5, 0.2)]),
+])
+def test_aggregate_per_professor_over_review_rows(monkeypatch, aggregation, expected):
+    import pinecone_utils
+    from pinecone_utils import LocalIndex
+
+    monkeypatch.setattr(pinecone_utils, "MULTI_VECTOR_AGGREGATION", aggregation)
+    monkeypatch.setattr(pinecone_utils, "MULTI_VECTOR_TOP_N", 3)
+    vectors = np.eye(len(REVIEW_ROWS), dtype=np.float32)
+    index = LocalIndex([f"r{i}" for i in range(len(REVIEW_ROWS))], vectors, REVIEW_ROWS,
+                       info={"granularity": "review"})
+
+    rows = np.array([1, 5, 2, 4, 3, 6, 0])
+    ranking = np.array([0.9, 0.85, 0.5, 0.4, 0.3, 0.2, 0.1])
+    positions, aggregated, snippet_rows = index.aggregate(rows, ranking)
+
+    assert positions.tolist() == [position for position, _ in expected]
+    np.testing.assert_allclose(aggregated, [score for _, score in expected])
+    # Each professor's best review row, none for C
+    snippets = {index.metadata[int(rows[position])]["professor_id"]: int(row)
+                for position, row in zip(positions, snippet_rows)}
+    assert snippets == {"A": 1, "B": 5, "C": -1}
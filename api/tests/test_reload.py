@@ -0,0 +1,45 @@
+"""Hot reload of the served index."""
+import numpy as np
+
+import pinecone_utils
+from conftest import DIM
+from index_format import write_binary_index, normalize_rows
+from synthetic_catalog import generate_metadata
+
+
+def test_reload_swaps_the_version_while_the_old_index_keeps_serving(loaded_index, tmp_path, monkeypatch):
+    query = np.asarray(loaded_index.vectors[0]).copy()
+    rows, scores = loaded_index.search(query, top_k=5)
+
+    metadata = generate_metadata(150, seed=1)
+    vectors = normalize_rows(np.random.default_rng(1).standard_normal((150, DIM)).astype(np.float32))
+    write_binary_index(tmp_path / "data" / "local_index.bin",
+                       ids=[item["professor_id"] for item in metadata], vectors=vectors, metadata=metadata)
+
+    # Queries arriving while the new index is read still get the old one
+    served_during_load = []
+    read = pinecone_utils._read_local_index
+
+    def read_and_observe():
+        served_during_load.append(pinecone_utils._local_index)
+        return read()
+
+    monkeypatch.setattr(pinecone_utils, "_read_local_index", read_and_observe)
+    previous, version = pinecone_utils.reload_local_index()
+
+    assert served_during_load == [loaded_index]
+    assert previous == loaded_index.version and version != previous
+    reloaded = pinecone_utils.get_local_index()
+    assert reloaded is not loaded_index and reloaded.version == version and len(reloaded) == 150
+    # The old object is untouched: same rows, same scores
+    old_rows, old_scores = loaded_index.search(query, top_k=5)
+    assert len(loaded_index) == 200 and old_rows.tolist() == rows.tolist()
+    np.testing.assert_array_equal(old_scores, scores)
+
+
+def test_failed_reload_keeps_serving_the_current_index(loaded_index, tmp_path, monkeypatch):
+    monkeypatch.setattr(pinecone_utils, "_failed_fingerprint", None)
+    (tmp_path / "data" / "local_index.bin").write_bytes(b"not an index")
+
+    assert pinecone_utils.reload_local_index() == (loaded_index.version, loaded_index.version)
+    assert pinecone_utils.get_local_index() is loaded_index
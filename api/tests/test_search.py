@@ -0,0 +1,174 @@
+"""
+Search pipeline tests on a synthetic index (see conftest.py): the /api/process
+and /api/search responses, and top-k parity with the reference loop of
+scripts/check_search_parity.py and the backend drift gate of
+scripts/embedding_parity_report.py.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from conftest import CATALOG_ROWS, DIM
+
+STREAMING_ACCEPT = ["application/x-ndjson", "text/event-stream"]
+
+
+@pytest.mark.parametrize("accept", STREAMING_ACCEPT)
+def test_flask_process_ignores_streaming_accept(loaded_index, accept):
+    flask_app = pytest.importorskip("app")
+    client = flask_app.app.test_client()
+
+    response = client.post("/api/process", json={"text": "best calculus professor"}, headers={"Accept": accept})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) == {"llm_answer", "matches"}
+    assert body["matches"]
+
+
+@pytest.mark.parametrize("accept", STREAMING_ACCEPT)
+def test_asgi_process_ignores_streaming_accept(loaded_index, accept):
+    pytest.importorskip("starlette")
+    pytest.importorskip("httpx")
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    with TestClient(asgi_app.app) as client:
+        response = client.post("/api/process", json={"text": "best calculus professor"}, headers={"Accept": accept})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"llm_answer", "matches"}
+    assert body["matches"]
+
+
+def test_search_still_streams(loaded_index):
+    flask_app = pytest.importorskip("app")
+    client = flask_app.app.test_client()
+
+    response = client.post("/api/search", json={"query": "best calculus professor"},
+                           headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    frames = [line for line in response.get_data(as_text=True).splitlines() if line]
+    assert [json.loads(frame)["type"] for frame in frames] == ["professors", "answer", "done"]
+
+
+def test_filtered_scores_match_whichever_path(loaded_index, monkeypatch):
+    import pinecone_utils
+    from conftest import stub_embedding
+
+    query = np.asarray(stub_embedding("calculus"), dtype=np.float32)
+    rows = loaded_index.filters.rows({"min_rating": 3.0})
+    assert 0.25 * len(loaded_index) < len(rows) < len(loaded_index)
+
+    results = []
+    for fraction in (0.0, 1.0):
+        monkeypatch.setattr(pinecone_utils, "GATHER_MAX_FRACTION", fraction)
+        results.append(loaded_index.search(query, 10, {"min_rating": 3.0}))
+
+    (masked_rows, masked_scores), (gathered_rows, gathered_scores) = results
+    np.testing.assert_array_equal(masked_rows, gathered_rows)
+    np.testing.assert_allclose(masked_scores, gathered_scores, atol=1e-6)
+    assert set(masked_rows) <= set(rows)
+
+
+def assert_parity(actual, ranked, top_k):
+    """check_search_parity's assertions: the same score at every rank, each id with its true score."""
+    expected = ranked[:top_k]
+    reference_scores = {match["id"]: match["score"] for match in ranked}
+    assert len(actual) == len(expected)
+    np.testing.assert_allclose([m["score"] for m in actual], [m["score"] for m in expected], atol=1e-5)
+    assert all(abs(reference_scores[m["id"]] - m["score"]) < 1e-5 for m in actual)
+
+
+@pytest.mark.parametrize("top_k", [1, 20, CATALOG_ROWS + 5])
+def test_pinecone_query_matches_reference_loop(loaded_index, top_k):
+    from check_search_parity import reference_query
+    from pinecone_utils import pinecone_query
+
+    rng = np.random.default_rng(top_k)
+    for _ in range(5):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        assert_parity(pinecone_query(query, top_k=top_k), reference_query(loaded_index, query, len(loaded_index)),
+                      top_k)
+
+
+@pytest.mark.parametrize("fraction", [0.0, 1.0])
+def test_filtered_pinecone_query_matches_reference_loop(loaded_index, monkeypatch, fraction):
+    import pinecone_utils
+    from check_search_parity import reference_query
+
+    # Both ways of scoring a filter's rows: the full product, then gathering them
+    monkeypatch.setattr(pinecone_utils, "GATHER_MAX_FRACTION", fraction)
+    filters = {"min_rating": 3.0}
+    allowed = {loaded_index.ids[row] for row in loaded_index.filters.rows(filters)}
+
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        ranked = [m for m in reference_query(loaded_index, query, len(loaded_index)) if m["id"] in allowed]
+        assert_parity(pinecone_utils.pinecone_query(query, top_k=20, filters=filters), ranked, 20)
+
+
+def test_onnx_embeddings_match_torch():
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+    from embedding_backends import ONNX_MODEL_DIR
+    if not ONNX_MODEL_DIR.exists():
+        pytest.skip(f"No ONNX export at {ONNX_MODEL_DIR} (run scripts/export_onnx.py --quantize)")
+    from embedding_parity_report import run_report
+    from seed_index import create_professor_text
+    from synthetic_catalog import generate_professors, sample_queries
+
+    documents = [create_professor_text(professor) for professor in generate_professors(50, seed=0)]
+    report = run_report(documents, sample_queries(20, np.random.default_rng(0)), ONNX_MODEL_DIR,
+                        batch_size=16, repeats=5, top_k=10)
+
+    candidates = [entry for entry in report["backends"] if "max_drift" in entry]
+    assert candidates
+    for entry in candidates:
+        # embedding_parity_report's default --max-drift
+        assert entry["max_drift"] <= 0.02, entry
+        assert entry["recall_at_k"] >= 0.9, entry
+
+
+def test_batch_search_reports_an_encoder_failure_per_query(loaded_index, monkeypatch):
+    import search_service
+    flask_app = pytest.importorskip("app")
+
+    def failing_encode(texts):
+        raise RuntimeError("encoder crashed")
+
+    monkeypatch.setattr(search_service, "create_embeddings_batch", failing_encode)
+    client = flask_app.app.test_client()
+
+    response = client.post("/api/search/batch", json={"queries": ["calculus", " ", "organic chemistry"]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["errors"] == 3
+    assert body["results"] == [
+        {"query": "calculus", "error": "Internal server error"},
+        {"query": " ", "error": "Query cannot be empty"},
+        {"query": "organic chemistry", "error": "Internal server error"}
+    ]
+
+
+def test_batch_search_answers_every_query(loaded_index, monkeypatch):
+    import search_service
+    from conftest import stub_embedding
+    flask_app = pytest.importorskip("app")
+
+    monkeypatch.setattr(search_service, "create_embeddings_batch",
+                        lambda texts: np.array([stub_embedding(text) for text in texts], dtype=np.float32))
+    client = flask_app.app.test_client()
+
+    response = client.post("/api/search/batch", json={"queries": ["calculus", "organic chemistry"]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["errors"] == 0
+    assert [result["query"] for result in body["results"]] == ["calculus", "organic chemistry"]
@@ -0,0 +1,58 @@
+"""Scatter-gather search over index shards, against the in-process index."""
+import os
+import signal
+
+import numpy as np
+import pytest
+
+from conftest import DIM
+from index_format import read_binary_index
+from sharding import ShardPool, ShardSearchError, write_shards
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="shard workers are forked")
+
+SHARDS = 3
+
+
+@pytest.fixture
+def shard_pool(loaded_index, tmp_path):
+    """A pool of one worker per shard over the synthetic catalog."""
+    index_path = tmp_path / "data" / "local_index.bin"
+    write_shards(index_path, SHARDS)
+    pool = ShardPool.open(index_path, SHARDS, loaded_index.version, timeout=5.0)
+    assert pool is not None
+    yield pool
+    pool.close()
+
+
+def test_merged_shard_results_match_exact_search(loaded_index, shard_pool):
+    queries = np.random.default_rng(0).standard_normal((4, DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    for query, (rows, scores) in zip(queries, shard_pool.search(queries, top_k=10)):
+        expected_rows, expected_scores = loaded_index.search(query, top_k=10)
+        assert rows.tolist() == expected_rows.tolist()
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_worker_timeout_fails_the_search_or_is_left_out(loaded_index, shard_pool):
+    query = np.asarray(loaded_index.vectors[0])[None, :]
+    shard_pool.search(query, top_k=5)
+    stalled = shard_pool._processes[0]
+    os.kill(stalled.pid, signal.SIGSTOP)
+    try:
+        shard_pool.timeout = 0.2
+        with pytest.raises(ShardSearchError):
+            shard_pool.search(query, top_k=5)
+
+        shard_pool.partial_results = True
+        (rows, scores), = shard_pool.search(query, top_k=5)
+    finally:
+        os.kill(stalled.pid, signal.SIGCONT)
+
+    # The exact top-k of the rows in the shards that answered
+    _, _, _, _, info = read_binary_index(shard_pool.paths[0])
+    answered = np.setdiff1d(np.arange(len(loaded_index)), info["rows"])
+    expected = answered[np.lexsort((answered, -loaded_index.scores(query[0], answered)))[:5]]
+    assert rows.tolist() == expected.tolist()
+    np.testing.assert_allclose(scores, loaded_index.scores(query[0], expected), rtol=1e-5)
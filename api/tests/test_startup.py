@@ -0,0 +1,68 @@
+"""Preload sequencing: around a pre-fork (gunicorn.conf.py) and after a failed preload."""
+import threading
+
+import numpy as np
+import pytest
+
+import startup
+
+
+def test_no_preload_thread_at_import_when_prefork(monkeypatch):
+    monkeypatch.setattr(startup, "PRELOAD", True)
+    monkeypatch.setattr(startup, "PREFORK", True)
+    assert not startup.preload_at_import()
+
+    monkeypatch.setattr(startup, "PREFORK", False)
+    assert startup.preload_at_import()
+
+
+def test_after_fork_starts_its_own_preload(monkeypatch):
+    ran = threading.Event()
+    monkeypatch.setattr(startup, "preload", ran.set)
+    # As inherited from a master whose preload thread does not exist in the child
+    monkeypatch.setattr(startup, "_preloader", threading.Thread(target=lambda: None))
+
+    startup.after_fork()
+
+    assert ran.wait(5)
+
+
+def test_ready_retries_a_failed_preload(loaded_index, monkeypatch):
+    import embedding_utils
+    from conftest import stub_embedding
+
+    flask_app = pytest.importorskip("app")
+
+    class StubModel:
+        def encode(self, text, convert_to_numpy=True):
+            return np.asarray(stub_embedding(text), dtype=np.float32)
+
+    attempts = []
+
+    def get_model():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model download failed")
+        embedding_utils.model = StubModel()
+        return embedding_utils.model
+
+    monkeypatch.setattr(embedding_utils, "model", None)
+    monkeypatch.setattr(embedding_utils, "get_model", get_model)
+    monkeypatch.setattr(startup, "_preloader", None)
+    client = flask_app.app.test_client()
+
+    def probe():
+        response = client.get("/ready")
+        # The probe starts the preload in the background; wait for it to finish
+        thread = startup._preloader
+        if thread is not None:
+            thread.join(5)
+        return response
+
+    assert probe().status_code == 503
+    # Failed: cleared so the next probe tries again
+    assert startup._preloader is None
+
+    probe()
+    assert client.get("/ready").status_code == 200
+    assert len(attempts) == 2
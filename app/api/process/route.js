@@ -1,8 +1,31 @@
   import { NextResponse } from 'next/server';
 
   export async function POST(request) {
-    const { text } = await request.json();
-    
+    const { text, stream } = await request.json();
+
+    if (stream) {
+      // Pass the backend's NDJSON frames straight through as they arrive
+      const response = await fetch('http://127.0.0.1:5000/api/search', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/x-ndjson',
+        },
+        body: JSON.stringify({ query: text }),
+      });
+
+      if (!response.ok) {
+        const data = await response.json();
+        return NextResponse.json(data, { status: response.status });
+      }
+      return new Response(response.body, {
+        headers: {
+          'Content-Type': 'application/x-ndjson',
+          'Cache-Control': 'no-cache',
+        },
+      });
+    }
+
       const response = await fetch('http://127.0.0.1:5000/api/process', {
       method: 'POST',
       headers: {
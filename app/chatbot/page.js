@@ -22,7 +22,11 @@ export default function Chatbot() {
   }, [messages]);
 
   const addMessage = (message) => {
-    setMessages(prev => [...prev, { ...message, id: Date.now() + Math.random() }]);
+    setMessages(prev => [...prev, { id: Date.now() + Math.random(), ...message }]);
+  };
+
+  const updateMessage = (id, changes) => {
+    setMessages(prev => prev.map(m => (m.id === id ? { ...m, ...changes } : m)));
   };
 
   const clearChat = () => {
@@ -30,6 +34,39 @@ export default function Chatbot() {
     localStorage.removeItem('prof_chat_history');
   };
 
+  // Render the search frames as they arrive: the professor list first, then the answer
+  const readStream = async (response, messageId) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const handleFrame = (frame) => {
+      if (frame.type === 'professors') {
+        updateMessage(messageId, {
+          loading: false,
+          text: frame.professors.length ? 'Found these professors, writing an answer...' : '',
+          professors: frame.professors,
+        });
+      } else if (frame.type === 'answer') {
+        updateMessage(messageId, { loading: false, text: frame.answer || "No answer returned" });
+      } else if (frame.type === 'error') {
+        throw new Error(frame.error || 'Search failed');
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (line.trim()) handleFrame(JSON.parse(line));
+      }
+    }
+    if (buffer.trim()) handleFrame(JSON.parse(buffer));
+  };
+
   const handleSubmit = async () => {
     if (isLoading || !text.trim()) return;
     const userMessage = text.trim();
@@ -43,9 +80,15 @@ export default function Chatbot() {
       const response = await fetch('/api/process', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: userMessage }),
+        body: JSON.stringify({ text: userMessage, stream: true }),
       });
       if (!response.ok) throw new Error(`Server error: ${response.status}`);
+
+      if ((response.headers.get('Content-Type') || '').includes('application/x-ndjson')) {
+        await readStream(response, loadingId);
+        return;
+      }
+
       const data = await response.json();
 
       setMessages(prev => prev.filter(m => m.id !== loadingId));
@@ -153,6 +196,13 @@ export default function Chatbot() {
             }`}
         >
           {m.loading ? "..." : m.text}
+          {m.professors && m.professors.length > 0 && (
+            <ul className="mt-2 space-y-1 text-sm opacity-80">
+              {m.professors.map((p) => (
+                <li key={p.id}>• {p.name} ({p.subject}, {p.rating}⭐)</li>
+              ))}
+            </ul>
+          )}
         </motion.div>
       ))}
     </div>